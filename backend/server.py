@@ -1,15 +1,34 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, BackgroundTasks, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne, UpdateMany, ReplaceOne, DeleteMany, ReturnDocument
 import os
 import logging
+import asyncio
 import json
+import re
+import base64
+import hashlib
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union, get_args, get_origin
 import uuid
-from datetime import datetime, date, timezone
+import bisect
+import heapq
+import math
+from collections import Counter, OrderedDict
+from contextlib import aclosing, asynccontextmanager
+from functools import lru_cache
+from datetime import datetime, date, timezone, timedelta
+import numpy as np
+try:
+    import orjson
+except ImportError:  # Responses fall back to the standard library encoder
+    orjson = None
+import litellm
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 ROOT_DIR = Path(__file__).parent
@@ -37,6 +56,8 @@ FAMILY_MEMBERS = {
     "grandma": "👵"
 }
 
+MEAL_SLOTS = ['breakfast', 'morning_snack', 'lunch', 'dinner', 'evening_snack']
+
 # Common ingredients database (initial seed data)
 COMMON_INGREDIENTS = [
     "Salt", "Black pepper", "Olive oil", "Butter", "Garlic", "Onion", "Tomatoes", "Chicken breast", 
@@ -51,6 +72,75 @@ COMMON_INGREDIENTS = [
     "Almonds", "Walnuts", "Pine nuts", "Cashews", "Peanuts", "Coconut oil", "Sesame oil"
 ]
 
+# Ingredient canonicalization tables (all keys lowercase, singular)
+INGREDIENT_ALIASES = {
+    "scallion": "green onion", "spring onion": "green onion",
+    "aubergine": "eggplant", "courgette": "zucchini", "capsicum": "bell pepper",
+    "garbanzo bean": "chickpea", "coriander leaf": "cilantro",
+    "prawn": "shrimp", "minced beef": "ground beef", "beef mince": "ground beef",
+    "roma tomato": "tomato", "plum tomato": "tomato",
+    "extra virgin olive oil": "olive oil", "evoo": "olive oil",
+    "heavy whipping cream": "heavy cream", "double cream": "heavy cream",
+    "icing sugar": "powdered sugar", "confectioners sugar": "powdered sugar",
+    "parmesan": "parmesan cheese", "parmigiano reggiano": "parmesan cheese",
+    "mozzarella": "mozzarella cheese", "cheddar": "cheddar cheese",
+    "chicken broth": "chicken stock", "vegetable broth": "vegetable stock",
+    "all purpose flour": "flour", "plain flour": "flour",
+}
+INGREDIENT_UNITS = [
+    "cups?", "c", "tablespoons?", "tbsps?", "tbs", "teaspoons?", "tsps?", "ounces?", "oz", "fl oz",
+    "pounds?", "lbs?", "grams?", "g", "kilograms?", "kg", "milliliters?", "ml", "liters?", "l",
+    "pints?", "quarts?", "gallons?", "cans?", "jars?", "packages?", "pkgs?", "bottles?", "boxes",
+    "bunch(?:es)?", "heads?", "cloves?", "slices?", "pieces?", "sticks?", "sprigs?", "stalks?",
+    "pinch(?:es)?", "dash(?:es)?", "handfuls?", "dozen",
+]
+INGREDIENT_PREPARATIONS = [
+    "chopped", "diced", "minced", "sliced", "grated", "shredded", "crushed", "peeled", "cubed",
+    "halved", "quartered", "julienned", "trimmed", "rinsed", "drained", "melted", "softened",
+    "beaten", "cooked", "uncooked", "fresh", "freshly", "frozen", "finely", "roughly", "coarsely",
+    "thinly", "large", "medium", "small", "boneless", "skinless", "to taste", "for garnish",
+    "optional", "divided",
+]
+SINGULAR_IRREGULARS = {"leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife"}
+# Singulars ending in "ie", whose plurals would otherwise hit the "ies" -> "y" rule
+SINGULAR_IE_WORDS = {"cookie", "brownie", "veggie", "smoothie", "hoagie", "genie", "pie", "potpie", "whoopie"}
+SINGULAR_EXCEPTIONS = {"hummus", "couscous", "asparagus", "molasses", "swiss", "grits", "citrus", "lemongrass"}
+
+# Grocery quantity tables: unit -> (dimension, factor to the dimension's base unit, measuring system)
+QUANTITY_UNITS = {
+    "g": ("mass", 1.0, "metric"), "kg": ("mass", 1000.0, "metric"),
+    "oz": ("mass", 28.3495, "imperial"), "lb": ("mass", 453.592, "imperial"),
+    "ml": ("volume", 1.0, "metric"), "l": ("volume", 1000.0, "metric"),
+    "tsp": ("volume", 4.92892, "imperial"), "tbsp": ("volume", 14.7868, "imperial"),
+    "cup": ("volume", 236.588, "imperial"), "fl oz": ("volume", 29.5735, "imperial"),
+    "pint": ("volume", 473.176, "imperial"), "quart": ("volume", 946.353, "imperial"),
+    "gallon": ("volume", 3785.41, "imperial"),
+    # Units that only add up with themselves
+    "clove": ("clove", 1.0, None), "can": ("can", 1.0, None), "jar": ("jar", 1.0, None),
+    "bottle": ("bottle", 1.0, None), "package": ("package", 1.0, None), "slice": ("slice", 1.0, None),
+    "bunch": ("bunch", 1.0, None), "head": ("head", 1.0, None), "stick": ("stick", 1.0, None),
+    "sprig": ("sprig", 1.0, None), "stalk": ("stalk", 1.0, None), "pinch": ("pinch", 1.0, None),
+    "dash": ("dash", 1.0, None), "handful": ("handful", 1.0, None), "piece": ("count", 1.0, None),
+    "dozen": ("count", 12.0, None),
+}
+QUANTITY_UNIT_ALIASES = {
+    "gram": "g", "gr": "g", "kilogram": "kg", "kilo": "kg", "ounce": "oz", "pound": "lb", "lbs": "lb",
+    "milliliter": "ml", "millilitre": "ml", "liter": "l", "litre": "l", "teaspoon": "tsp", "tablespoon": "tbsp",
+    "tbs": "tbsp", "tbl": "tbsp", "c": "cup", "pt": "pint", "qt": "quart", "gal": "gallon", "pkg": "package",
+    "fluid ounce": "fl oz",
+}
+QUANTITY_NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "dozen": 12, "half": 0.5,
+}
+# Display units per (dimension, system), largest first: (unit, factor, smallest amount shown in that unit)
+QUANTITY_DISPLAY_UNITS = {
+    ("mass", "metric"): [("kg", 1000.0, 1), ("g", 1.0, 0)],
+    ("mass", "imperial"): [("lb", 453.592, 1), ("oz", 28.3495, 0)],
+    ("volume", "metric"): [("l", 1000.0, 1), ("ml", 1.0, 0)],
+    ("volume", "imperial"): [("cup", 236.588, 0.25), ("tbsp", 14.7868, 1), ("tsp", 4.92892, 0)],
+}
+
 # Define Models
 class Meal(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -74,6 +164,7 @@ class MealPlan(BaseModel):
     lunch: Optional[str] = None
     dinner: Optional[str] = None
     evening_snack: Optional[str] = None
+    sync_version: int = 0  # Change number of the last write; see /meal-plans/changes
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class MealPlanCreate(BaseModel):
@@ -84,15 +175,51 @@ class MealPlanCreate(BaseModel):
     dinner: Optional[str] = None
     evening_snack: Optional[str] = None
 
+class MealSummary(BaseModel):
+    id: str
+    name: str
+    ingredients: List[str] = Field(default_factory=list)
+    family_preferences: List[str] = Field(default_factory=list)
+
+class HydratedMealPlan(BaseModel):
+    date: str  # YYYY-MM-DD format
+    id: Optional[str] = None  # Meal plan ID, None when nothing is planned for the day
+    breakfast: Optional[MealSummary] = None
+    morning_snack: Optional[MealSummary] = None
+    lunch: Optional[MealSummary] = None
+    dinner: Optional[MealSummary] = None
+    evening_snack: Optional[MealSummary] = None
+
 class MealPlanUpdate(BaseModel):
     meal_slot: str  # breakfast, morning_snack, lunch, dinner, evening_snack
     meal_id: Optional[str] = None
 
+class PantryMatchRequest(BaseModel):
+    ingredients: List[str]  # Ingredients on hand
+    limit: int = 20
+    min_coverage: float = 0.0  # Fraction of a meal's ingredients that must be on hand
+    max_missing: Optional[int] = None  # Skip meals missing more ingredients than this
+
+class MealPlanSlotAssignment(BaseModel):
+    date: str  # YYYY-MM-DD
+    meal_slot: str  # breakfast, morning_snack, lunch, dinner, evening_snack
+    meal_id: Optional[str] = None  # None clears the slot
+
+class MealPlanBatchUpdate(BaseModel):
+    assignments: List[MealPlanSlotAssignment]
+
 class RecipeSuggestionRequest(BaseModel):
     prompt: str
     dietary_preferences: Optional[List[str]] = Field(default_factory=list)  # e.g., ["vegetarian", "low-carb"]
     cuisine_type: Optional[str] = None  # e.g., "Italian", "Asian", "Mexican"
     difficulty_level: Optional[str] = None  # e.g., "easy", "medium", "hard"
+    bypass_cache: bool = False  # Always ask the AI, refreshing any cached suggestion
+
+class RecipeSuggestionBatchRequest(BaseModel):
+    requests: List[RecipeSuggestionRequest]  # One entry per prompt
+    count: int = 1  # Candidate recipes per prompt
+    timeout_seconds: float = 30.0  # Per AI call
+    stream: bool = False  # Return newline-delimited JSON as each candidate completes
 
 class AIRecipeSuggestion(BaseModel):
     name: str
@@ -118,6 +245,14 @@ class IngredientCreate(BaseModel):
 class IngredientSearch(BaseModel):
     query: str
     limit: Optional[int] = 10
+    match: str = "substring"  # substring, prefix
+
+class GroceryItemSource(BaseModel):
+    date: str  # YYYY-MM-DD of the planned meal
+    slot: str
+    meal_id: str
+    meal_name: str
+    ingredient: str  # Ingredient line as written in the recipe
 
 class GroceryItem(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -128,12 +263,18 @@ class GroceryItem(BaseModel):
     from_recipe: Optional[str] = None  # meal_id if from a recipe
     quantity: Optional[str] = None  # "2 lbs", "1 cup", etc.
     notes: Optional[str] = None
+    sources: List[GroceryItemSource] = Field(default_factory=list)  # Plan slots that contributed this item
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class GroceryList(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     week_start_date: str  # YYYY-MM-DD format
+    start_date: Optional[str] = None  # Planned date range the items were generated from
+    end_date: Optional[str] = None
+    auto_update: bool = False  # Apply meal plan changes in the range to the items
+    version: int = 0  # Bumped on every item change; real-time events carry the version they produced
+    sync_version: int = 0  # Change number of the last write; see /grocery-lists/changes
     items: List[GroceryItem] = Field(default_factory=list)
     collaborators: List[str] = Field(default_factory=list)  # email addresses or user IDs
     created_by: Optional[str] = None
@@ -144,7 +285,9 @@ class GroceryList(BaseModel):
 class GroceryListCreate(BaseModel):
     name: str
     week_start_date: str
+    end_date: Optional[str] = None  # Defaults to the end of the week
     auto_generate: bool = True  # Whether to auto-populate from meal plans
+    auto_update: bool = True  # Keep generated items in step with later meal plan changes
 
 class GroceryItemCreate(BaseModel):
     name: str
@@ -178,6 +321,23 @@ class MonthlyMealPlanCopy(BaseModel):
     target_month: str  # YYYY-MM
     overwrite_existing: bool = False
 
+class MealPlanRangeCopy(BaseModel):
+    source_start_date: str  # YYYY-MM-DD
+    source_end_date: str    # YYYY-MM-DD
+    target_start_date: str  # YYYY-MM-DD
+    repeat: int = 1  # Number of consecutive copies of the source range (e.g. a rolling N-week template)
+    overwrite_existing: bool = False
+
+class AutoPlanRequest(BaseModel):
+    start_date: str  # YYYY-MM-DD
+    end_date: str    # YYYY-MM-DD
+    slots: List[str] = Field(default_factory=lambda: list(MEAL_SLOTS))  # Slots to fill
+    family_members: List[str] = Field(default_factory=list)  # Members to cover; empty means everyone
+    no_repeat_days: int = 7  # A meal is not planned again within this many days
+    overwrite_existing: bool = False  # Replace slots that already have a meal
+    ingredient_overlap_weight: float = 1.0  # Preference for meals sharing ingredients already on the plan
+    dry_run: bool = False  # Return the assignments without saving them
+
 class DateRangeQuery(BaseModel):
     start_date: str  # YYYY-MM-DD
     end_date: str    # YYYY-MM-DD
@@ -195,12 +355,827 @@ def parse_from_mongo(item):
         item['created_at'] = datetime.fromisoformat(item['created_at'])
     return item
 
+# Fast response serialization
+# List endpoints send stored documents straight to JSON bytes instead of building a model per
+# document and letting FastAPI validate and encode it again. Writes still go through the models,
+# so stored documents already have the right types; the output matches what response_model would send.
+_MISSING = object()
+
+def utc_z(timestamp: str) -> str:
+    """Pydantic writes UTC as Z, stored isoformat() strings end in +00:00"""
+    return timestamp[:-6] + "Z" if timestamp.endswith("+00:00") else timestamp
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return utc_z(value.isoformat())
+    return str(value)
+
+def dump_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, default=json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dump_json(content)
+
+@lru_cache(maxsize=None)
+def response_shape(model) -> tuple:
+    """(field, default, is_datetime, nested model) for each model field, worked out once per model"""
+    shape = []
+    for name, field in model.model_fields.items():
+        if field.default_factory in (list, dict):
+            default = field.default_factory()
+        elif field.is_required() or field.default_factory is not None:
+            default = _MISSING  # ids and timestamps are always stored
+        else:
+            default = field.default
+        nested = None
+        if get_origin(field.annotation) is list:
+            item_type = get_args(field.annotation)[0]
+            if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+                nested = item_type
+        shape.append((name, default, field.annotation is datetime, nested))
+    return tuple(shape)
+
+def shape_document(document: dict, shape: tuple) -> dict:
+    """Model fields of a stored document, with defaults for fields added after it was written"""
+    shaped = {}
+    for name, default, is_datetime, nested in shape:
+        value = document.get(name, default)
+        if value is _MISSING:
+            continue
+        if is_datetime and isinstance(value, str):
+            value = utc_z(value)
+        elif nested is not None and value:
+            nested_shape = response_shape(nested)
+            value = [shape_document(item, nested_shape) for item in value]
+        shaped[name] = value
+    return shaped
+
+def model_projection(model) -> dict:
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+def fast_model_response(documents: List[dict], model, response: Optional[Response] = None,
+                        headers: Optional[Dict[str, str]] = None) -> FastJSONResponse:
+    """JSON list of `model` built from stored documents; keeps headers already set on `response`"""
+    shape = response_shape(model)
+    merged_headers = dict(headers or {})
+    if response is not None:
+        merged_headers.update(
+            (key, value) for key, value in response.headers.items() if key not in ("content-length", "content-type")
+        )
+    return FastJSONResponse([shape_document(document, shape) for document in documents], headers=merged_headers)
+
+class IngredientCanonicalizer:
+    """Folds free-form ingredient text onto one canonical name.
+
+    "2 cups chopped onions", "Onion" and "onion, diced" all become "onion": quantities,
+    units, preparation words and trailing notes are stripped, the last word is
+    singularized and the result is mapped through the alias table. Patterns are
+    compiled once and results memoized, so repeated names cost a dict lookup.
+    """
+
+    FRACTIONS = {"¼": " 1/4", "½": " 1/2", "¾": " 3/4", "⅓": " 1/3", "⅔": " 2/3", "⅛": " 1/8"}
+
+    def __init__(self, aliases: Dict[str, str], cache_size: int = 4096):
+        self.aliases = dict(aliases)
+        number = r"(?:\d+(?:[./]\d+)?(?:\s+\d+/\d+)?)"
+        units = "|".join(INGREDIENT_UNITS)
+        self._quantity = re.compile(
+            rf"^(?:(?:{number}(?:\s*(?:-|to)\s*{number})?|an?(?=\s))\s*(?:(?:{units})\.?(?![a-z]))?\s*(?:of\s+)?"
+            rf"|(?:{units})\s+of\s+)"
+        )
+        self._preparations = re.compile(rf"\b(?:{'|'.join(INGREDIENT_PREPARATIONS)})\b")
+        self._notes = re.compile(r"\([^)]*\)|,.*$")
+        self._junk = re.compile(r"[^a-z0-9' -]+")
+        self.key = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def _canonicalize(self, name: str) -> str:
+        text = name.strip().lower()
+        for fraction, replacement in self.FRACTIONS.items():
+            text = text.replace(fraction, replacement)
+        text = self._notes.sub(" ", text).strip()
+        text = self._quantity.sub("", text)
+        text = self._preparations.sub(" ", text)
+        text = " ".join(self._junk.sub(" ", text).replace("-", " ").split())
+        if not text:
+            # Nothing but quantities/preparation words; keep the original text
+            return " ".join(name.strip().lower().split())
+        text = self.aliases.get(text, text)
+        words = text.split(" ")
+        words[-1] = self.singularize(words[-1])
+        text = " ".join(words)
+        return self.aliases.get(text, text)
+
+    @staticmethod
+    def singularize(word: str) -> str:
+        if word in SINGULAR_IRREGULARS:
+            return SINGULAR_IRREGULARS[word]
+        if len(word) <= 3 or word in SINGULAR_EXCEPTIONS or not word.endswith("s"):
+            return word
+        if word.endswith("ies") and len(word) > 4:
+            return word[:-1] if word[:-1] in SINGULAR_IE_WORDS else word[:-3] + "y"
+        if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+            return word[:-2]
+        if word.endswith(("ss", "us", "is")):
+            return word
+        return word[:-1]
+
+ingredient_canonicalizer = IngredientCanonicalizer(INGREDIENT_ALIASES)
+
+def ingredient_key(name: str) -> str:
+    """Canonical ingredient name used as the unique lookup key in the ingredients collection"""
+    return ingredient_canonicalizer.key(name)
+
+def canonical_ingredient_name(name: str) -> str:
+    """Display form of the canonical ingredient name (e.g. "2 cups chopped onions" -> "Onion")"""
+    return ingredient_key(name).title()
+
+async def record_ingredient_usage(ingredient_names: List[str]):
+    """Increment usage counts for a batch of ingredient names with a single bulk upsert"""
+    counts = Counter()
+    display_names = {}
+    for ingredient_name in ingredient_names:
+        if not ingredient_name or not ingredient_name.strip():
+            continue
+        key = ingredient_key(ingredient_name)
+        counts[key] += 1
+        display_names.setdefault(key, canonical_ingredient_name(ingredient_name))
+    
+    if not counts:
+        return
+    
+    operations = []
+    for key, count in counts.items():
+        new_ingredient = Ingredient(name=display_names[key], is_common=False)
+        insert_data = prepare_for_mongo(new_ingredient.dict(exclude={'usage_count'}))
+        insert_data['normalized_name'] = key
+        operations.append(UpdateOne(
+            {"normalized_name": key},
+            {"$inc": {"usage_count": count}, "$setOnInsert": insert_data},
+            upsert=True
+        ))
+    await db.ingredients.bulk_write(operations, ordered=False)
+    
+    # Refresh the autocomplete index with the stored documents
+    async for ingredient in db.ingredients.find({"normalized_name": {"$in": list(counts)}}, {"_id": 0}):
+        ingredient_index.upsert(ingredient)
+
+class AnalyticsCache:
+    """Small LRU of computed analytics results, cleared whenever meal plans change"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[dict]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        return None
+
+    def set(self, key: tuple, value: dict):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+analytics_cache = AnalyticsCache()
+
+def invalidate_meal_plan_caches():
+    """Drop results derived from meal plans; call after every meal plan write"""
+    analytics_cache.clear()
+
+# Sync protocol
+# Change numbers are handed out before the write that uses them, so writes can commit out of
+# order. Each writer reports its number as done once the write has finished; the counter keeps
+# the highest number up to which every allocation is done ("committed") plus the done numbers
+# above it. A number can stay unfinished forever if its process dies mid-write, so when
+# "committed" stops at a gap the counter records it ("stall": the gap, the allocated value and
+# when it was seen); numbers up to that value still unfinished SYNC_ABANDON_SECONDS later are
+# skipped as abandoned by the next write that finishes. A write slower than that is not sent by
+# the changes endpoints.
+SYNC_ABANDON_SECONDS = 300
+
+async def next_sync_version() -> int:
+    """Allocate the next global change number; every meal plan and grocery list write is stamped with one.
+    
+    Use it through sync_change() so the number is always reported as done.
+    """
+    counter = await db.sync_counters.find_one_and_update(
+        {"_id": "changes"},
+        {"$inc": {"value": 1}, "$setOnInsert": {"committed": 0, "done": [], "stall": None}},
+        projection={"value": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['value']
+
+def advance_sync_watermark(counter: dict, now: float) -> tuple:
+    """New (committed, stall) for a counter document: skip finished and abandoned numbers"""
+    done = set(counter['done'])
+    stall = counter.get('stall')
+    abandoned_up_to = stall['value'] if stall and now - stall['seen_at'] >= SYNC_ABANDON_SECONDS else 0
+    watermark = counter['committed']
+    while watermark < counter['value'] and (watermark + 1 in done or watermark + 1 <= abandoned_up_to):
+        watermark += 1
+    if watermark == counter['value']:
+        stall = None
+    elif not stall or stall['number'] != watermark + 1 or abandoned_up_to:
+        stall = {"number": watermark + 1, "value": counter['value'], "seen_at": now}
+    return watermark, stall
+
+async def finish_sync_version(sync_version: int):
+    """Mark a change number as done and move the committed number over any finished run"""
+    counter = await db.sync_counters.find_one_and_update(
+        {"_id": "changes"}, {"$addToSet": {"done": sync_version}}, return_document=ReturnDocument.AFTER
+    )
+    while counter:
+        committed = counter['committed']
+        watermark, stall = advance_sync_watermark(counter, datetime.now(timezone.utc).timestamp())
+        if watermark == committed and stall == counter.get('stall'):
+            return
+        # Only the writer that still sees the old committed number moves it; the others re-read
+        counter = await db.sync_counters.find_one_and_update(
+            {"_id": "changes", "committed": committed},
+            {"$set": {"committed": watermark, "stall": stall}, "$pull": {"done": {"$lte": watermark}}},
+            return_document=ReturnDocument.AFTER
+        ) or await db.sync_counters.find_one({"_id": "changes"})
+
+@asynccontextmanager
+async def sync_change():
+    """Allocate a change number for the write inside the block and report it as done afterwards.
+    
+    The number is reported even when the write fails, so a failed write cannot hold the
+    changes cursor back.
+    """
+    sync_version = await next_sync_version()
+    try:
+        yield sync_version
+    finally:
+        await finish_sync_version(sync_version)
+
+async def committed_sync_version() -> int:
+    """Highest change number at or below which every allocated write has finished"""
+    counter = await db.sync_counters.find_one({"_id": "changes"}, {"committed": 1})
+    return counter['committed'] if counter else 0
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Attach the ETag; return a 304 when If-None-Match shows the client already has this version"""
+    response.headers["ETag"] = etag
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+# Covering indexes for collection_etag: the read never touches the documents themselves
+MEAL_PLAN_ETAG_KEYS = [("date", ASCENDING), ("id", ASCENDING), ("sync_version", ASCENDING)]
+GROCERY_LIST_ETAG_KEYS = [("id", ASCENDING), ("sync_version", ASCENDING)]
+
+async def collection_etag(collection, query: dict, index_keys: list) -> str:
+    """ETag for the documents matching a query: a hash of every (id, sync_version) pair among them.
+    
+    Any write, insert or delete changes it, whatever order concurrent writes commit in. The
+    read projects and sorts on exactly the index_keys of a covering index, so the planner can
+    serve it from that index alone: one index key per matching document and no document
+    fetches or in-memory sort; for GET /grocery-lists that is still one key per list in the
+    collection. Without the index (ensure_indexes is best effort) it is a collection scan.
+    """
+    cursor = collection.find(query, {"_id": 0, **{field: 1 for field, _ in index_keys}})
+    stamps = [
+        (document['id'], document.get('sync_version', 0))
+        async for document in cursor.sort(index_keys)
+    ]
+    digest = hashlib.sha1(json.dumps(stamps).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+MAX_SYNC_CHANGES = 500
+
+async def changes_since(collection, since: int, limit: int) -> tuple:
+    """Documents written after change number `since`, oldest first, plus the cursor for the next call.
+    
+    Documents stamped by one bulk write share a change number, so a page never ends in the
+    middle of such a group. The cursor never moves past committed_sync_version, so a write that
+    commits after a later-numbered one is still picked up; documents above the cursor are sent
+    again on the next call.
+    """
+    committed = await committed_sync_version()
+    documents = await collection.find(
+        {"sync_version": {"$gt": since}}, {"_id": 0}
+    ).sort("sync_version", 1).limit(limit + 1).to_list(limit + 1)
+    has_more = len(documents) > limit
+    if has_more:
+        last_version = documents[limit - 1]['sync_version']
+        if documents[limit]['sync_version'] == last_version:
+            group = await collection.find({"sync_version": last_version}, {"_id": 0}).to_list(None)
+            documents = [doc for doc in documents[:limit] if doc['sync_version'] < last_version] + group
+            has_more = await collection.find_one({"sync_version": {"$gt": last_version}}, {"_id": 1}) is not None
+        else:
+            documents = documents[:limit]
+        version = min(documents[-1]['sync_version'], committed)
+    else:
+        # Everything written after `since` was read, so the cursor can move up to the committed number
+        version = committed
+    version = max(version, since)
+    # A page that cannot move the cursor is retried on the next poll, not straight away
+    return documents, version, has_more and version > since
+
+def meal_plan_slot_update(plan_date: str, slot_values: Dict[str, Optional[str]], sync_version: int) -> dict:
+    """Update document that sets only the given slots, creating the day's plan if needed"""
+    changes = {**slot_values, "sync_version": sync_version}
+    new_plan = prepare_for_mongo(MealPlan(date=plan_date).dict())
+    return {
+        "$set": changes,
+        "$setOnInsert": {key: value for key, value in new_plan.items() if key not in changes}
+    }
+
+async def copy_meal_plans(copies: List[tuple], overwrite_existing: bool) -> Dict[str, int]:
+    """Copy (source_plan, target_date) pairs with one read of the targets and one ordered bulk write"""
+    if not copies:
+        return {"copied_count": 0, "skipped_count": 0}
+    
+    target_dates = list({target_date for _, target_date in copies})
+    existing_dates = {
+        plan['date'] async for plan in db.meal_plans.find({"date": {"$in": target_dates}}, {"_id": 0, "date": 1})
+    }
+    
+    operations = []
+    slot_changes = {}
+    skipped_count = 0
+    async with sync_change() as sync_version:
+        for source_plan, target_date in copies:
+            if target_date in existing_dates and not overwrite_existing:
+                skipped_count += 1
+                continue
+            
+            new_plan = MealPlan(date=target_date, sync_version=sync_version, **{slot: source_plan.get(slot) for slot in MEAL_SLOTS})
+            operations.append(ReplaceOne({"date": target_date}, prepare_for_mongo(new_plan.dict()), upsert=True))
+            slot_changes.update({(target_date, slot): getattr(new_plan, slot) for slot in MEAL_SLOTS})
+        
+        if operations:
+            await db.meal_plans.bulk_write(operations, ordered=True)
+    if operations:
+        invalidate_meal_plan_caches()
+        await apply_plan_changes_to_grocery_lists(slot_changes)
+
+    return {"copied_count": len(operations), "skipped_count": skipped_count}
+
+# Ingredient autocomplete index
+def ingredient_rank_key(ingredient: dict):
+    """Sort key matching the search ordering: most used, then common, then alphabetical"""
+    return (-ingredient.get('usage_count', 0), not ingredient.get('is_common', False), ingredient['name'])
+
+class IngredientAutocompleteIndex:
+    """In-process ingredient index answering autocomplete queries without a database round trip.
+
+    Keeps a sorted array of lowercased names for prefix lookups (bisect) and a
+    rank-ordered array for substring lookups, which stop as soon as `limit`
+    matches are found.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._entries: Dict[str, dict] = {}  # lowercased name -> ingredient document
+        self._names_by_key: Dict[str, str] = {}  # canonical key -> lowercased name
+        self._keys: List[str] = []  # sorted lowercased names
+        self._ranked: List[tuple] = []  # sorted (rank key, lowercased name)
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def load(self, database):
+        """(Re)build the index from the ingredients collection"""
+        entries = {}
+        async for ingredient in database.ingredients.find({}, {"_id": 0}):
+            entries[ingredient['name'].lower()] = parse_from_mongo(ingredient)
+        self._entries = entries
+        self._names_by_key = {
+            doc.get('normalized_name') or ingredient_key(doc['name']): key for key, doc in entries.items()
+        }
+        self._keys = sorted(entries)
+        self._ranked = sorted((ingredient_rank_key(doc), key) for key, doc in entries.items())
+        self.loaded = True
+
+    def get(self, name: str) -> Optional[dict]:
+        return self._entries.get(self._names_by_key.get(ingredient_key(name), ""))
+
+    def upsert(self, ingredient: dict):
+        """Insert or refresh a single ingredient document"""
+        ingredient = parse_from_mongo({k: v for k, v in ingredient.items() if k != '_id'})
+        key = ingredient['name'].lower()
+        previous = self._entries.get(key)
+        if previous is not None:
+            ranked_pos = bisect.bisect_left(self._ranked, (ingredient_rank_key(previous), key))
+            del self._ranked[ranked_pos]
+        else:
+            bisect.insort(self._keys, key)
+        self._entries[key] = ingredient
+        self._names_by_key[ingredient.get('normalized_name') or ingredient_key(ingredient['name'])] = key
+        bisect.insort(self._ranked, (ingredient_rank_key(ingredient), key))
+
+    def search(self, query: str, limit: int = 10, match: str = "substring") -> List[dict]:
+        """Return up to `limit` ingredients whose name contains (or starts with) the query or its canonical form"""
+        needles = list(dict.fromkeys([query.strip().lower(), ingredient_key(query)]))
+        if limit <= 0:
+            return []
+        if match == "prefix":
+            matched = set()
+            for needle in needles:
+                start = bisect.bisect_left(self._keys, needle)
+                end = bisect.bisect_left(self._keys, needle + "\uffff")
+                matched.update(self._keys[start:end])
+            return heapq.nsmallest(limit, (self._entries[key] for key in matched), key=ingredient_rank_key)
+
+        results = []
+        for _, key in self._ranked:
+            if any(needle in key for needle in needles):
+                results.append(self._entries[key])
+                if len(results) >= limit:
+                    break
+        return results
+
+ingredient_index = IngredientAutocompleteIndex()
+
+# Meal search index
+SEARCH_STOP_WORDS = {"a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or", "until", "into", "then", "it", "is"}
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "ingredients": 2.0, "recipe": 1.0}
+
+def search_terms(text: str) -> List[str]:
+    """Lowercase word tokens with stop words removed and simple plurals folded"""
+    terms = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in SEARCH_STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+class MealSearchIndex:
+    """In-process BM25 index over meal names, ingredients and recipes (name and ingredients weighted higher)"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.loaded = False
+        self._postings: Dict[str, Dict[str, float]] = {}  # term -> meal id -> weighted term frequency
+        self._lengths: Dict[str, float] = {}  # meal id -> weighted document length
+        self._docs: Dict[str, dict] = {}  # meal id -> summary, ingredient keys and term set
+        self._vocabulary: List[str] = []  # sorted terms, for prefix expansion
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self._docs)
+
+    async def load(self, database):
+        """(Re)build the index from the meals collection"""
+        self.__init__()
+        async for meal in database.meals.find({}, {"_id": 0, "id": 1, "name": 1, "ingredients": 1, "recipe": 1, "family_preferences": 1}):
+            self._add(meal)
+        self._vocabulary = sorted(self._postings)
+        self.loaded = True
+
+    def upsert(self, meal: dict):
+        self._remove(meal['id'])
+        self._add(meal)
+
+    def remove(self, meal_id: str):
+        self._remove(meal_id)
+
+    def _add(self, meal: dict):
+        frequencies = Counter()
+        fields = {
+            "name": meal.get('name', ''),
+            "ingredients": " ".join(meal.get('ingredients', [])),
+            "recipe": meal.get('recipe', '') or ''
+        }
+        for field, text in fields.items():
+            for term in search_terms(text):
+                frequencies[term] += SEARCH_FIELD_WEIGHTS[field]
+        
+        meal_id = meal['id']
+        for term, frequency in frequencies.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                if self.loaded:
+                    bisect.insort(self._vocabulary, term)
+            self._postings[term][meal_id] = frequency
+        length = sum(frequencies.values())
+        self._lengths[meal_id] = length
+        self._total_length += length
+        self._docs[meal_id] = {
+            "summary": {
+                "id": meal_id,
+                "name": meal.get('name', ''),
+                "ingredients": meal.get('ingredients', []),
+                "family_preferences": meal.get('family_preferences', [])
+            },
+            "ingredient_keys": [ingredient_key(ing) for ing in meal.get('ingredients', [])],
+            "terms": set(frequencies)
+        }
+
+    def _remove(self, meal_id: str):
+        doc = self._docs.pop(meal_id, None)
+        if doc is None:
+            return
+        for term in doc['terms']:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(meal_id, None)
+                if not postings:
+                    del self._postings[term]
+                    if self.loaded:
+                        del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+        self._total_length -= self._lengths.pop(meal_id, 0.0)
+
+    def _expand(self, term: str) -> List[str]:
+        """Terms starting with `term`, so the word being typed still matches"""
+        start = bisect.bisect_left(self._vocabulary, term)
+        end = bisect.bisect_left(self._vocabulary, term + "\uffff")
+        return self._vocabulary[start:end]
+
+    def search(self, query: str, include: List[str], exclude: List[str]) -> List[tuple]:
+        """Return (score, summary) pairs ranked by BM25, filtered by ingredient inclusion/exclusion"""
+        include = [ingredient_key(name) for name in include if name.strip()]
+        exclude = [ingredient_key(name) for name in exclude if name.strip()]
+        
+        def allowed(meal_id: str) -> bool:
+            keys = self._docs[meal_id]['ingredient_keys']
+            return (all(any(wanted in key for key in keys) for wanted in include)
+                    and not any(unwanted in key for unwanted in exclude for key in keys))
+        
+        terms = search_terms(query)
+        if not terms:
+            matches = [(0.0, doc['summary']) for meal_id, doc in self._docs.items() if allowed(meal_id)]
+            return sorted(matches, key=lambda match: match[1]['name'].lower())
+        
+        doc_count = len(self._docs)
+        average_length = self._total_length / doc_count if doc_count else 1.0
+        scores: Dict[str, float] = {}
+        for position, term in enumerate(terms):
+            # The last word may still be being typed
+            expansions = self._expand(term) if position == len(terms) - 1 else [term]
+            for expanded in expansions:
+                postings = self._postings.get(expanded, {})
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for meal_id, frequency in postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._lengths[meal_id] / average_length)
+                    scores[meal_id] = scores.get(meal_id, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+        
+        matches = [(score, self._docs[meal_id]['summary']) for meal_id, score in scores.items() if allowed(meal_id)]
+        matches.sort(key=lambda match: (-match[0], match[1]['name'].lower()))
+        return matches
+
+meal_search_index = MealSearchIndex()
+
+# Pantry matcher
+class PantryMatcher:
+    """Meals as boolean ingredient rows so a pantry can be matched against the whole library at once.
+
+    Normalized ingredient names get integer column ids (seeded from the ingredients
+    collection); each meal is a row of a column-major NumPy boolean matrix. Matching
+    sums only the pantry's columns, so cost grows with pantry size, not vocabulary.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._column_by_key: Dict[str, int] = {}
+        self._names: List[str] = []  # column -> display name
+        self._matrix = np.zeros((64, 64), dtype=bool, order='F')
+        self._totals = np.zeros(64, dtype=np.int32)  # row -> ingredient count
+        self._row_by_meal: Dict[str, int] = {}
+        self._meals: List[Optional[dict]] = []  # row -> meal summary, None for free rows
+        self._free_rows: List[int] = []
+
+    def __len__(self):
+        return len(self._row_by_meal)
+
+    async def load(self, database):
+        """(Re)build the matcher from the ingredients and meals collections"""
+        self.__init__()
+        async for ingredient in database.ingredients.find({}, {"_id": 0, "name": 1}):
+            self._column(ingredient['name'], ingredient['name'].strip())
+        async for meal in database.meals.find({}, {"_id": 0, "id": 1, "name": 1, "ingredients": 1, "family_preferences": 1}):
+            self.upsert(meal)
+        self.loaded = True
+
+    def _column(self, name: str, display_name: Optional[str] = None) -> int:
+        """Column for an ingredient; shown as the ingredients-collection name, else the canonical name"""
+        key = ingredient_key(name)
+        column = self._column_by_key.get(key)
+        if column is None:
+            column = len(self._names)
+            self._column_by_key[key] = column
+            # Never a recipe's raw line: other meals sharing the column word it differently
+            self._names.append(display_name or canonical_ingredient_name(name))
+            if column >= self._matrix.shape[1]:
+                self._grow(columns=self._matrix.shape[1] * 2)
+        return column
+
+    def _grow(self, rows: Optional[int] = None, columns: Optional[int] = None):
+        rows = rows or self._matrix.shape[0]
+        columns = columns or self._matrix.shape[1]
+        matrix = np.zeros((rows, columns), dtype=bool, order='F')
+        matrix[:self._matrix.shape[0], :self._matrix.shape[1]] = self._matrix
+        self._matrix = matrix
+        if rows > len(self._totals):
+            self._totals = np.concatenate([self._totals, np.zeros(rows - len(self._totals), dtype=np.int32)])
+
+    def upsert(self, meal: dict):
+        columns = sorted({self._column(name) for name in meal.get('ingredients', []) if name.strip()})
+        row = self._row_by_meal.get(meal['id'])
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = len(self._meals)
+                self._meals.append(None)
+                if row >= self._matrix.shape[0]:
+                    self._grow(rows=self._matrix.shape[0] * 2)
+            self._row_by_meal[meal['id']] = row
+
+        self._matrix[row, :] = False
+        self._matrix[row, columns] = True
+        self._totals[row] = len(columns)
+        self._meals[row] = {
+            "id": meal['id'],
+            "name": meal.get('name', ''),
+            "ingredients": meal.get('ingredients', []),
+            "family_preferences": meal.get('family_preferences', [])
+        }
+
+    def remove(self, meal_id: str):
+        row = self._row_by_meal.pop(meal_id, None)
+        if row is None:
+            return
+        self._matrix[row, :] = False
+        self._totals[row] = 0
+        self._meals[row] = None
+        self._free_rows.append(row)
+
+    def pantry_columns(self, pantry: List[str]) -> tuple:
+        """Column ids for pantry items, as (exact columns, one column group per loosely matched item).
+        
+        An item with no exact column matches ingredients whose canonical name ends in it as whole
+        words ("rice" -> "brown rice"), never ones that merely start with it ("corn" -> "cornstarch").
+        """
+        exact = set()
+        loose_terms = []
+        for item in pantry:
+            key = ingredient_key(item)
+            if not key:
+                continue
+            if key in self._column_by_key:
+                exact.add(self._column_by_key[key])
+            else:
+                loose_terms.append(" " + key)
+        loose = []
+        for suffix in loose_terms:
+            group = [
+                column for name, column in self._column_by_key.items()
+                if name.endswith(suffix) and column not in exact
+            ]
+            if group:
+                loose.append(sorted(group))
+        return sorted(exact), loose
+
+    def match(self, pantry: List[str], limit: int, min_coverage: float = 0.0, max_missing: Optional[int] = None) -> List[dict]:
+        row_count = len(self._meals)
+        exact, loose = self.pantry_columns(pantry)
+        exact_mask = np.zeros(self._matrix.shape[1], dtype=bool)
+        exact_mask[exact] = True
+
+        on_hand = self._matrix[:row_count, exact].sum(axis=1, dtype=np.int32) if exact else np.zeros(row_count, dtype=np.int32)
+        # A loosely matched item covers at most one ingredient per meal, and each ingredient only once
+        loose_columns = sorted({column for group in loose for column in group})
+        loose_position = {column: position for position, column in enumerate(loose_columns)}
+        loose_covered = np.zeros((row_count, len(loose_columns)), dtype=bool)
+        for group in loose:
+            positions = np.array([loose_position[column] for column in group])
+            available = self._matrix[:row_count, group] & ~loose_covered[:, positions]
+            covered_rows = np.flatnonzero(available.any(axis=1))
+            loose_covered[covered_rows, positions[available[covered_rows].argmax(axis=1)]] = True
+        on_hand += loose_covered.sum(axis=1, dtype=np.int32)
+
+        totals = self._totals[:row_count]
+        coverage = np.divide(on_hand, totals, out=np.zeros(row_count, dtype=np.float64), where=totals > 0)
+        missing = totals - on_hand
+
+        eligible = (totals > 0) & (on_hand > 0) & (coverage >= min_coverage)
+        if max_missing is not None:
+            eligible &= missing <= max_missing
+        rows = np.flatnonzero(eligible)
+        # Highest coverage first, then fewest missing ingredients
+        rows = rows[np.lexsort((missing[rows], -coverage[rows]))][:limit]
+
+        results = []
+        for row in rows:
+            meal = self._meals[row]
+            covered = exact_mask.copy()
+            covered[[column for column, position in loose_position.items() if loose_covered[row, position]]] = True
+            missing_columns = np.flatnonzero(self._matrix[row] & ~covered)
+            results.append({
+                **meal,
+                "coverage": round(float(coverage[row]), 4),
+                "matched_count": int(on_hand[row]),
+                "missing_count": int(missing[row]),
+                "missing_ingredients": [self._names[column] for column in missing_columns]
+            })
+        return results
+
+pantry_matcher = PantryMatcher()
+
+def index_meal(meal: dict):
+    """Add or refresh a meal in the in-process meal indexes"""
+    meal_search_index.upsert(meal)
+    pantry_matcher.upsert(meal)
+
+def unindex_meal(meal_id: str):
+    """Drop a meal from the in-process meal indexes"""
+    meal_search_index.remove(meal_id)
+    pantry_matcher.remove(meal_id)
+
 # Meal endpoints
+MEAL_FIELDS = set(Meal.model_fields)
+MEAL_PAGE_SORT = [("created_at", ASCENDING), ("id", ASCENDING)]
+
+def encode_page_cursor(document: dict) -> str:
+    """Opaque keyset cursor pointing just past the given document"""
+    # Legacy meals without created_at sort first, as null
+    position = json.dumps([document.get('created_at'), document['id']])
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_page_cursor(cursor: str) -> dict:
+    """Turn a page cursor back into a keyset query on (created_at, id)"""
+    try:
+        created_at, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if created_at is None:
+        # $gt: null matches nothing, so every dated meal is named explicitly
+        return {"$or": [
+            {"created_at": None, "id": {"$gt": last_id}},
+            {"created_at": {"$ne": None}}
+        ]}
+    return {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": last_id}}
+    ]}
+
 @api_router.get("/meals", response_model=List[Meal])
-async def get_meals():
-    """Get all meals"""
-    meals = await db.meals.find().to_list(1000)
-    return [Meal(**parse_from_mongo(meal)) for meal in meals]
+async def get_meals(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False
+):
+    """Get meals ordered by creation time.
+
+    Pass `limit` to page through the library; the cursor for the next page is
+    returned in the X-Next-Cursor header. `fields` (comma-separated) limits the
+    returned fields, and `stream=true` returns newline-delimited JSON as documents
+    are read from the database.
+    """
+    if limit is not None and (limit < 1 or limit > 1000):
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 1000")
+    
+    projection = {"_id": 0}
+    shape = response_shape(Meal)
+    if fields:
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested - MEAL_FIELDS
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown meal fields: {', '.join(sorted(unknown))}")
+        # id and created_at are always needed for paging
+        projection.update({field: 1 for field in requested | {"id", "created_at"}})
+        shape = tuple(entry for entry in shape if entry[0] in projection)
+    
+    query = decode_page_cursor(cursor) if cursor else {}
+    meals_cursor = db.meals.find(query, projection).sort(MEAL_PAGE_SORT)
+    if limit:
+        meals_cursor = meals_cursor.limit(limit)
+    
+    if stream:
+        async def stream_meals():
+            async for meal in meals_cursor:
+                yield json.dumps(shape_document(meal, shape), default=str) + "\n"
+        return StreamingResponse(stream_meals(), media_type="application/x-ndjson")
+    
+    meals = await meals_cursor.to_list(None)
+    headers = {}
+    if limit and len(meals) == limit:
+        headers["X-Next-Cursor"] = encode_page_cursor(meals[-1])
+    
+    if fields:
+        # Partial documents skip Meal validation but share its timestamp format
+        return FastJSONResponse(content=[shape_document(meal, shape) for meal in meals], headers=headers)
+    
+    return fast_model_response(meals, Meal, headers=headers)
 
 @api_router.post("/meals", response_model=Meal)
 async def create_meal(meal_input: MealCreate):
@@ -221,11 +1196,10 @@ async def create_meal(meal_input: MealCreate):
         raise HTTPException(status_code=422, detail="Recipe cannot be empty if provided")
     
     # Update ingredient usage counts
-    for ingredient_name in valid_ingredients:
-        try:
-            await create_or_increment_ingredient(IngredientCreate(name=ingredient_name))
-        except Exception as e:
-            logger.warning(f"Failed to update ingredient usage for '{ingredient_name}': {str(e)}")
+    try:
+        await record_ingredient_usage(valid_ingredients)
+    except Exception as e:
+        logger.warning(f"Failed to update ingredient usage: {str(e)}")
     
     meal_dict = meal_input.dict()
     # Update ingredients to only include non-empty ones
@@ -233,8 +1207,67 @@ async def create_meal(meal_input: MealCreate):
     meal_obj = Meal(**meal_dict)
     meal_data = prepare_for_mongo(meal_obj.dict())
     await db.meals.insert_one(meal_data)
+    index_meal(meal_obj.dict())
     return meal_obj
 
+@api_router.get("/meals/search")
+async def search_meals(
+    q: str = "",
+    include: Optional[str] = None,
+    exclude: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+):
+    """Ranked full-text search over meal names, ingredients and recipes.
+
+    `include` / `exclude` are comma-separated ingredient names the meal must
+    (not) contain.
+    """
+    try:
+        if limit < 1 or limit > 100 or offset < 0:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 100 and offset non-negative")
+        
+        if not meal_search_index.loaded:
+            await meal_search_index.load(db)
+        
+        matches = meal_search_index.search(
+            q,
+            include.split(',') if include else [],
+            exclude.split(',') if exclude else []
+        )
+        return {
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+            "results": [{**summary, "score": round(score, 4)} for score, summary in matches[offset:offset + limit]]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to search meals: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search meals")
+
+@api_router.post("/meals/what-can-i-cook")
+async def match_pantry(pantry: PantryMatchRequest):
+    """Rank meals by how many of their ingredients are on hand, listing what is missing"""
+    try:
+        if not any(item.strip() for item in pantry.ingredients):
+            raise HTTPException(status_code=422, detail="At least one ingredient is required")
+        if pantry.limit < 1 or pantry.limit > 100:
+            raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+        if not pantry_matcher.loaded:
+            await pantry_matcher.load(db)
+
+        return pantry_matcher.match(pantry.ingredients, pantry.limit, pantry.min_coverage, pantry.max_missing)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to match pantry: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to match pantry")
+
 @api_router.get("/meals/{meal_id}", response_model=Meal)
 async def get_meal(meal_id: str):
     """Get a specific meal by ID"""
@@ -265,12 +1298,23 @@ async def update_meal(meal_id: str, meal_input: MealCreate):
     if meal_input.recipe and not meal_input.recipe.strip():
         raise HTTPException(status_code=422, detail="Recipe cannot be empty if provided")
     
+    # Update usage counts for ingredients added by this edit
+    previous_keys = {ingredient_key(ing) for ing in meal.get('ingredients', [])}
+    added_ingredients = [ing for ing in valid_ingredients if ingredient_key(ing) not in previous_keys]
+    try:
+        await record_ingredient_usage(added_ingredients)
+    except Exception as e:
+        logger.warning(f"Failed to update ingredient usage: {str(e)}")
+    
     meal_dict = meal_input.dict()
     # Update ingredients to only include non-empty ones
     meal_dict['ingredients'] = valid_ingredients
     updated_meal = Meal(id=meal_id, **meal_dict)
     meal_data = prepare_for_mongo(updated_meal.dict())
     await db.meals.replace_one({"id": meal_id}, meal_data)
+    index_meal(updated_meal.dict())
+    invalidate_meal_plan_caches()
+    await apply_plan_changes_to_grocery_lists(meal_id=meal_id)
     return updated_meal
 
 @api_router.delete("/meals/{meal_id}")
@@ -279,12 +1323,46 @@ async def delete_meal(meal_id: str):
     result = await db.meals.delete_one({"id": meal_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Meal not found")
-    return {"message": "Meal deleted successfully"}
+    unindex_meal(meal_id)
+    
+    # Clear the meal from every planned slot in one round trip
+    async with sync_change() as sync_version:
+        cleanup = await db.meal_plans.bulk_write(
+            [UpdateMany({slot: meal_id}, {"$set": {slot: None, "sync_version": sync_version}}) for slot in MEAL_SLOTS],
+            ordered=False
+        )
+    invalidate_meal_plan_caches()
+    await apply_plan_changes_to_grocery_lists(meal_id=meal_id, deleted=True)
+    return {"message": "Meal deleted successfully", "cleared_slots": cleanup.modified_count}
+
+@api_router.get("/meals/{meal_id}/usage")
+async def get_meal_usage(meal_id: str):
+    """Get the dates and slots where a meal is planned"""
+    plans = await db.meal_plans.find(
+        {"$or": [{slot: meal_id} for slot in MEAL_SLOTS]},
+        {"_id": 0, "date": 1, **{slot: 1 for slot in MEAL_SLOTS}}
+    ).sort("date", 1).to_list(None)
+    
+    slot_counts = {slot: 0 for slot in MEAL_SLOTS}
+    usage = []
+    for plan in plans:
+        slots = [slot for slot in MEAL_SLOTS if plan.get(slot) == meal_id]
+        for slot in slots:
+            slot_counts[slot] += 1
+        usage.append({"date": plan['date'], "slots": slots})
+    
+    return {
+        "meal_id": meal_id,
+        "total": sum(slot_counts.values()),
+        "slot_counts": slot_counts,
+        "dates": usage
+    }
 
 # Meal Plan endpoints
 @api_router.get("/meal-plans", response_model=List[MealPlan])
-async def get_meal_plans(week_start: Optional[str] = None, start_date: Optional[str] = None, end_date: Optional[str] = None):
-    """Get meal plans, optionally filtered by week or date range"""
+async def get_meal_plans(request: Request, response: Response, week_start: Optional[str] = None,
+                         start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Get meal plans, optionally filtered by week or date range (304 if the ETag still matches)"""
     query = {}
     
     if week_start:
@@ -307,12 +1385,16 @@ async def get_meal_plans(week_start: Optional[str] = None, start_date: Optional[
             }
         }
     
-    meal_plans = await db.meal_plans.find(query).sort("date", 1).to_list(1000)
-    return [MealPlan(**parse_from_mongo(plan)) for plan in meal_plans]
+    unchanged = not_modified(request, response, await collection_etag(db.meal_plans, query, MEAL_PLAN_ETAG_KEYS))
+    if unchanged:
+        return unchanged
+    
+    meal_plans = await db.meal_plans.find(query, model_projection(MealPlan)).sort("date", 1).to_list(1000)
+    return fast_model_response(meal_plans, MealPlan, response)
 
 @api_router.get("/meal-plans/month/{year}/{month}", response_model=List[MealPlan])
-async def get_meal_plans_by_month(year: int, month: int):
-    """Get all meal plans for a specific month"""
+async def get_meal_plans_by_month(year: int, month: int, request: Request, response: Response):
+    """Get all meal plans for a specific month (304 if the ETag still matches)"""
     try:
         from calendar import monthrange
         import datetime
@@ -329,13 +1411,319 @@ async def get_meal_plans_by_month(year: int, month: int):
             }
         }
         
-        meal_plans = await db.meal_plans.find(query).sort("date", 1).to_list(1000)
-        return [MealPlan(**parse_from_mongo(plan)) for plan in meal_plans]
+        unchanged = not_modified(request, response, await collection_etag(db.meal_plans, query, MEAL_PLAN_ETAG_KEYS))
+        if unchanged:
+            return unchanged
         
+        meal_plans = await db.meal_plans.find(query, model_projection(MealPlan)).sort("date", 1).to_list(1000)
+        return fast_model_response(meal_plans, MealPlan, response)
+    
     except Exception as e:
         logger.error(f"Failed to get monthly meal plans: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get monthly meal plans")
 
+async def hydrate_meal_plans(start_date: date, end_date: date) -> List[HydratedMealPlan]:
+    """Return every day in the range with meal summaries embedded in its slots (two queries)"""
+    from datetime import timedelta
+    
+    plans = await db.meal_plans.find(
+        {"date": {"$gte": start_date.isoformat(), "$lte": end_date.isoformat()}},
+        {"_id": 0, "id": 1, "date": 1, **{slot: 1 for slot in MEAL_SLOTS}}
+    ).to_list(None)
+    plans_by_date = {plan['date']: plan for plan in plans}
+    
+    meal_ids = {plan[slot] for plan in plans for slot in MEAL_SLOTS if plan.get(slot)}
+    meals_by_id = {}
+    if meal_ids:
+        async for meal in db.meals.find(
+            {"id": {"$in": list(meal_ids)}},
+            {"_id": 0, "id": 1, "name": 1, "ingredients": 1, "family_preferences": 1}
+        ):
+            meals_by_id[meal['id']] = MealSummary(**meal)
+    
+    days = []
+    for offset in range((end_date - start_date).days + 1):
+        day = (start_date + timedelta(days=offset)).isoformat()
+        plan = plans_by_date.get(day, {})
+        # Slots pointing at deleted meals come back empty
+        days.append(HydratedMealPlan(
+            date=day,
+            id=plan.get('id'),
+            **{slot: meals_by_id.get(plan.get(slot)) for slot in MEAL_SLOTS}
+        ))
+    return days
+
+@api_router.get("/meal-plans/week/{week_start}/hydrated", response_model=List[HydratedMealPlan])
+async def get_hydrated_week(week_start: str):
+    """Get the seven days starting at week_start with planned meals embedded"""
+    try:
+        from datetime import timedelta
+        
+        try:
+            start_date = date.fromisoformat(week_start)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="week_start must be in YYYY-MM-DD format")
+        
+        return await hydrate_meal_plans(start_date, start_date + timedelta(days=6))
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get hydrated week: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get hydrated week")
+
+@api_router.get("/meal-plans/month/{year}/{month}/hydrated", response_model=List[HydratedMealPlan])
+async def get_hydrated_month(year: int, month: int):
+    """Get every day of a month with planned meals embedded"""
+    try:
+        from calendar import monthrange
+        
+        try:
+            first_day = date(year, month, 1)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid year or month")
+        last_day = date(year, month, monthrange(year, month)[1])
+        
+        return await hydrate_meal_plans(first_day, last_day)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get hydrated month: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get hydrated month")
+
+# Meal planner
+SLOT_KEYWORDS = {
+    "breakfast": ["pancake", "waffle", "oat", "porridge", "cereal", "granola", "toast", "omelet", "omelette", "egg", "bagel", "muffin", "smoothie", "breakfast"],
+    "morning_snack": ["snack", "fruit", "yogurt", "bar", "smoothie", "muffin", "nuts", "trail mix"],
+    "lunch": ["salad", "sandwich", "wrap", "soup", "bowl", "lunch", "burger", "quesadilla"],
+    "dinner": ["curry", "roast", "stew", "pasta", "steak", "casserole", "lasagna", "stir fry", "dinner", "chicken", "salmon", "tacos"],
+    "evening_snack": ["snack", "cookie", "popcorn", "fruit", "yogurt", "pudding", "dessert", "chips", "dip", "cheese"],
+}
+
+class MealPlannerMatrix:
+    """Dense per-meal feature matrices used to score every meal against a slot in one vector operation"""
+
+    def __init__(self, meals: List[dict], slot_history: Dict[str, Counter], members: List[str]):
+        self.meal_ids = [meal['id'] for meal in meals]
+        self.meal_names = [meal.get('name', '') for meal in meals]
+        self.row_by_id = {meal_id: row for row, meal_id in enumerate(self.meal_ids)}
+        meal_count = len(meals)
+        
+        # Ingredient incidence (meals x ingredients), column-major so picking a meal updates a few columns cheaply
+        ingredient_columns = {}
+        rows, columns = [], []
+        for row, meal in enumerate(meals):
+            for key in {ingredient_key(ing) for ing in meal.get('ingredients', []) if ing.strip()}:
+                rows.append(row)
+                columns.append(ingredient_columns.setdefault(key, len(ingredient_columns)))
+        self.ingredients = np.zeros((meal_count, len(ingredient_columns)), dtype=np.float32, order='F')
+        self.ingredients[rows, columns] = 1.0
+        self.ingredient_totals = np.maximum(self.ingredients.sum(axis=1), 1.0)
+        
+        # Family preferences (meals x members)
+        member_columns = {member: column for column, member in enumerate(members)}
+        self.preferences = np.zeros((meal_count, len(members)), dtype=np.float32)
+        for row, meal in enumerate(meals):
+            for member in meal.get('family_preferences', []):
+                if member in member_columns:
+                    self.preferences[row, member_columns[member]] = 1.0
+        
+        # Slot suitability (meals x slots): share of past plans in each slot plus name keywords
+        self.suitability = np.zeros((meal_count, len(MEAL_SLOTS)), dtype=np.float32)
+        for row, meal in enumerate(meals):
+            history = slot_history.get(meal['id'])
+            total = sum(history.values()) if history else 0
+            name = meal.get('name', '').lower()
+            for column, slot in enumerate(MEAL_SLOTS):
+                if total:
+                    self.suitability[row, column] += history[slot] / total
+                if any(keyword in name for keyword in SLOT_KEYWORDS[slot]):
+                    self.suitability[row, column] += 0.5
+
+def plan_meal_slots(matrix: MealPlannerMatrix, targets: List[tuple], fixed: Dict[tuple, str],
+                    no_repeat_days: int, overlap_weight: float) -> Dict[tuple, str]:
+    """Greedily pick the best meal for each (date, slot) target in chronological order.
+
+    `fixed` holds assignments that already exist (including days on either side of the
+    range that fall inside the no-repeat window); they count towards coverage, ingredient
+    overlap and repeats. Targets with no eligible meal are left out of the result.
+    """
+    meal_count = len(matrix.meal_ids)
+    window = max(no_repeat_days, 1)  # A meal is never planned twice on one day
+    chosen_ingredients = np.zeros(matrix.ingredients.shape[1], dtype=bool)
+    overlap_counts = np.zeros(meal_count, dtype=np.float32)
+    member_counts = np.zeros(matrix.preferences.shape[1], dtype=np.float32)
+    # Nearest use of each meal at or before the day being planned, and nearest fixed use after it
+    last_used = np.full(meal_count, -10 ** 6, dtype=np.int64)
+    next_used = np.full(meal_count, 10 ** 6, dtype=np.int64)
+    
+    def use(row: int):
+        nonlocal overlap_counts
+        new_columns = np.flatnonzero((matrix.ingredients[row] > 0) & ~chosen_ingredients)
+        if new_columns.size:
+            chosen_ingredients[new_columns] = True
+            overlap_counts += matrix.ingredients[:, new_columns].sum(axis=1)
+        member_counts[:] += matrix.preferences[row]
+    
+    fixed_uses = sorted(
+        (day, matrix.row_by_id[meal_id]) for (day, _), meal_id in fixed.items() if meal_id in matrix.row_by_id
+    )
+    upcoming_days: Dict[int, List[int]] = {}
+    for day, row in fixed_uses:
+        use(row)
+        upcoming_days.setdefault(row, []).append(day)
+    for row, days in upcoming_days.items():
+        next_used[row] = days[0]
+    passed = 0
+    
+    assignments = {}
+    for day, slot in sorted(targets, key=lambda target: (target[0], MEAL_SLOTS.index(target[1]))):
+        # Fixed uses up to this day now lie behind it
+        while passed < len(fixed_uses) and fixed_uses[passed][0] <= day:
+            used_day, row = fixed_uses[passed]
+            passed += 1
+            last_used[row] = max(last_used[row], used_day)
+            upcoming_days[row].pop(0)
+            next_used[row] = upcoming_days[row][0] if upcoming_days[row] else 10 ** 6
+        
+        # Diminishing returns so every family member gets covered
+        coverage = matrix.preferences @ (1.0 / (1.0 + member_counts))
+        overlap = overlap_counts / matrix.ingredient_totals
+        scores = coverage + 2.0 * matrix.suitability[:, MEAL_SLOTS.index(slot)] + overlap_weight * overlap
+        # Hard no-repeat window in both directions
+        scores[(day - last_used < window) | (next_used - day < window)] = -np.inf
+        
+        row = int(np.argmax(scores))
+        if not np.isfinite(scores[row]):
+            continue
+        assignments[(day, slot)] = matrix.meal_ids[row]
+        use(row)
+        last_used[row] = day
+    return assignments
+
+SLOT_HISTORY_DAYS = 365
+
+async def meal_slot_history(start_date: date) -> Dict[str, Counter]:
+    """How often each meal was planned in each slot over the year before `start_date` (cached until plans change)"""
+    from datetime import timedelta
+    
+    history_start = (start_date - timedelta(days=SLOT_HISTORY_DAYS)).isoformat()
+    cache_key = ("slot-history", history_start, start_date.isoformat())
+    cached = analytics_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    slot_history: Dict[str, Counter] = {}
+    async for plan in db.meal_plans.find(
+        {"date": {"$gte": history_start, "$lt": start_date.isoformat()}},
+        {"_id": 0, **{slot: 1 for slot in MEAL_SLOTS}}
+    ):
+        for slot in MEAL_SLOTS:
+            if plan.get(slot):
+                slot_history.setdefault(plan[slot], Counter())[slot] += 1
+    analytics_cache.set(cache_key, slot_history)
+    return slot_history
+
+@api_router.post("/meal-plans/auto-plan")
+async def auto_plan_meals(plan_request: AutoPlanRequest):
+    """Fill empty meal slots in a date range from the meal library in one shot"""
+    try:
+        import time
+        from datetime import timedelta
+        
+        try:
+            start_date = date.fromisoformat(plan_request.start_date)
+            end_date = date.fromisoformat(plan_request.end_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+        if end_date < start_date or (end_date - start_date).days > 92:
+            raise HTTPException(status_code=400, detail="Date range must be between 1 and 93 days")
+        invalid_slots = set(plan_request.slots) - set(MEAL_SLOTS)
+        if invalid_slots or not plan_request.slots:
+            raise HTTPException(status_code=400, detail="Invalid meal slot")
+        members = plan_request.family_members or list(FAMILY_MEMBERS)
+        if set(members) - set(FAMILY_MEMBERS):
+            raise HTTPException(status_code=400, detail="Unknown family member")
+        if plan_request.no_repeat_days < 0:
+            raise HTTPException(status_code=400, detail="no_repeat_days cannot be negative")
+        
+        started = time.perf_counter()
+        meals = await db.meals.find(
+            {}, {"_id": 0, "id": 1, "name": 1, "ingredients": 1, "family_preferences": 1}
+        ).to_list(None)
+        if not meals:
+            raise HTTPException(status_code=404, detail="No meals available to plan with")
+        
+        # Recent slot history, for suitability
+        slot_history = await meal_slot_history(start_date)
+        
+        # Existing plans in the range, plus the no-repeat window on either side
+        window_start = start_date - timedelta(days=plan_request.no_repeat_days)
+        window_end = end_date + timedelta(days=plan_request.no_repeat_days)
+        existing_plans = await db.meal_plans.find(
+            {"date": {"$gte": window_start.isoformat(), "$lte": window_end.isoformat()}},
+            {"_id": 0, "date": 1, **{slot: 1 for slot in MEAL_SLOTS}}
+        ).to_list(None)
+        
+        range_days = (end_date - start_date).days + 1
+        fixed = {}
+        for plan in existing_plans:
+            day = (date.fromisoformat(plan['date']) - start_date).days
+            replaceable = plan_request.overwrite_existing and 0 <= day < range_days
+            for slot in MEAL_SLOTS:
+                if plan.get(slot) and not (replaceable and slot in plan_request.slots):
+                    fixed[(day, slot)] = plan[slot]
+        
+        targets = [
+            (day, slot)
+            for day in range(range_days)
+            for slot in plan_request.slots
+            if (day, slot) not in fixed
+        ]
+        
+        matrix = MealPlannerMatrix(meals, slot_history, members)
+        assignments = plan_meal_slots(
+            matrix, targets, fixed, plan_request.no_repeat_days, plan_request.ingredient_overlap_weight
+        )
+        
+        # One targeted upsert per day, applied in a single bulk write
+        slots_by_date: Dict[str, Dict[str, str]] = {}
+        for (day, slot), meal_id in assignments.items():
+            slots_by_date.setdefault((start_date + timedelta(days=day)).isoformat(), {})[slot] = meal_id
+        
+        if slots_by_date and not plan_request.dry_run:
+            async with sync_change() as sync_version:
+                await db.meal_plans.bulk_write([
+                    UpdateOne({"date": plan_date}, meal_plan_slot_update(plan_date, slot_values, sync_version), upsert=True)
+                    for plan_date, slot_values in slots_by_date.items()
+                ], ordered=False)
+            invalidate_meal_plan_caches()
+            await apply_plan_changes_to_grocery_lists({
+                (plan_date, slot): meal_id
+                for plan_date, slot_values in slots_by_date.items()
+                for slot, meal_id in slot_values.items()
+            })
+        
+        names_by_id = dict(zip(matrix.meal_ids, matrix.meal_names))
+        return {
+            "assignments": [
+                {"date": plan_date, "slot": slot, "meal_id": meal_id, "meal_name": names_by_id.get(meal_id)}
+                for plan_date, slot_values in sorted(slots_by_date.items())
+                for slot, meal_id in sorted(slot_values.items(), key=lambda item: MEAL_SLOTS.index(item[0]))
+            ],
+            "filled_count": len(assignments),
+            "unfilled_count": len(targets) - len(assignments),
+            "dry_run": plan_request.dry_run,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to auto-plan meals: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to auto-plan meals")
+
 @api_router.post("/meal-plans/copy-week")
 async def copy_meal_plan_week(copy_request: MealPlanCopy):
     """Copy meal plans from one week to another"""
@@ -360,39 +1748,15 @@ async def copy_meal_plan_week(copy_request: MealPlanCopy):
         target_start = datetime.fromisoformat(copy_request.target_week_start).date()
         date_diff = (target_start - source_start).days
         
-        copied_count = 0
-        skipped_count = 0
-        
+        copies = []
         for source_plan in source_plans:
-            # Calculate target date
             source_date = datetime.fromisoformat(source_plan['date']).date()
             target_date = source_date + timedelta(days=date_diff)
-            
-            # Check if target date already has a meal plan
-            existing_target = await db.meal_plans.find_one({"date": target_date.isoformat()})
-            
-            if existing_target and not copy_request.overwrite_existing:
-                skipped_count += 1
-                continue
-            
-            # Create new meal plan for target date
-            new_plan = MealPlan(
-                date=target_date.isoformat(),
-                breakfast=source_plan.get('breakfast'),
-                morning_snack=source_plan.get('morning_snack'),
-                lunch=source_plan.get('lunch'),
-                dinner=source_plan.get('dinner'),
-                evening_snack=source_plan.get('evening_snack')
-            )
-            
-            # Save to database
-            plan_data = prepare_for_mongo(new_plan.dict())
-            if existing_target:
-                await db.meal_plans.replace_one({"date": target_date.isoformat()}, plan_data)
-            else:
-                await db.meal_plans.insert_one(plan_data)
-            
-            copied_count += 1
+            copies.append((source_plan, target_date.isoformat()))
+        
+        result = await copy_meal_plans(copies, copy_request.overwrite_existing)
+        copied_count = result["copied_count"]
+        skipped_count = result["skipped_count"]
         
         return {
             "message": f"Successfully copied {copied_count} meal plans, skipped {skipped_count}",
@@ -440,45 +1804,24 @@ async def copy_meal_plan_month(copy_request: MonthlyMealPlanCopy):
         if not source_plans:
             raise HTTPException(status_code=404, detail="No meal plans found for source month")
         
-        copied_count = 0
-        skipped_count = 0
+        copies = []
+        unmapped_count = 0
         
         for source_plan in source_plans:
-            source_date = datetime.fromisoformat(source_plan['date']).date()
+            source_date = datetime.date.fromisoformat(source_plan['date'])
             source_day = source_date.day
             
             # Skip if target month doesn't have this day (e.g., Feb 29, 30, 31)
             if source_day > target_last_day:
-                skipped_count += 1
+                unmapped_count += 1
                 continue
                 
             target_date = datetime.date(target_year, target_month, source_day)
-            
-            # Check if target date already has a meal plan
-            existing_target = await db.meal_plans.find_one({"date": target_date.isoformat()})
-            
-            if existing_target and not copy_request.overwrite_existing:
-                skipped_count += 1
-                continue
-            
-            # Create new meal plan for target date
-            new_plan = MealPlan(
-                date=target_date.isoformat(),
-                breakfast=source_plan.get('breakfast'),
-                morning_snack=source_plan.get('morning_snack'),
-                lunch=source_plan.get('lunch'),
-                dinner=source_plan.get('dinner'),
-                evening_snack=source_plan.get('evening_snack')
-            )
-            
-            # Save to database
-            plan_data = prepare_for_mongo(new_plan.dict())
-            if existing_target:
-                await db.meal_plans.replace_one({"date": target_date.isoformat()}, plan_data)
-            else:
-                await db.meal_plans.insert_one(plan_data)
-            
-            copied_count += 1
+            copies.append((source_plan, target_date.isoformat()))
+        
+        result = await copy_meal_plans(copies, copy_request.overwrite_existing)
+        copied_count = result["copied_count"]
+        skipped_count = result["skipped_count"] + unmapped_count
         
         return {
             "message": f"Successfully copied {copied_count} meal plans, skipped {skipped_count}",
@@ -494,23 +1837,74 @@ async def copy_meal_plan_month(copy_request: MonthlyMealPlanCopy):
         logger.error(f"Failed to copy meal plan month: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to copy meal plan month")
 
-@api_router.get("/meal-plans/weeks-with-plans", response_model=List[str])
-async def get_weeks_with_meal_plans():
-    """Get list of week start dates that have meal plans"""
+@api_router.post("/meal-plans/copy-range")
+async def copy_meal_plan_range(copy_request: MealPlanRangeCopy):
+    """Copy meal plans from an arbitrary date range, optionally repeated back to back"""
     try:
         from datetime import datetime, timedelta
         
-        # Get all meal plans and group by week
-        all_plans = await db.meal_plans.find().sort("date", 1).to_list(10000)
+        try:
+            source_start = datetime.fromisoformat(copy_request.source_start_date).date()
+            source_end = datetime.fromisoformat(copy_request.source_end_date).date()
+            target_start = datetime.fromisoformat(copy_request.target_start_date).date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+        
+        if source_end < source_start:
+            raise HTTPException(status_code=400, detail="source_end_date must not be before source_start_date")
+        if copy_request.repeat < 1 or copy_request.repeat > 52:
+            raise HTTPException(status_code=400, detail="repeat must be between 1 and 52")
         
-        weeks_set = set()
-        for plan in all_plans:
-            plan_date = datetime.fromisoformat(plan['date']).date()
-            # Calculate Monday of that week
-            monday = plan_date - timedelta(days=plan_date.weekday())
-            weeks_set.add(monday.isoformat())
+        source_plans = await db.meal_plans.find({
+            "date": {
+                "$gte": source_start.isoformat(),
+                "$lte": source_end.isoformat()
+            }
+        }).to_list(None)
+        
+        if not source_plans:
+            raise HTTPException(status_code=404, detail="No meal plans found for source range")
+        
+        range_days = (source_end - source_start).days + 1
+        copies = []
+        for repetition in range(copy_request.repeat):
+            date_diff = (target_start - source_start).days + repetition * range_days
+            for source_plan in source_plans:
+                source_date = datetime.fromisoformat(source_plan['date']).date()
+                copies.append((source_plan, (source_date + timedelta(days=date_diff)).isoformat()))
+        
+        result = await copy_meal_plans(copies, copy_request.overwrite_existing)
+        target_end = target_start + timedelta(days=range_days * copy_request.repeat - 1)
+        
+        return {
+            "message": f"Successfully copied {result['copied_count']} meal plans, skipped {result['skipped_count']}",
+            "copied_count": result["copied_count"],
+            "skipped_count": result["skipped_count"],
+            "source_start_date": source_start.isoformat(),
+            "source_end_date": source_end.isoformat(),
+            "target_start_date": target_start.isoformat(),
+            "target_end_date": target_end.isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to copy meal plan range: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to copy meal plan range")
+
+@api_router.get("/meal-plans/weeks-with-plans", response_model=List[str])
+async def get_weeks_with_meal_plans():
+    """Get list of week start dates that have meal plans"""
+    try:
+        # Group plans by ISO week on the server; only one document per week comes back
+        pipeline = [
+            {"$project": {"_id": 0, "day": {"$dateFromString": {"dateString": "$date", "format": "%Y-%m-%d"}}}},
+            {"$group": {"_id": {"year": {"$isoWeekYear": "$day"}, "week": {"$isoWeek": "$day"}}}}
+        ]
+        weeks = await db.meal_plans.aggregate(pipeline).to_list(None)
         
-        return sorted(list(weeks_set))
+        # Calculate Monday of each week
+        return sorted(date.fromisocalendar(week["_id"]["year"], week["_id"]["week"], 1).isoformat() for week in weeks)
         
     except Exception as e:
         logger.error(f"Failed to get weeks with meal plans: {str(e)}")
@@ -520,27 +1914,47 @@ async def get_weeks_with_meal_plans():
 async def get_months_with_meal_plans():
     """Get list of months (YYYY-MM) that have meal plans"""
     try:
-        from datetime import datetime
-        
-        # Get all meal plans and group by month
-        all_plans = await db.meal_plans.find().sort("date", 1).to_list(10000)
-        
-        months_set = set()
-        for plan in all_plans:
-            plan_date = datetime.fromisoformat(plan['date']).date()
-            month_str = f"{plan_date.year:04d}-{plan_date.month:02d}"
-            months_set.add(month_str)
+        # Group plans by the YYYY-MM prefix of their date on the server
+        pipeline = [
+            {"$group": {"_id": {"$substrBytes": ["$date", 0, 7]}}},
+            {"$sort": {"_id": 1}}
+        ]
+        months = await db.meal_plans.aggregate(pipeline).to_list(None)
         
-        return sorted(list(months_set))
+        return [month["_id"] for month in months]
         
     except Exception as e:
         logger.error(f"Failed to get months with meal plans: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get months with meal plans")
 
+@api_router.get("/meal-plans/changes")
+async def get_meal_plan_changes(since: int = 0, limit: int = MAX_SYNC_CHANGES):
+    """Meal plans written after change number `since`; pass the returned version as the next `since`"""
+    try:
+        if since < 0 or limit < 1 or limit > MAX_SYNC_CHANGES:
+            raise HTTPException(status_code=400, detail=f"since must be >= 0 and limit between 1 and {MAX_SYNC_CHANGES}")
+        
+        documents, version, has_more = await changes_since(db.meal_plans, since, limit)
+        return {
+            "since": since,
+            "version": version,
+            "has_more": has_more,
+            "meal_plans": [MealPlan(**parse_from_mongo(plan)) for plan in documents]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get meal plan changes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get meal plan changes")
+
 @api_router.get("/meal-plans/{date}", response_model=MealPlan)
-async def get_meal_plan_by_date(date: str):
-    """Get meal plan for specific date"""
+async def get_meal_plan_by_date(date: str, request: Request, response: Response):
+    """Get meal plan for specific date (304 if the ETag still matches)"""
     meal_plan = await db.meal_plans.find_one({"date": date})
+    unchanged = not_modified(request, response, f'"{meal_plan.get("sync_version", 0) if meal_plan else 0}"')
+    if unchanged:
+        return unchanged
     if not meal_plan:
         # Return empty meal plan for the date
         return MealPlan(date=date)
@@ -551,54 +1965,85 @@ async def create_meal_plan(plan_input: MealPlanCreate):
     """Create or update a meal plan"""
     # Check if meal plan already exists for this date
     existing = await db.meal_plans.find_one({"date": plan_input.date})
+    async with sync_change() as sync_version:
+        if existing:
+            # Update existing meal plan
+            meal_plan = MealPlan(id=existing["id"], sync_version=sync_version, **plan_input.dict())
+            meal_data = prepare_for_mongo(meal_plan.dict())
+            await db.meal_plans.replace_one({"date": plan_input.date}, meal_data)
+        else:
+            # Create new meal plan
+            meal_plan = MealPlan(sync_version=sync_version, **plan_input.dict())
+            meal_data = prepare_for_mongo(meal_plan.dict())
+            await db.meal_plans.insert_one(meal_data)
     
-    if existing:
-        # Update existing meal plan
-        meal_plan = MealPlan(id=existing["id"], **plan_input.dict())
-        meal_data = prepare_for_mongo(meal_plan.dict())
-        await db.meal_plans.replace_one({"date": plan_input.date}, meal_data)
-    else:
-        # Create new meal plan
-        meal_plan = MealPlan(**plan_input.dict())
-        meal_data = prepare_for_mongo(meal_plan.dict())
-        await db.meal_plans.insert_one(meal_data)
-    
+    invalidate_meal_plan_caches()
+    await apply_plan_changes_to_grocery_lists({(meal_plan.date, slot): getattr(meal_plan, slot) for slot in MEAL_SLOTS})
     return meal_plan
 
 @api_router.put("/meal-plans/{date}", response_model=MealPlan)
 async def update_meal_plan_slot(date: str, update_data: MealPlanUpdate):
     """Update a specific meal slot in a meal plan"""
-    # Get existing meal plan or create new one
-    existing = await db.meal_plans.find_one({"date": date})
-    
-    if existing:
-        meal_plan = MealPlan(**parse_from_mongo(existing))
-    else:
-        meal_plan = MealPlan(date=date)
-    
-    # Update the specific slot
-    if update_data.meal_slot == "breakfast":
-        meal_plan.breakfast = update_data.meal_id
-    elif update_data.meal_slot == "morning_snack":
-        meal_plan.morning_snack = update_data.meal_id
-    elif update_data.meal_slot == "lunch":
-        meal_plan.lunch = update_data.meal_id
-    elif update_data.meal_slot == "dinner":
-        meal_plan.dinner = update_data.meal_id
-    elif update_data.meal_slot == "evening_snack":
-        meal_plan.evening_snack = update_data.meal_id
-    else:
+    if update_data.meal_slot not in MEAL_SLOTS:
         raise HTTPException(status_code=400, detail="Invalid meal slot")
     
-    # Save to database
-    meal_data = prepare_for_mongo(meal_plan.dict())
-    await db.meal_plans.replace_one(
-        {"date": date}, 
-        meal_data, 
-        upsert=True
-    )
+    # Set only this slot so concurrent updates to other slots of the day are kept
+    async with sync_change() as sync_version:
+        meal_plan = await db.meal_plans.find_one_and_update(
+            {"date": date},
+            meal_plan_slot_update(date, {update_data.meal_slot: update_data.meal_id}, sync_version),
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    invalidate_meal_plan_caches()
+    await apply_plan_changes_to_grocery_lists({(date, update_data.meal_slot): update_data.meal_id})
+
+    return MealPlan(**parse_from_mongo(meal_plan))
+
+MAX_SLOT_ASSIGNMENTS = 500
+
+@api_router.patch("/meal-plans", response_model=List[MealPlan])
+async def update_meal_plan_slots(batch: MealPlanBatchUpdate):
+    """Assign many (date, slot, meal) combinations in one request"""
+    if not batch.assignments:
+        raise HTTPException(status_code=422, detail="At least one assignment is required")
+    if len(batch.assignments) > MAX_SLOT_ASSIGNMENTS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_SLOT_ASSIGNMENTS} assignments per request")
     
-    return meal_plan
+    # Group by day; later assignments to the same slot win
+    slots_by_date: Dict[str, Dict[str, Optional[str]]] = {}
+    for assignment in batch.assignments:
+        if assignment.meal_slot not in MEAL_SLOTS:
+            raise HTTPException(status_code=400, detail="Invalid meal slot")
+        try:
+            plan_date = datetime.fromisoformat(assignment.date).date().isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+        slots_by_date.setdefault(plan_date, {})[assignment.meal_slot] = assignment.meal_id
+    
+    try:
+        # Each day is a single atomic update
+        async with sync_change() as sync_version:
+            await db.meal_plans.bulk_write([
+                UpdateOne({"date": plan_date}, meal_plan_slot_update(plan_date, slot_values, sync_version), upsert=True)
+                for plan_date, slot_values in slots_by_date.items()
+            ], ordered=False)
+        invalidate_meal_plan_caches()
+        await apply_plan_changes_to_grocery_lists({
+            (plan_date, slot): meal_id
+            for plan_date, slot_values in slots_by_date.items()
+            for slot, meal_id in slot_values.items()
+        })
+
+        meal_plans = await db.meal_plans.find(
+            {"date": {"$in": list(slots_by_date)}}, {"_id": 0}
+        ).sort("date", 1).to_list(None)
+        return [MealPlan(**parse_from_mongo(plan)) for plan in meal_plans]
+        
+    except Exception as e:
+        logger.error(f"Failed to update meal plan slots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update meal plan slots")
 
 @api_router.get("/family-members")
 async def get_family_members():
@@ -610,21 +2055,30 @@ async def get_family_members():
 async def search_ingredients(search: IngredientSearch):
     """Search for ingredients based on query"""
     try:
-        # Create a case-insensitive regex pattern
-        pattern = {"$regex": search.query.strip(), "$options": "i"}
+        if search.match not in ("substring", "prefix"):
+            raise HTTPException(status_code=400, detail="Invalid match mode")
         
-        # Search in ingredients collection
+        # Serve from the in-process autocomplete index once it is loaded
+        if ingredient_index.loaded:
+            ingredients = ingredient_index.search(search.query, search.limit, search.match)
+            return fast_model_response(ingredients, Ingredient)
+        
+        # Fallback: case-insensitive regex search in the ingredients collection
+        escaped = "|".join(re.escape(needle) for needle in dict.fromkeys([search.query.strip(), ingredient_key(search.query)]))
+        pattern = {"$regex": f"^(?:{escaped})" if search.match == "prefix" else escaped, "$options": "i"}
         query = {"name": pattern}
         
         # Sort by usage_count (descending) and then by name
-        ingredients = await db.ingredients.find(query).sort([
+        ingredients = await db.ingredients.find(query, model_projection(Ingredient)).sort([
             ("usage_count", -1),  # Most used first
             ("is_common", -1),    # Common ingredients first for equal usage
             ("name", 1)           # Alphabetical for same usage/common status
         ]).limit(search.limit).to_list(search.limit)
         
-        return [Ingredient(**parse_from_mongo(ingredient)) for ingredient in ingredients]
+        return fast_model_response(ingredients, Ingredient)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to search ingredients: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to search ingredients")
@@ -637,33 +2091,26 @@ async def create_or_increment_ingredient(ingredient_input: IngredientCreate):
         if not ingredient_input.name or not ingredient_input.name.strip():
             raise HTTPException(status_code=422, detail="Ingredient name is required")
         
-        ingredient_name = ingredient_input.name.strip().title()  # Normalize name
+        ingredient_name = canonical_ingredient_name(ingredient_input.name)  # Normalize name
         
-        # Check if ingredient already exists (case-insensitive)
-        existing = await db.ingredients.find_one({
-            "name": {"$regex": f"^{ingredient_name}$", "$options": "i"}
-        })
-        
-        if existing:
-            # Increment usage count
-            await db.ingredients.update_one(
-                {"id": existing["id"]},
-                {"$inc": {"usage_count": 1}}
-            )
-            existing["usage_count"] += 1
-            return Ingredient(**parse_from_mongo(existing))
-        else:
-            # Create new ingredient
-            new_ingredient = Ingredient(
-                name=ingredient_name,
-                category=ingredient_input.category,
-                is_common=False,
-                usage_count=1
-            )
-            
-            ingredient_data = prepare_for_mongo(new_ingredient.dict())
-            await db.ingredients.insert_one(ingredient_data)
-            return new_ingredient
+        # Increment usage count, creating the ingredient if it does not exist yet
+        new_ingredient = Ingredient(
+            name=ingredient_name,
+            category=ingredient_input.category,
+            is_common=False
+        )
+        insert_data = prepare_for_mongo(new_ingredient.dict(exclude={'usage_count'}))
+        insert_data['normalized_name'] = ingredient_key(ingredient_name)
+        
+        ingredient = await db.ingredients.find_one_and_update(
+            {"normalized_name": insert_data['normalized_name']},
+            {"$inc": {"usage_count": 1}, "$setOnInsert": insert_data},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        ingredient_index.upsert(ingredient)
+        return Ingredient(**parse_from_mongo(ingredient))
             
     except HTTPException:
         raise
@@ -675,13 +2122,13 @@ async def create_or_increment_ingredient(ingredient_input: IngredientCreate):
 async def get_popular_ingredients(limit: int = 20):
     """Get most popular/frequently used ingredients"""
     try:
-        ingredients = await db.ingredients.find().sort([
+        ingredients = await db.ingredients.find({}, model_projection(Ingredient)).sort([
             ("usage_count", -1),
             ("is_common", -1),
             ("name", 1)
         ]).limit(limit).to_list(limit)
         
-        return [Ingredient(**parse_from_mongo(ingredient)) for ingredient in ingredients]
+        return fast_model_response(ingredients, Ingredient)
         
     except Exception as e:
         logger.error(f"Failed to get popular ingredients: {str(e)}")
@@ -694,10 +2141,8 @@ async def seed_common_ingredients():
         seeded_count = 0
         
         for ingredient_name in COMMON_INGREDIENTS:
-            # Check if ingredient already exists
-            existing = await db.ingredients.find_one({
-                "name": {"$regex": f"^{ingredient_name}$", "$options": "i"}
-            })
+            # Check if ingredient (or a variant of it) already exists
+            existing = await db.ingredients.find_one({"normalized_name": ingredient_key(ingredient_name)})
             
             if not existing:
                 # Categorize ingredients (simple categorization)
@@ -729,7 +2174,9 @@ async def seed_common_ingredients():
                 )
                 
                 ingredient_data = prepare_for_mongo(ingredient.dict())
+                ingredient_data['normalized_name'] = ingredient_key(ingredient_name)
                 await db.ingredients.insert_one(ingredient_data)
+                ingredient_index.upsert(ingredient.dict())
                 seeded_count += 1
         
         return {"message": f"Seeded {seeded_count} common ingredients"}
@@ -738,7 +2185,454 @@ async def seed_common_ingredients():
         logger.error(f"Failed to seed ingredients: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to seed ingredients")
 
+# Grocery list real-time updates
+GROCERY_EVENT_QUEUE_SIZE = 256
+
+class GroceryEventBroker:
+    """In-process fan-out of grocery list change events to WebSocket subscribers.
+    
+    publish() hands an event straight to the local subscriber queues, which is all a
+    single server process needs. To fan out across processes, subclass it so publish()
+    goes through shared infrastructure (a Redis channel, a Mongo change stream) and the
+    listener calls deliver() for each event it receives; see MongoGroceryEventBroker.
+    """
+
+    def __init__(self, queue_size: int = GROCERY_EVENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, set] = {}  # list id -> subscriber queues
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def subscribe(self, list_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(list_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, list_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(list_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[list_id]
+
+    def subscriber_count(self, list_id: str) -> int:
+        return len(self._subscribers.get(list_id, ()))
+
+    async def publish(self, list_id: str, event: dict):
+        self.deliver(list_id, event)
+
+    def deliver(self, list_id: str, event: dict):
+        for queue in list(self._subscribers.get(list_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A client too slow to keep up has lost events; have it reload the list instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "list_id": list_id})
+
+class MongoGroceryEventBroker(GroceryEventBroker):
+    """Fans events out across server processes through a Mongo change stream (requires a replica set).
+    
+    Every process inserts its events into a TTL'd collection and delivers whatever the
+    change stream reports, including its own inserts, to its local subscribers.
+    """
+
+    def __init__(self, collection, queue_size: int = GROCERY_EVENT_QUEUE_SIZE):
+        super().__init__(queue_size)
+        self.collection = collection
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self._watcher = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watcher:
+            self._watcher.cancel()
+
+    async def publish(self, list_id: str, event: dict):
+        await self.collection.insert_one({"list_id": list_id, "event": event, "created_at": datetime.now(timezone.utc)})
+
+    async def _watch(self):
+        while True:
+            try:
+                async with self.collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+                    async for change in stream:
+                        document = change["fullDocument"]
+                        self.deliver(document["list_id"], document["event"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Grocery event change stream failed, retrying: {str(e)}")
+                await asyncio.sleep(1)
+
+def create_grocery_event_broker() -> GroceryEventBroker:
+    """Pick the fan-out backend from GROCERY_EVENT_BACKEND ("memory" or "mongo")"""
+    if os.environ.get('GROCERY_EVENT_BACKEND', 'memory') == 'mongo':
+        return MongoGroceryEventBroker(db.grocery_list_events)
+    return GroceryEventBroker()
+
+grocery_events = create_grocery_event_broker()
+
+async def publish_grocery_event(list_id: str, event: dict):
+    """Best-effort fan-out of an item-level change; the write itself has already succeeded"""
+    try:
+        await grocery_events.publish(list_id, jsonable_encoder({**event, "list_id": list_id}))
+    except Exception as e:
+        logger.warning(f"Failed to publish grocery list event: {str(e)}")
+
+def grocery_version_filter(expected_version: Optional[int]) -> dict:
+    """Query fragment matching a list still at the version the client last saw"""
+    if expected_version is None:
+        return {}
+    # Lists stored before versioning have no field and count as version 0
+    return {"version": {"$in": [0, None]} if expected_version == 0 else expected_version}
+
 # Grocery List endpoints
+class IngredientQuantityParser:
+    """Table-driven parser pulling the leading amount and unit out of an ingredient line.
+    
+    "1 1/2 cups flour" -> (1.5, "cup"), "200g rice" -> (200.0, "g"), "2 onions" -> (2.0, None),
+    "Salt" -> None. Ranges ("1-2 lemons") take the upper bound. One compiled regex, memoized.
+    """
+
+    def __init__(self, cache_size: int = 4096):
+        unit_names = sorted(list(QUANTITY_UNITS) + list(QUANTITY_UNIT_ALIASES), key=len, reverse=True)
+        number = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+        words = "|".join(sorted(QUANTITY_NUMBER_WORDS, key=len, reverse=True))
+        self._pattern = re.compile(
+            rf"^\s*(?P<amount>{number}|(?:{words})(?![a-z]))"
+            rf"(?:\s*(?:-|to)\s*(?P<upper>{number}))?"
+            rf"\s*(?:(?P<unit>{'|'.join(re.escape(unit) for unit in unit_names)})(?:e?s)?\.?(?![a-z]))?"
+        )
+        self._notes = re.compile(r"\([^)]*\)")
+        self.parse = lru_cache(maxsize=cache_size)(self._parse)
+
+    @staticmethod
+    def _number(text: str) -> float:
+        if text in QUANTITY_NUMBER_WORDS:
+            return float(QUANTITY_NUMBER_WORDS[text])
+        total = 0.0
+        for part in text.split():
+            if "/" in part:
+                numerator, denominator = part.split("/")
+                total += int(numerator) / int(denominator) if int(denominator) else 0.0
+            else:
+                total += float(part)
+        return total
+
+    def _parse(self, text: str) -> Optional[tuple]:
+        line = text.strip().lower()
+        for fraction, replacement in IngredientCanonicalizer.FRACTIONS.items():
+            line = line.replace(fraction, replacement)
+        found = self._pattern.match(self._notes.sub(" ", line))
+        if not found:
+            return None
+        amount = self._number(found.group('upper') or found.group('amount'))
+        unit = found.group('unit')
+        if unit:
+            unit = QUANTITY_UNIT_ALIASES.get(unit, unit)
+        return amount, unit
+
+ingredient_quantity_parser = IngredientQuantityParser()
+
+def format_amount(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+class QuantityTotal:
+    """Running totals for one grocery ingredient, summed per dimension in base units (g, ml, each)"""
+
+    def __init__(self):
+        self.amounts: Dict[str, float] = {}
+        self.systems = Counter()  # (dimension, system) -> lines measured that way
+
+    def add(self, ingredient_text: str, times: int = 1):
+        parsed = ingredient_quantity_parser.parse(ingredient_text)
+        if parsed is None:
+            return
+        amount, unit = parsed
+        dimension, factor, system = QUANTITY_UNITS[unit] if unit else ("count", 1.0, None)
+        self.amounts[dimension] = self.amounts.get(dimension, 0.0) + amount * factor * times
+        if system:
+            self.systems[(dimension, system)] += times
+
+    def format(self) -> Optional[str]:
+        """Human readable totals, e.g. "1.5 kg" or "2 cups + 3 cloves"; None if nothing was measured"""
+        parts = []
+        for dimension, base_amount in self.amounts.items():
+            if base_amount <= 0:
+                continue
+            systems = [key for key in self.systems if key[0] == dimension]
+            if systems:
+                # Show the total in the measuring system most recipes used
+                display_units = QUANTITY_DISPLAY_UNITS[max(systems, key=lambda key: self.systems[key])]
+                unit, factor, _ = next(entry for entry in display_units if base_amount / entry[1] >= entry[2])
+                value = base_amount / factor
+                if unit == "cup" and value != 1:
+                    unit = "cups"
+                parts.append(f"{format_amount(value)} {unit}")
+            elif dimension == "count":
+                parts.append(format_amount(base_amount))
+            else:
+                plural = dimension + ("es" if dimension.endswith(("ch", "sh")) else "s")
+                parts.append(f"{format_amount(base_amount)} {dimension if base_amount == 1 else plural}")
+        return " + ".join(parts) or None
+
+async def lookup_ingredient_categories(ingredient_names) -> Dict[str, str]:
+    """Map normalized ingredient names to their stored category with at most one query"""
+    keys = {ingredient_key(name) for name in ingredient_names}
+    categories = {}
+    if ingredient_index.loaded:
+        for key in keys:
+            ingredient = ingredient_index.get(key)
+            if ingredient and ingredient.get('category'):
+                categories[key] = ingredient['category']
+        return categories
+    
+    async for ingredient in db.ingredients.find(
+        {"normalized_name": {"$in": list(keys)}},
+        {"_id": 0, "normalized_name": 1, "category": 1}
+    ):
+        if ingredient.get('category'):
+            categories[ingredient['normalized_name']] = ingredient['category']
+    return categories
+
+GROCERY_CATEGORY_ORDER = ["produce", "dairy", "protein", "grain", "spice", "condiment", "oil", "fruit", "nut", "other"]
+
+def sort_grocery_items(items: List[GroceryItem]):
+    """Sort grocery items in place by category, then name"""
+    items.sort(key=lambda x: (
+        GROCERY_CATEGORY_ORDER.index(x.category) if x.category in GROCERY_CATEGORY_ORDER else len(GROCERY_CATEGORY_ORDER),
+        x.name.lower()
+    ))
+
+def meal_grocery_sources(plan_date: str, slot: str, meal: dict) -> List[GroceryItemSource]:
+    """One source per ingredient line of a meal planned in a slot"""
+    return [
+        GroceryItemSource(
+            date=plan_date, slot=slot, meal_id=meal['id'],
+            meal_name=meal.get('name', 'Unknown Recipe'), ingredient=ingredient_name
+        )
+        for ingredient_name in meal.get('ingredients', [])
+        if ingredient_name.strip()
+    ]
+
+def grocery_item_totals(sources: List[GroceryItemSource]) -> Dict[str, Optional[str]]:
+    """Quantity and recipe note for an item, computed from its sources alone"""
+    total = QuantityTotal()
+    recipes = []
+    for source in sources:
+        total.add(source.ingredient)
+        if source.meal_name not in recipes:
+            recipes.append(source.meal_name)
+    
+    count = len(recipes)
+    quantity = total.format()
+    if quantity is None and count > 1:
+        quantity = f"Used in {count} recipes"
+    recipe_note = f"For: {', '.join(recipes[:3])}"  # Show max 3 recipes
+    if count > 3:
+        recipe_note += f" +{count - 3} more"
+    return {"quantity": quantity, "notes": recipe_note}
+
+def build_grocery_item(sources: List[GroceryItemSource], categories: Dict[str, str]) -> GroceryItem:
+    ingredient_name = canonical_ingredient_name(sources[0].ingredient)
+    return GroceryItem(
+        name=ingredient_name,
+        category=categories.get(ingredient_key(ingredient_name)) or categorize_ingredient(ingredient_name),
+        from_recipe="auto_generated",
+        sources=sources,
+        **grocery_item_totals(sources)
+    )
+
+async def generate_grocery_items(date_range: DateRangeQuery, merge_duplicates: bool = True) -> List[GroceryItem]:
+    """Build grocery items from the meals planned within a date range.
+    
+    Amounts are summed per canonical ingredient, counting a meal once for every slot it
+    is planned in, and each item records the plan slots it came from. With
+    merge_duplicates off, each recipe gets its own item per ingredient.
+    """
+    # Fetch meal plans for the range
+    meal_plans = await db.meal_plans.find(
+        {"date": {"$gte": date_range.start_date, "$lte": date_range.end_date}},
+        {"_id": 0, "date": 1, **{slot: 1 for slot in MEAL_SLOTS}}
+    ).sort("date", 1).to_list(None)
+    
+    # Collect all meal IDs from the range
+    meal_ids = {plan[slot] for plan in meal_plans for slot in MEAL_SLOTS if plan.get(slot)}
+    if not meal_ids:
+        return []
+    
+    meals_by_id = {
+        meal['id']: meal
+        async for meal in db.meals.find({"id": {"$in": list(meal_ids)}}, {"_id": 0, "id": 1, "name": 1, "ingredients": 1})
+    }
+    
+    # Group every planned ingredient line by canonical name
+    grouped_sources: Dict[object, List[GroceryItemSource]] = {}
+    for plan in meal_plans:
+        for slot in MEAL_SLOTS:
+            meal = meals_by_id.get(plan.get(slot))
+            if not meal:
+                continue
+            for source in meal_grocery_sources(plan['date'], slot, meal):
+                key = ingredient_key(source.ingredient)
+                grouped_sources.setdefault(key if merge_duplicates else (key, meal['id']), []).append(source)
+    
+    categories = await lookup_ingredient_categories(source.ingredient for sources in grouped_sources.values() for source in sources[:1])
+    return [build_grocery_item(sources, categories) for sources in grouped_sources.values()]
+
+def grocery_list_delta(grocery_list: dict, slot_changes: Dict[tuple, Optional[str]], meals_by_id: Dict[str, dict],
+                       categories: Dict[str, str]) -> tuple:
+    """New items of a linked list after moving it from its current sources to the changed slots.
+    
+    Only items fed by a changed (date, slot) or gaining an ingredient are touched, so other
+    items (and every is_checked flag) stay as they are. Items left without sources go away.
+    Returns the full items array and the matching item-level change event, or (None, None).
+    """
+    list_changes = {
+        (plan_date, slot): meal_id for (plan_date, slot), meal_id in slot_changes.items()
+        if grocery_list['start_date'] <= plan_date <= grocery_list['end_date']
+    }
+    if not list_changes:
+        return None, None
+
+    generated = [item for item in grocery_list.get('items', []) if item.get('from_recipe') == "auto_generated"]
+    items_by_key = {ingredient_key(item['name']): item for item in generated}
+    updated_sources: Dict[str, List[GroceryItemSource]] = {}
+    for item in generated:
+        sources = [GroceryItemSource(**source) for source in item.get('sources', [])]
+        kept = [source for source in sources if (source.date, source.slot) not in list_changes]
+        if len(kept) != len(sources):
+            updated_sources[item['id']] = kept
+    
+    new_sources: Dict[str, List[GroceryItemSource]] = {}
+    for (plan_date, slot), meal_id in sorted(list_changes.items()):
+        meal = meals_by_id.get(meal_id)
+        if not meal:
+            continue
+        for source in meal_grocery_sources(plan_date, slot, meal):
+            key = ingredient_key(source.ingredient)
+            item = items_by_key.get(key)
+            if item is None:
+                new_sources.setdefault(key, []).append(source)
+                continue
+            if item['id'] not in updated_sources:
+                updated_sources[item['id']] = [GroceryItemSource(**existing) for existing in item.get('sources', [])]
+            updated_sources[item['id']].append(source)
+    
+    if not updated_sources and not new_sources:
+        return None, None
+    
+    items = []
+    event = {"type": "items_synced", "added": [], "updated": [], "deleted": []}
+    for item in grocery_list.get('items', []):
+        sources = updated_sources.get(item['id'])
+        if sources is None:
+            items.append(item)
+        elif not sources:
+            event['deleted'].append(item['id'])
+        else:
+            item_changes = {"sources": [source.dict() for source in sources], **grocery_item_totals(sources)}
+            items.append({**item, **item_changes})
+            event['updated'].append({"item_id": item['id'], "changes": item_changes})
+    if new_sources:
+        new_items = [build_grocery_item(sources, categories) for sources in new_sources.values()]
+        sort_grocery_items(new_items)
+        items.extend(prepare_for_mongo(item.dict()) for item in new_items)
+        event['added'] = [item.dict() for item in new_items]
+    return items, event
+
+LINKED_GROCERY_LIST_FIELDS = {"_id": 0, "id": 1, "version": 1, "start_date": 1, "end_date": 1, "items": 1}
+MAX_GROCERY_SYNC_ATTEMPTS = 5
+
+async def sync_grocery_lists(slot_changes: Dict[tuple, Optional[str]], grocery_lists: Optional[List[dict]] = None) -> int:
+    """Apply (date, slot) -> meal_id plan changes to the auto-updating grocery lists covering those dates.
+    
+    Each list is rewritten in one update that only matches the version it was read at, so a
+    concurrent plan sync or item edit makes it miss; the list is then read again and the
+    delta recomputed. Returns the number of lists changed.
+    """
+    if not slot_changes:
+        return 0
+    if grocery_lists is None:
+        changed_dates = [plan_date for plan_date, _ in slot_changes]
+        grocery_lists = await db.grocery_lists.find(
+            {"auto_update": True, "start_date": {"$lte": max(changed_dates)}, "end_date": {"$gte": min(changed_dates)}},
+            LINKED_GROCERY_LIST_FIELDS
+        ).to_list(None)
+    if not grocery_lists:
+        return 0
+    
+    meal_ids = {meal_id for meal_id in slot_changes.values() if meal_id}
+    meals_by_id = {
+        meal['id']: meal
+        async for meal in db.meals.find({"id": {"$in": list(meal_ids)}}, {"_id": 0, "id": 1, "name": 1, "ingredients": 1})
+    } if meal_ids else {}
+    categories = await lookup_ingredient_categories(
+        ingredient_name for meal in meals_by_id.values() for ingredient_name in meal.get('ingredients', [])
+    ) if meals_by_id else {}
+    
+    changed_count = 0
+    for grocery_list in grocery_lists:
+        list_id = grocery_list['id']
+        for _ in range(MAX_GROCERY_SYNC_ATTEMPTS):
+            items, event = grocery_list_delta(grocery_list, slot_changes, meals_by_id, categories)
+            if items is None:
+                break
+            version = grocery_list.get('version', 0)
+            async with sync_change() as sync_version:
+                result = await db.grocery_lists.update_one(
+                    {"id": list_id, **grocery_version_filter(version)},
+                    {
+                        "$set": {"items": items, "last_updated": datetime.now(timezone.utc).isoformat(),
+                                 "sync_version": sync_version},
+                        "$inc": {"version": 1}
+                    }
+                )
+            if result.matched_count:
+                changed_count += 1
+                await publish_grocery_event(list_id, {**event, "version": version + 1})
+                break
+            # Someone else wrote the list since it was read
+            grocery_list = await db.grocery_lists.find_one({"id": list_id}, LINKED_GROCERY_LIST_FIELDS)
+            if not grocery_list:
+                break
+        else:
+            logger.warning(f"Gave up syncing grocery list {list_id} after {MAX_GROCERY_SYNC_ATTEMPTS} conflicting writes")
+    return changed_count
+
+async def sync_grocery_lists_for_meal(meal_id: str, deleted: bool = False) -> int:
+    """Re-apply every planned slot of an edited (or deleted) meal to the lists it feeds"""
+    grocery_lists = await db.grocery_lists.find(
+        {"auto_update": True, "items.sources.meal_id": meal_id}, LINKED_GROCERY_LIST_FIELDS
+    ).to_list(None)
+    slot_changes = {
+        (source['date'], source['slot']): None if deleted else meal_id
+        for grocery_list in grocery_lists
+        for item in grocery_list.get('items', [])
+        for source in item.get('sources', [])
+        if source['meal_id'] == meal_id
+    }
+    return await sync_grocery_lists(slot_changes, grocery_lists)
+
+async def apply_plan_changes_to_grocery_lists(slot_changes: Dict[tuple, Optional[str]] = None, meal_id: Optional[str] = None,
+                                              deleted: bool = False):
+    """Best-effort grocery list sync after a meal plan or meal write; failures are logged, not raised"""
+    try:
+        if meal_id is not None:
+            await sync_grocery_lists_for_meal(meal_id, deleted)
+        else:
+            await sync_grocery_lists(slot_changes)
+    except Exception as e:
+        logger.warning(f"Failed to update linked grocery lists: {str(e)}")
+
+MAX_GROCERY_RANGE_DAYS = 93
+
 @api_router.post("/grocery-lists", response_model=GroceryList)
 async def create_grocery_list(grocery_list_input: GroceryListCreate):
     """Create a new grocery list, optionally auto-populated from meal plans"""
@@ -749,99 +2643,129 @@ async def create_grocery_list(grocery_list_input: GroceryListCreate):
         )
         
         if grocery_list_input.auto_generate:
-            # Get meal plans for the week
-            from datetime import datetime, timedelta
-            start_date = datetime.fromisoformat(grocery_list_input.week_start_date).date()
-            end_date = start_date + timedelta(days=6)
-            
-            # Fetch meal plans for the week
-            meal_plans = await db.meal_plans.find({
-                "date": {
-                    "$gte": start_date.isoformat(),
-                    "$lte": end_date.isoformat()
-                }
-            }).to_list(1000)
-            
-            # Collect all meal IDs from the week
-            meal_ids = set()
-            for plan in meal_plans:
-                for slot in ['breakfast', 'morning_snack', 'lunch', 'dinner', 'evening_snack']:
-                    if plan.get(slot):
-                        meal_ids.add(plan[slot])
-            
-            # Get all meals for the week
-            meals = await db.meals.find({"id": {"$in": list(meal_ids)}}).to_list(1000)
-            
-            # Collect all ingredients with categorization
-            ingredient_count = {}
-            for meal in meals:
-                for ingredient_name in meal.get('ingredients', []):
-                    # Find ingredient category from ingredients database
-                    ingredient_doc = await db.ingredients.find_one({
-                        "name": {"$regex": f"^{ingredient_name}$", "$options": "i"}
-                    })
-                    
-                    category = "other"
-                    if ingredient_doc:
-                        category = ingredient_doc.get('category', 'other')
-                    
-                    # Count occurrences and group by category
-                    key = (ingredient_name, category)
-                    if key not in ingredient_count:
-                        ingredient_count[key] = {
-                            'count': 0,
-                            'recipes': []
-                        }
-                    ingredient_count[key]['count'] += 1
-                    ingredient_count[key]['recipes'].append(meal.get('name', 'Unknown Recipe'))
-            
-            # Create grocery items from ingredients
-            for (ingredient_name, category), data in ingredient_count.items():
-                quantity_note = f"Used in {data['count']} recipe{'s' if data['count'] > 1 else ''}"
-                recipe_note = f"For: {', '.join(set(data['recipes'][:3]))}"  # Show max 3 recipes
-                if len(data['recipes']) > 3:
-                    recipe_note += f" +{len(data['recipes']) - 3} more"
-                
-                grocery_item = GroceryItem(
-                    name=ingredient_name,
-                    category=category if category != 'other' else categorize_ingredient(ingredient_name),
-                    quantity=quantity_note if data['count'] > 1 else None,
-                    notes=recipe_note,
-                    from_recipe="auto_generated"
+            try:
+                start_date = date.fromisoformat(grocery_list_input.week_start_date)
+                end_date = (
+                    date.fromisoformat(grocery_list_input.end_date) if grocery_list_input.end_date
+                    else start_date + timedelta(days=6)
                 )
-                grocery_list.items.append(grocery_item)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+            if end_date < start_date:
+                raise HTTPException(status_code=400, detail="end_date must not be before week_start_date")
+            if (end_date - start_date).days >= MAX_GROCERY_RANGE_DAYS:
+                raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_GROCERY_RANGE_DAYS} days")
+            
+            grocery_list.start_date = start_date.isoformat()
+            grocery_list.end_date = end_date.isoformat()
+            grocery_list.auto_update = grocery_list_input.auto_update
+            grocery_list.items = await generate_grocery_items(
+                DateRangeQuery(start_date=grocery_list.start_date, end_date=grocery_list.end_date)
+            )
         
         # Sort items by category for better organization
-        category_order = ["produce", "dairy", "protein", "grain", "spice", "condiment", "oil", "fruit", "nut", "other"]
-        grocery_list.items.sort(key=lambda x: (
-            category_order.index(x.category) if x.category in category_order else len(category_order),
-            x.name.lower()
-        ))
+        sort_grocery_items(grocery_list.items)
         
         # Save to database
-        grocery_data = prepare_for_mongo(grocery_list.dict())
-        await db.grocery_lists.insert_one(grocery_data)
+        async with sync_change() as sync_version:
+            grocery_list.sync_version = sync_version
+            await db.grocery_lists.insert_one(prepare_for_mongo(grocery_list.dict()))
         
         return grocery_list
-        
+    
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to create grocery list: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create grocery list")
 
+@api_router.post("/grocery-lists/generate", response_model=List[GroceryItem])
+async def preview_grocery_items(date_range: DateRangeQuery):
+    """Generate grocery items for any date range without saving a list"""
+    try:
+        if date_range.end_date < date_range.start_date:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        
+        items = await generate_grocery_items(date_range)
+        sort_grocery_items(items)
+        return items
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to generate grocery items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate grocery items")
+
+@api_router.post("/grocery-lists/generate-weekly", response_model=List[GroceryItem])
+async def preview_weekly_grocery_items(weekly: WeeklyGroceryGenerate):
+    """Generate grocery items for the week starting at week_start_date without saving a list"""
+    try:
+        try:
+            start_date = date.fromisoformat(weekly.week_start_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid week_start_date format. Use YYYY-MM-DD")
+        end_date = start_date + timedelta(days=6)
+        
+        items = await generate_grocery_items(
+            DateRangeQuery(start_date=start_date.isoformat(), end_date=end_date.isoformat()),
+            merge_duplicates=weekly.merge_duplicates
+        )
+        if weekly.organize_by_category:
+            sort_grocery_items(items)
+        return items
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to generate weekly grocery items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate weekly grocery items")
+
 @api_router.get("/grocery-lists", response_model=List[GroceryList])
-async def get_grocery_lists():
-    """Get all grocery lists"""
+async def get_grocery_lists(request: Request, response: Response):
+    """Get all grocery lists (304 if the ETag still matches)"""
     try:
-        grocery_lists = await db.grocery_lists.find().sort("created_at", -1).to_list(1000)
-        return [GroceryList(**parse_from_mongo(gl)) for gl in grocery_lists]
+        unchanged = not_modified(request, response, await collection_etag(db.grocery_lists, {}, GROCERY_LIST_ETAG_KEYS))
+        if unchanged:
+            return unchanged
+        
+        grocery_lists = await db.grocery_lists.find({}, model_projection(GroceryList)).sort("created_at", -1).to_list(1000)
+        return fast_model_response(grocery_lists, GroceryList, response)
     except Exception as e:
         logger.error(f"Failed to get grocery lists: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get grocery lists")
 
+@api_router.get("/grocery-lists/changes")
+async def get_grocery_list_changes(since: int = 0, limit: int = MAX_SYNC_CHANGES):
+    """Grocery lists written after change number `since`; pass the returned version as the next `since`"""
+    try:
+        if since < 0 or limit < 1 or limit > MAX_SYNC_CHANGES:
+            raise HTTPException(status_code=400, detail=f"since must be >= 0 and limit between 1 and {MAX_SYNC_CHANGES}")
+        
+        documents, version, has_more = await changes_since(db.grocery_lists, since, limit)
+        return {
+            "since": since,
+            "version": version,
+            "has_more": has_more,
+            "grocery_lists": [GroceryList(**parse_from_mongo(grocery_list)) for grocery_list in documents]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get grocery list changes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get grocery list changes")
+
 @api_router.get("/grocery-lists/{list_id}", response_model=GroceryList)
-async def get_grocery_list(list_id: str):
-    """Get a specific grocery list"""
+async def get_grocery_list(list_id: str, request: Request, response: Response):
+    """Get a specific grocery list (304 if the ETag still matches)"""
     try:
+        # Check the version alone first so an unchanged list is never loaded
+        current = await db.grocery_lists.find_one({"id": list_id}, {"_id": 0, "version": 1})
+        if current:
+            unchanged = not_modified(request, response, f'"{current.get("version", 0)}"')
+            if unchanged:
+                return unchanged
+        
         grocery_list = await db.grocery_lists.find_one({"id": list_id})
         if not grocery_list:
             raise HTTPException(status_code=404, detail="Grocery list not found")
@@ -852,42 +2776,45 @@ async def get_grocery_list(list_id: str):
         logger.error(f"Failed to get grocery list: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get grocery list")
 
-@api_router.put("/grocery-lists/{list_id}/items/{item_id}", response_model=GroceryList)
-async def update_grocery_item(list_id: str, item_id: str, item_update: GroceryItemUpdate):
-    """Update a specific grocery item"""
+async def grocery_item_not_found(list_id: str, expected_version: Optional[int] = None):
+    """Raise the right 404 (or 409 on a version conflict) after an item-level write matched nothing"""
+    grocery_list = await db.grocery_lists.find_one({"id": list_id}, {"_id": 0, "version": 1})
+    if not grocery_list:
+        raise HTTPException(status_code=404, detail="Grocery list not found")
+    current_version = grocery_list.get('version', 0)
+    if expected_version is not None and current_version != expected_version:
+        raise HTTPException(status_code=409, detail=f"Grocery list changed: now at version {current_version}, expected {expected_version}")
+    raise HTTPException(status_code=404, detail="Grocery item not found")
+
+@api_router.put("/grocery-lists/{list_id}/items/{item_id}", response_model=Union[GroceryList, GroceryItem])
+async def update_grocery_item(list_id: str, item_id: str, item_update: GroceryItemUpdate, only_item: bool = False,
+                              expected_version: Optional[int] = None):
+    """Update a specific grocery item; returns just the item when only_item is set.
+    
+    With expected_version the write only applies if nobody changed the list since that version (409 otherwise).
+    """
     try:
-        grocery_list = await db.grocery_lists.find_one({"id": list_id})
+        # Update only the provided fields of the matching array element
+        item_changes = item_update.dict(exclude_none=True)
+        changes = {f"items.$.{field}": value for field, value in item_changes.items()}
+        changes['last_updated'] = datetime.now(timezone.utc).isoformat()
+
+        async with sync_change() as sync_version:
+            changes['sync_version'] = sync_version
+            grocery_list = await db.grocery_lists.find_one_and_update(
+                {"id": list_id, "items.id": item_id, **grocery_version_filter(expected_version)},
+                {"$set": changes, "$inc": {"version": 1}},
+                projection={"_id": 0, "version": 1, "items": {"$elemMatch": {"id": item_id}}} if only_item else {"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
         if not grocery_list:
-            raise HTTPException(status_code=404, detail="Grocery list not found")
-        
-        # Find and update the item
-        items = grocery_list.get('items', [])
-        item_found = False
-        for item in items:
-            if item.get('id') == item_id:
-                # Update item fields
-                if item_update.name is not None:
-                    item['name'] = item_update.name
-                if item_update.category is not None:
-                    item['category'] = item_update.category
-                if item_update.is_checked is not None:
-                    item['is_checked'] = item_update.is_checked
-                if item_update.quantity is not None:
-                    item['quantity'] = item_update.quantity
-                if item_update.notes is not None:
-                    item['notes'] = item_update.notes
-                item_found = True
-                break
-        
-        if not item_found:
-            raise HTTPException(status_code=404, detail="Grocery item not found")
-        
-        # Update last_updated timestamp
-        grocery_list['last_updated'] = datetime.now(timezone.utc).isoformat()
-        
-        # Save to database
-        await db.grocery_lists.replace_one({"id": list_id}, prepare_for_mongo(grocery_list))
+            await grocery_item_not_found(list_id, expected_version)
         
+        await publish_grocery_event(list_id, {
+            "type": "item_updated", "version": grocery_list['version'], "item_id": item_id, "changes": item_changes
+        })
+        if only_item:
+            return GroceryItem(**grocery_list['items'][0])
         return GroceryList(**parse_from_mongo(grocery_list))
         
     except HTTPException:
@@ -896,14 +2823,11 @@ async def update_grocery_item(list_id: str, item_id: str, item_update: GroceryIt
         logger.error(f"Failed to update grocery item: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update grocery item")
 
-@api_router.post("/grocery-lists/{list_id}/items", response_model=GroceryList)
-async def add_grocery_item(list_id: str, item_input: GroceryItemCreate):
-    """Add a new item to grocery list"""
+@api_router.post("/grocery-lists/{list_id}/items", response_model=Union[GroceryList, GroceryItem])
+async def add_grocery_item(list_id: str, item_input: GroceryItemCreate, only_item: bool = False,
+                           expected_version: Optional[int] = None):
+    """Add a new item to grocery list; returns just the item when only_item is set"""
     try:
-        grocery_list = await db.grocery_lists.find_one({"id": list_id})
-        if not grocery_list:
-            raise HTTPException(status_code=404, detail="Grocery list not found")
-        
         # Create new grocery item
         new_item = GroceryItem(
             name=item_input.name,
@@ -913,17 +2837,25 @@ async def add_grocery_item(list_id: str, item_input: GroceryItemCreate):
             added_by="user"
         )
         
-        # Add to items list
-        if 'items' not in grocery_list:
-            grocery_list['items'] = []
-        grocery_list['items'].append(prepare_for_mongo(new_item.dict()))
-        
-        # Update last_updated timestamp
-        grocery_list['last_updated'] = datetime.now(timezone.utc).isoformat()
-        
-        # Save to database
-        await db.grocery_lists.replace_one({"id": list_id}, prepare_for_mongo(grocery_list))
+        async with sync_change() as sync_version:
+            grocery_list = await db.grocery_lists.find_one_and_update(
+                {"id": list_id, **grocery_version_filter(expected_version)},
+                {
+                    "$push": {"items": prepare_for_mongo(new_item.dict())},
+                    "$set": {"last_updated": datetime.now(timezone.utc).isoformat(), "sync_version": sync_version},
+                    "$inc": {"version": 1}
+                },
+                projection={"_id": 0, "version": 1} if only_item else {"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+        if not grocery_list:
+            if expected_version is not None:
+                await grocery_item_not_found(list_id, expected_version)
+            raise HTTPException(status_code=404, detail="Grocery list not found")
         
+        await publish_grocery_event(list_id, {"type": "item_added", "version": grocery_list['version'], "item": new_item.dict()})
+        if only_item:
+            return new_item
         return GroceryList(**parse_from_mongo(grocery_list))
         
     except HTTPException:
@@ -932,23 +2864,40 @@ async def add_grocery_item(list_id: str, item_input: GroceryItemCreate):
         logger.error(f"Failed to add grocery item: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to add grocery item")
 
-@api_router.delete("/grocery-lists/{list_id}/items/{item_id}", response_model=GroceryList)
-async def delete_grocery_item(list_id: str, item_id: str):
-    """Delete a grocery item"""
+@api_router.delete("/grocery-lists/{list_id}/items/{item_id}", response_model=Union[GroceryList, GroceryItem])
+async def delete_grocery_item(list_id: str, item_id: str, only_item: bool = False, expected_version: Optional[int] = None):
+    """Delete a grocery item; returns just the removed item when only_item is set"""
     try:
-        grocery_list = await db.grocery_lists.find_one({"id": list_id})
-        if not grocery_list:
-            raise HTTPException(status_code=404, detail="Grocery list not found")
-        
-        # Filter out the item to delete
-        items = grocery_list.get('items', [])
-        grocery_list['items'] = [item for item in items if item.get('id') != item_id]
-        
-        # Update last_updated timestamp
-        grocery_list['last_updated'] = datetime.now(timezone.utc).isoformat()
-        
-        # Save to database
-        await db.grocery_lists.replace_one({"id": list_id}, prepare_for_mongo(grocery_list))
+        query = {"id": list_id, "items.id": item_id, **grocery_version_filter(expected_version)}
+        
+        # Fetch the document as it was before the pull so the removed item can be echoed back
+        async with sync_change() as sync_version:
+            update = {
+                "$pull": {"items": {"id": item_id}},
+                "$set": {"last_updated": datetime.now(timezone.utc).isoformat(), "sync_version": sync_version},
+                "$inc": {"version": 1}
+            }
+            grocery_list = await db.grocery_lists.find_one_and_update(
+                query,
+                update,
+                projection={"_id": 0, "version": 1, "items": {"$elemMatch": {"id": item_id}}} if only_item else {"_id": 0},
+                return_document=ReturnDocument.BEFORE
+            )
+        if grocery_list:
+            version = grocery_list.get('version', 0) + 1
+            await publish_grocery_event(list_id, {"type": "item_deleted", "version": version, "item_id": item_id})
+            if only_item:
+                return GroceryItem(**grocery_list['items'][0])
+            # Apply the pull to the snapshot instead of reading the list again
+            grocery_list['items'] = [item for item in grocery_list['items'] if item['id'] != item_id]
+            grocery_list.update(version=version, **update['$set'])
+        else:
+            if only_item or expected_version is not None:
+                await grocery_item_not_found(list_id, expected_version)
+            # Deleting an item that is already gone leaves the list (and its version) as it was
+            grocery_list = await db.grocery_lists.find_one({"id": list_id}, {"_id": 0})
+            if not grocery_list:
+                raise HTTPException(status_code=404, detail="Grocery list not found")
         
         return GroceryList(**parse_from_mongo(grocery_list))
         
@@ -958,6 +2907,56 @@ async def delete_grocery_item(list_id: str, item_id: str):
         logger.error(f"Failed to delete grocery item: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete grocery item")
 
+@api_router.websocket("/grocery-lists/{list_id}/ws")
+async def grocery_list_updates(websocket: WebSocket, list_id: str):
+    """Push item-level changes of a grocery list to a connected client.
+    
+    The client first gets a snapshot with the list's version, then one message per change
+    (item_added, item_updated, item_deleted, items_synced), each carrying the version it
+    produced. A gap in versions or a "resync" message means the client should reload.
+    Clients may send {"type": "ping"} to keep the connection alive.
+    """
+    await websocket.accept()
+    queue = grocery_events.subscribe(list_id)
+    try:
+        grocery_list = await db.grocery_lists.find_one({"id": list_id}, {"_id": 0})
+        if not grocery_list:
+            await websocket.close(code=4404, reason="Grocery list not found")
+            return
+        snapshot = GroceryList(**parse_from_mongo(grocery_list))
+        await websocket.send_json({"type": "snapshot", "version": snapshot.version, "list": jsonable_encoder(snapshot)})
+
+        async def forward_events():
+            while True:
+                event = await queue.get()
+                # Changes already contained in the snapshot are skipped
+                if event.get('version', snapshot.version + 1) > snapshot.version:
+                    await websocket.send_json(event)
+
+        async def answer_pings():
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    message_type = json.loads(message).get('type')
+                except (ValueError, AttributeError):
+                    message_type = None
+                if message_type == "ping":
+                    await websocket.send_json({"type": "pong"})
+        
+        tasks = [asyncio.create_task(forward_events()), asyncio.create_task(answer_pings())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if not isinstance(task.exception(), WebSocketDisconnect):
+                raise task.exception()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Grocery list stream failed: {str(e)}")
+    finally:
+        grocery_events.unsubscribe(list_id, queue)
+
 def categorize_ingredient(ingredient_name: str) -> str:
     """Helper function to categorize ingredients"""
     name_lower = ingredient_name.lower()
@@ -979,24 +2978,7 @@ def categorize_ingredient(ingredient_name: str) -> str:
     else:
         return "other"
 
-@api_router.post("/suggest-recipe", response_model=AIRecipeSuggestion)
-async def suggest_recipe_with_ai(request: RecipeSuggestionRequest):
-    """Generate AI recipe suggestions based on user prompt"""
-    try:
-        # Validate required prompt
-        if not request.prompt or not request.prompt.strip():
-            raise HTTPException(status_code=422, detail="Recipe prompt is required and cannot be empty")
-            
-        # Get the API key from environment
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            raise HTTPException(status_code=500, detail="AI service not configured")
-        
-        # Initialize the LLM chat
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"recipe-suggestion-{uuid.uuid4()}",
-            system_message="""You are a professional chef and recipe creator. Generate detailed, practical recipes based on user requests. 
+RECIPE_SYSTEM_MESSAGE = """You are a professional chef and recipe creator. Generate detailed, practical recipes based on user requests. 
 
 Your response must be a valid JSON object with the following structure:
 {
@@ -1018,55 +3000,211 @@ Guidelines:
 6. Only respond with valid JSON, no additional text
 7. ALWAYS include at least 3 ingredients and detailed cooking instructions
 8. Recipe name must be descriptive and not empty"""
-        ).with_model("openai", "gpt-4o-mini")
-        
-        # Build the prompt based on request
-        prompt_parts = [f"Create a recipe for: {request.prompt.strip()}"]
-        
-        if request.dietary_preferences:
-            prompt_parts.append(f"Dietary requirements: {', '.join(request.dietary_preferences)}")
-            
-        if request.cuisine_type:
-            prompt_parts.append(f"Cuisine style: {request.cuisine_type}")
-            
-        if request.difficulty_level:
-            prompt_parts.append(f"Difficulty level: {request.difficulty_level}")
-        
-        full_prompt = ". ".join(prompt_parts)
+
+RECIPE_MODEL_PROVIDER = "openai"
+RECIPE_MODEL = "gpt-4o-mini"
+
+class RecipeChat:
+    """LLM chat for recipe suggestions: whole responses through LlmChat, token streams through litellm"""
+
+    def __init__(self, api_key: str, provider: str = RECIPE_MODEL_PROVIDER, model: str = RECIPE_MODEL):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.chat = LlmChat(
+            api_key=api_key,
+            session_id=f"recipe-suggestion-{uuid.uuid4()}",
+            system_message=RECIPE_SYSTEM_MESSAGE
+        ).with_model(provider, model)
+
+    async def send_message(self, message: UserMessage) -> str:
+        return await self.chat.send_message(message)
+
+    async def stream_message(self, message: UserMessage):
+        """Yield response text as the model produces it.
+        
+        Needs LLM_API_BASE, the OpenAI-compatible endpoint the key belongs to; without it this
+        raises before yielding and callers fall back to send_message.
+        """
+        api_base = os.environ.get('LLM_API_BASE')
+        if not api_base:
+            raise RuntimeError("LLM_API_BASE is not set")
+        response = await litellm.acompletion(
+            model=f"{self.provider}/{self.model}",
+            messages=[
+                {"role": "system", "content": RECIPE_SYSTEM_MESSAGE},
+                {"role": "user", "content": message.text}
+            ],
+            api_key=self.api_key,
+            api_base=api_base,
+            stream=True
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+def create_recipe_chat(api_key: str):
+    """Create the LLM chat used for recipe suggestions (replaced by a stub in tests)"""
+    return RecipeChat(api_key)
+
+def build_recipe_prompt(request: RecipeSuggestionRequest) -> str:
+    """Build the user prompt based on request"""
+    prompt_parts = [f"Create a recipe for: {request.prompt.strip()}"]
+    
+    if request.dietary_preferences:
+        prompt_parts.append(f"Dietary requirements: {', '.join(request.dietary_preferences)}")
         
-        # Create user message
-        user_message = UserMessage(text=full_prompt)
+    if request.cuisine_type:
+        prompt_parts.append(f"Cuisine style: {request.cuisine_type}")
         
-        # Get AI response
-        response = await chat.send_message(user_message)
+    if request.difficulty_level:
+        prompt_parts.append(f"Difficulty level: {request.difficulty_level}")
+    
+    return ". ".join(prompt_parts)
+
+def parse_recipe_response(response: str) -> AIRecipeSuggestion:
+    """Parse and validate the JSON recipe returned by the AI"""
+    try:
+        recipe_data = json.loads(response)
+    except json.JSONDecodeError:
+        # If JSON parsing fails, try to extract JSON from response
+        json_match = re.search(r'\{.*\}', response, re.DOTALL)
+        if not json_match:
+            raise HTTPException(status_code=500, detail="Failed to parse AI response")
+        recipe_data = json.loads(json_match.group())
+    
+    # Validate AI response has required fields
+    if not recipe_data.get('name') or not recipe_data.get('name').strip():
+        raise HTTPException(status_code=500, detail="AI generated recipe without a valid name")
+    if not recipe_data.get('ingredients') or len(recipe_data.get('ingredients', [])) == 0:
+        raise HTTPException(status_code=500, detail="AI generated recipe without ingredients")
+    
+    return AIRecipeSuggestion(**recipe_data)
+
+def recipe_cache_key(request: RecipeSuggestionRequest) -> str:
+    """Hash of the normalized request; casing, spacing and preference order do not matter"""
+    normalized = {
+        "prompt": " ".join(request.prompt.lower().split()),
+        "dietary_preferences": sorted({pref.strip().lower() for pref in request.dietary_preferences or [] if pref.strip()}),
+        "cuisine_type": (request.cuisine_type or "").strip().lower(),
+        "difficulty_level": (request.difficulty_level or "").strip().lower(),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+class RecipeSuggestionCache:
+    """Two-tier cache for AI recipe suggestions: an in-memory LRU in front of a TTL-bounded Mongo collection"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int, collection_name: str = "recipe_suggestion_cache"):
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.collection_name = collection_name
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, suggestion dict)
+        self.stats = {"memory_hits": 0, "mongo_hits": 0, "misses": 0, "bypassed": 0}
+
+    def clear(self):
+        self._entries.clear()
+        self.stats = {key: 0 for key in self.stats}
+
+    def _remember(self, key: str, expires_at: datetime, suggestion: dict):
+        self._entries[key] = (expires_at, suggestion)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, database, key: str) -> Optional[AIRecipeSuggestion]:
+        now = datetime.now(timezone.utc)
+        
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, suggestion = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return AIRecipeSuggestion(**suggestion)
+            del self._entries[key]
+        
+        cached = await database[self.collection_name].find_one({"key": key}, {"_id": 0})
+        if cached:
+            # Mongo returns naive UTC datetimes
+            expires_at = cached['expires_at'].replace(tzinfo=timezone.utc)
+            if expires_at > now:
+                self._remember(key, expires_at, cached['suggestion'])
+                self.stats["mongo_hits"] += 1
+                return AIRecipeSuggestion(**cached['suggestion'])
+        
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, database, key: str, suggestion: AIRecipeSuggestion):
+        expires_at = datetime.now(timezone.utc) + self.ttl
+        suggestion_data = suggestion.dict()
+        self._remember(key, expires_at, suggestion_data)
+        # expires_at stays a BSON date so the TTL index can expire it
+        await database[self.collection_name].replace_one(
+            {"key": key},
+            {"key": key, "suggestion": suggestion_data, "expires_at": expires_at},
+            upsert=True
+        )
+
+    def report(self) -> dict:
+        lookups = self.stats["memory_hits"] + self.stats["mongo_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["mongo_hits"]
+        return {
+            **self.stats,
+            "memory_entries": len(self._entries),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+recipe_cache = RecipeSuggestionCache(
+    max_entries=int(os.environ.get('RECIPE_CACHE_SIZE', '256')),
+    ttl_seconds=int(os.environ.get('RECIPE_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+)
+
+async def generate_recipe_suggestion(request: RecipeSuggestionRequest, variant: Optional[str] = None) -> AIRecipeSuggestion:
+    """Get a suggestion from the cache or the AI; `variant` asks for an alternative and is never cached"""
+    cache_key = recipe_cache_key(request)
+    use_cache = variant is None
+    if request.bypass_cache:
+        recipe_cache.stats["bypassed"] += 1
+    elif use_cache:
+        try:
+            cached = await recipe_cache.get(db, cache_key)
+            if cached:
+                return cached
+        except Exception as e:
+            logger.warning(f"Recipe suggestion cache lookup failed: {str(e)}")
         
-        # Parse the JSON response
+    # Get the API key from environment
+    api_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not api_key:
+        raise HTTPException(status_code=500, detail="AI service not configured")
+    
+    prompt = build_recipe_prompt(request)
+    if variant:
+        prompt = f"{prompt}. {variant}"
+    
+    # Get AI response
+    chat = create_recipe_chat(api_key)
+    response = await chat.send_message(UserMessage(text=prompt))
+    suggestion = parse_recipe_response(response)
+    
+    if use_cache:
         try:
-            recipe_data = json.loads(response)
-            
-            # Validate AI response has required fields
-            if not recipe_data.get('name') or not recipe_data.get('name').strip():
-                raise HTTPException(status_code=500, detail="AI generated recipe without a valid name")
-            if not recipe_data.get('ingredients') or len(recipe_data.get('ingredients', [])) == 0:
-                raise HTTPException(status_code=500, detail="AI generated recipe without ingredients")
-            
-            return AIRecipeSuggestion(**recipe_data)
-        except json.JSONDecodeError as e:
-            # If JSON parsing fails, try to extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                recipe_data = json.loads(json_match.group())
-                
-                # Validate extracted response
-                if not recipe_data.get('name') or not recipe_data.get('name').strip():
-                    raise HTTPException(status_code=500, detail="AI generated recipe without a valid name")
-                if not recipe_data.get('ingredients') or len(recipe_data.get('ingredients', [])) == 0:
-                    raise HTTPException(status_code=500, detail="AI generated recipe without ingredients")
-                    
-                return AIRecipeSuggestion(**recipe_data)
-            else:
-                raise HTTPException(status_code=500, detail="Failed to parse AI response")
+            await recipe_cache.set(db, cache_key, suggestion)
+        except Exception as e:
+            logger.warning(f"Failed to cache recipe suggestion: {str(e)}")
+    
+    return suggestion
+
+@api_router.post("/suggest-recipe", response_model=AIRecipeSuggestion)
+async def suggest_recipe_with_ai(request: RecipeSuggestionRequest):
+    """Generate AI recipe suggestions based on user prompt"""
+    try:
+        # Validate required prompt
+        if not request.prompt or not request.prompt.strip():
+            raise HTTPException(status_code=422, detail="Recipe prompt is required and cannot be empty")
+        
+        return await generate_recipe_suggestion(request)
                 
     except HTTPException:
         raise  # Re-raise validation errors
@@ -1074,6 +3212,372 @@ Guidelines:
         logger.error(f"AI recipe suggestion error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate recipe suggestion: {str(e)}")
 
+MAX_BATCH_SUGGESTIONS = 10
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+def get_llm_semaphore() -> asyncio.Semaphore:
+    """Shared bound on concurrent AI calls (created lazily inside the running event loop)"""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(int(os.environ.get('LLM_MAX_CONCURRENCY', '4')))
+    return _llm_semaphore
+
+def recipe_fingerprint(suggestion: AIRecipeSuggestion) -> tuple:
+    """Normalized name and ingredient set used to spot near-identical suggestions"""
+    name = " ".join(re.findall(r"[a-z0-9]+", suggestion.name.lower()))
+    return name, frozenset(ingredient_key(ing) for ing in suggestion.ingredients)
+
+def is_near_duplicate(fingerprint: tuple, seen: List[tuple]) -> bool:
+    name, ingredients = fingerprint
+    for seen_name, seen_ingredients in seen:
+        if name == seen_name:
+            return True
+        union = ingredients | seen_ingredients
+        if union and len(ingredients & seen_ingredients) / len(union) >= 0.8:
+            return True
+    return False
+
+async def run_suggestion_job(index: int, request: RecipeSuggestionRequest, variant: Optional[str], timeout: float) -> dict:
+    """Run one batch candidate under the shared concurrency bound, capturing its outcome"""
+    result = {"index": index, "prompt": request.prompt}
+    try:
+        async with get_llm_semaphore():
+            suggestion = await asyncio.wait_for(generate_recipe_suggestion(request, variant), timeout)
+        result["suggestion"] = suggestion
+    except asyncio.TimeoutError:
+        result["error"] = "Timed out"
+    except HTTPException as e:
+        result["error"] = e.detail
+    except Exception as e:
+        logger.warning(f"Batch recipe suggestion failed: {str(e)}")
+        result["error"] = "Failed to generate recipe suggestion"
+    return result
+
+async def iter_batch_suggestions(batch: RecipeSuggestionBatchRequest):
+    """Yield batch results in completion order, flagging near-duplicates of earlier results.
+    
+    Closing the generator early (a streaming client went away) cancels the unfinished calls.
+    """
+    jobs = []
+    for request in batch.requests:
+        for candidate in range(batch.count):
+            variant = None
+            if candidate > 0:
+                variant = f"Give alternative #{candidate + 1}: a clearly different dish from the most obvious answer"
+            jobs.append(asyncio.create_task(run_suggestion_job(len(jobs), request, variant, batch.timeout_seconds)))
+    
+    seen = []
+    try:
+        for next_result in asyncio.as_completed(jobs):
+            result = await next_result
+            if "suggestion" in result:
+                fingerprint = recipe_fingerprint(result["suggestion"])
+                result["duplicate"] = is_near_duplicate(fingerprint, seen)
+                if not result["duplicate"]:
+                    seen.append(fingerprint)
+            yield result
+    finally:
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+
+@api_router.post("/suggest-recipes/batch")
+async def suggest_recipes_batch(batch: RecipeSuggestionBatchRequest):
+    """Generate several recipe suggestions concurrently, dropping near-duplicates"""
+    if not batch.requests:
+        raise HTTPException(status_code=422, detail="At least one recipe request is required")
+    if any(not request.prompt or not request.prompt.strip() for request in batch.requests):
+        raise HTTPException(status_code=422, detail="Recipe prompt is required and cannot be empty")
+    if batch.count < 1 or len(batch.requests) * batch.count > MAX_BATCH_SUGGESTIONS:
+        raise HTTPException(status_code=422, detail=f"A batch can generate between 1 and {MAX_BATCH_SUGGESTIONS} suggestions")
+    if batch.timeout_seconds <= 0:
+        raise HTTPException(status_code=422, detail="timeout_seconds must be positive")
+    
+    if batch.stream:
+        async def stream_results():
+            async with aclosing(iter_batch_suggestions(batch)) as results:
+                async for result in results:
+                    if result.pop("duplicate", False):
+                        continue
+                    if "suggestion" in result:
+                        result["suggestion"] = result["suggestion"].dict()
+                    yield json.dumps(result) + "\n"
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+    
+    suggestions, errors, duplicates_removed = [], [], 0
+    async for result in iter_batch_suggestions(batch):
+        if "error" in result:
+            errors.append({"index": result["index"], "prompt": result["prompt"], "error": result["error"]})
+        elif result["duplicate"]:
+            duplicates_removed += 1
+        else:
+            suggestions.append((result["index"], result["suggestion"]))
+    
+    return {
+        "suggestions": [suggestion for _, suggestion in sorted(suggestions, key=lambda item: item[0])],
+        "errors": sorted(errors, key=lambda error: error["index"]),
+        "duplicates_removed": duplicates_removed
+    }
+
+class IncrementalRecipeParser:
+    """Incremental parser for the recipe JSON object as the AI streams it.
+
+    `feed` returns (event, data) tuples: "name" once the name is complete,
+    "ingredient" for every finished ingredient, "recipe" with each newly
+    decoded piece of the instructions, and "field" for any other completed
+    top-level value. Text before the opening brace is ignored.
+    """
+
+    STREAMED_STRINGS = {"recipe"}
+    STREAMED_ARRAYS = {"ingredients"}
+
+    def __init__(self):
+        self.text = ""  # Everything fed so far, for the final validation
+        self.done = False
+        self._state = "preamble"
+        self._key = None
+        self._raw = ""  # Raw (still escaped) characters of the current string or value
+        self._array = None  # Completed items of the current top-level array
+        self._emitted = 0  # Raw characters of the current string already emitted as deltas
+        self._safe = 0  # Raw characters of the current string that form complete escapes
+        self._escape = False
+        self._hex_left = 0
+        self._high_surrogate = False
+        self._depth = 0
+        self._value_in_string = False
+        self._value_escape = False
+
+    def feed(self, chunk: str) -> List[tuple]:
+        self.text += chunk
+        events = []
+        for char in chunk:
+            if self.done:
+                break
+            self._consume(char, events)
+        if self._state == "string" and self._key in self.STREAMED_STRINGS:
+            self._emit_delta(events)
+        return events
+
+    def _consume(self, char: str, events: List[tuple]):
+        state = self._state
+        if state == "preamble":
+            if char == "{":
+                self._state = "key_or_end"
+        elif state == "key_or_end":
+            if char == '"':
+                self._start_string("key")
+            elif char == "}":
+                self.done = True
+        elif state == "colon":
+            if char == ":":
+                self._state = "value"
+        elif state == "value":
+            if char.isspace():
+                return
+            if char == '"':
+                self._start_string("string")
+            elif char == "[":
+                self._array = []
+                self._state = "array"
+            else:
+                self._start_raw_value(char, "value_raw")
+        elif state == "array":
+            if char == '"':
+                self._start_string("array_string")
+            elif char == "]":
+                self._finish_value(self._array, events)
+            elif not char.isspace() and char != ",":
+                self._start_raw_value(char, "array_raw")
+        elif state in ("key", "string", "array_string"):
+            self._consume_string_char(char, events)
+        elif state in ("value_raw", "array_raw"):
+            self._consume_raw_char(char, events)
+
+    def _start_string(self, state: str):
+        self._state = state
+        self._raw = ""
+        self._emitted = self._safe = 0
+        self._escape = self._high_surrogate = False
+        self._hex_left = 0
+
+    def _consume_string_char(self, char: str, events: List[tuple]):
+        if self._escape:
+            self._raw += char
+            self._escape = False
+            if char == "u":
+                self._hex_left = 4
+            else:
+                self._mark_safe()
+        elif self._hex_left:
+            self._raw += char
+            self._hex_left -= 1
+            if not self._hex_left:
+                code_point = int(self._raw[-4:], 16)
+                if 0xD800 <= code_point <= 0xDBFF and not self._high_surrogate:
+                    self._high_surrogate = True  # Wait for the low half of the pair
+                else:
+                    self._mark_safe()
+        elif char == "\\":
+            self._raw += char
+            self._escape = True
+        elif char == '"':
+            self._finish_string(events)
+        else:
+            self._raw += char
+            self._mark_safe()
+
+    def _mark_safe(self):
+        self._high_surrogate = False
+        self._safe = len(self._raw)
+
+    def _finish_string(self, events: List[tuple]):
+        value = json.loads(f'"{self._raw}"')
+        if self._state == "key":
+            self._key = value
+            self._state = "colon"
+        elif self._state == "array_string":
+            if self._key in self.STREAMED_ARRAYS:
+                events.append(("ingredient", {"index": len(self._array), "ingredient": value}))
+            self._array.append(value)
+            self._state = "array"
+        else:
+            if self._key in self.STREAMED_STRINGS:
+                self._safe = len(self._raw)
+                self._emit_delta(events)
+            self._finish_value(value, events)
+
+    def _emit_delta(self, events: List[tuple]):
+        if self._safe > self._emitted:
+            delta = json.loads(f'"{self._raw[self._emitted:self._safe]}"')
+            self._emitted = self._safe
+            events.append((self._key, {"delta": delta}))
+
+    def _start_raw_value(self, char: str, state: str):
+        self._state = state
+        self._raw = ""
+        self._depth = 0
+        self._value_in_string = self._value_escape = False
+        self._consume_raw_char(char, [])
+
+    def _consume_raw_char(self, char: str, events: List[tuple]):
+        if self._value_in_string:
+            if self._value_escape:
+                self._value_escape = False
+            elif char == "\\":
+                self._value_escape = True
+            elif char == '"':
+                self._value_in_string = False
+        elif char == '"':
+            self._value_in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]" and self._depth:
+            self._depth -= 1
+        elif self._depth == 0 and char in ",}]":
+            value = json.loads(self._raw)
+            if self._state == "array_raw":
+                self._array.append(value)
+                self._state = "array"
+            else:
+                self._finish_value(value, events)
+            # The delimiter also belongs to the enclosing object or array
+            self._consume(char, events)
+            return
+        self._raw += char
+
+    def _finish_value(self, value, events: List[tuple]):
+        if self._key == "name":
+            events.append(("name", {"name": value}))
+        elif self._key not in self.STREAMED_STRINGS and self._key not in self.STREAMED_ARRAYS:
+            events.append(("field", {"key": self._key, "value": value}))
+        self._array = None
+        self._state = "key_or_end"
+
+def format_sse(event: str, data) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_chat_response(chat, message: UserMessage):
+    """Yield response text chunks as they arrive.
+
+    Chats without streaming support, or whose stream fails before producing anything,
+    yield the whole response once.
+    """
+    stream_message = getattr(chat, "stream_message", None)
+    if stream_message is not None:
+        streamed = False
+        try:
+            async for chunk in stream_message(message):
+                streamed = True
+                yield chunk
+            return
+        except Exception as e:
+            if streamed:
+                raise
+            logger.warning(f"AI streaming unavailable, waiting for the full response: {str(e)}")
+    yield await chat.send_message(message)
+
+async def stream_recipe_events(request: RecipeSuggestionRequest):
+    """Produce SSE events for a recipe suggestion as the AI writes it"""
+    try:
+        cache_key = recipe_cache_key(request)
+        cached = None
+        if request.bypass_cache:
+            recipe_cache.stats["bypassed"] += 1
+        else:
+            try:
+                cached = await recipe_cache.get(db, cache_key)
+            except Exception as e:
+                logger.warning(f"Recipe suggestion cache lookup failed: {str(e)}")
+        
+        if cached:
+            yield format_sse("name", {"name": cached.name})
+            for index, ingredient in enumerate(cached.ingredients):
+                yield format_sse("ingredient", {"index": index, "ingredient": ingredient})
+            yield format_sse("recipe", {"delta": cached.recipe})
+            yield format_sse("complete", cached.dict())
+            return
+        
+        api_key = os.environ.get('EMERGENT_LLM_KEY')
+        if not api_key:
+            raise HTTPException(status_code=500, detail="AI service not configured")
+        
+        parser = IncrementalRecipeParser()
+        chat = create_recipe_chat(api_key)
+        async for chunk in stream_chat_response(chat, UserMessage(text=build_recipe_prompt(request))):
+            for event, data in parser.feed(chunk):
+                yield format_sse(event, data)
+        
+        suggestion = parse_recipe_response(parser.text)
+        try:
+            await recipe_cache.set(db, cache_key, suggestion)
+        except Exception as e:
+            logger.warning(f"Failed to cache recipe suggestion: {str(e)}")
+        yield format_sse("complete", suggestion.dict())
+        
+    except HTTPException as e:
+        yield format_sse("error", {"detail": e.detail})
+    except Exception as e:
+        logger.error(f"AI recipe streaming error: {str(e)}")
+        yield format_sse("error", {"detail": "Failed to generate recipe suggestion"})
+
+@api_router.post("/suggest-recipe/stream")
+async def stream_recipe_suggestion(request: RecipeSuggestionRequest):
+    """Stream an AI recipe suggestion as server-sent events (name, ingredient, recipe, field, complete, error)"""
+    if not request.prompt or not request.prompt.strip():
+        raise HTTPException(status_code=422, detail="Recipe prompt is required and cannot be empty")
+    
+    return StreamingResponse(
+        stream_recipe_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/suggest-recipe/cache-stats")
+async def get_recipe_cache_stats():
+    """Get hit/miss counters for the recipe suggestion cache"""
+    return recipe_cache.report()
+
 @api_router.post("/create-meal-from-suggestion", response_model=Meal)
 async def create_meal_from_ai_suggestion(suggestion: AIRecipeSuggestion):
     """Create a meal from AI recipe suggestion"""
@@ -1101,8 +3605,15 @@ async def create_meal_from_ai_suggestion(suggestion: AIRecipeSuggestion):
             family_preferences=suggestion.suggested_family_preferences or []
         )
         
+        # Update ingredient usage counts
+        try:
+            await record_ingredient_usage(valid_ingredients)
+        except Exception as e:
+            logger.warning(f"Failed to update ingredient usage: {str(e)}")
+        
         meal_data = prepare_for_mongo(meal_obj.dict())
         await db.meals.insert_one(meal_data)
+        index_meal(meal_obj.dict())
         return meal_obj
         
     except HTTPException:
@@ -1111,6 +3622,348 @@ async def create_meal_from_ai_suggestion(suggestion: AIRecipeSuggestion):
         logger.error(f"Failed to create meal from suggestion: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create meal from suggestion")
 
+# Analytics endpoints
+@api_router.get("/analytics/meal-usage")
+async def get_meal_usage_analytics(start_date: str, end_date: str):
+    """How often each meal is planned in a date range, per slot and per family member"""
+    try:
+        try:
+            start = date.fromisoformat(start_date).isoformat()
+            end = date.fromisoformat(end_date).isoformat()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Dates must be in YYYY-MM-DD format")
+        if end < start:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        
+        cached = analytics_cache.get(("meal-usage", start, end))
+        if cached:
+            return {**cached, "cached": True}
+        
+        pipeline = [
+            {"$match": {"date": {"$gte": start, "$lte": end}}},
+            {"$project": {"_id": 0, "slots": [{"slot": slot, "meal_id": f"${slot}"} for slot in MEAL_SLOTS]}},
+            {"$unwind": "$slots"},
+            {"$match": {"slots.meal_id": {"$ne": None}}},
+            {"$group": {
+                "_id": "$slots.meal_id",
+                "total": {"$sum": 1},
+                **{slot: {"$sum": {"$cond": [{"$eq": ["$slots.slot", slot]}, 1, 0]}} for slot in MEAL_SLOTS}
+            }},
+            {"$lookup": {"from": "meals", "localField": "_id", "foreignField": "id", "as": "meal"}},
+            {"$unwind": {"path": "$meal", "preserveNullAndEmptyArrays": True}},
+            {"$sort": {"total": -1, "_id": 1}},
+        ]
+        
+        meals = []
+        member_counts = {member: 0 for member in FAMILY_MEMBERS}
+        async for usage in db.meal_plans.aggregate(pipeline):
+            meal = usage.get('meal') or {}
+            family_preferences = meal.get('family_preferences', [])
+            for member in family_preferences:
+                if member in member_counts:
+                    member_counts[member] += usage['total']
+            meals.append({
+                "meal_id": usage['_id'],
+                "name": meal.get('name'),  # None when the meal was deleted
+                "total": usage['total'],
+                "slot_counts": {slot: usage[slot] for slot in MEAL_SLOTS},
+                "family_preferences": family_preferences
+            })
+        
+        result = {
+            "start_date": start,
+            "end_date": end,
+            "total_planned": sum(meal['total'] for meal in meals),
+            "meals": meals,
+            "family_member_counts": member_counts
+        }
+        analytics_cache.set(("meal-usage", start, end), result)
+        return {**result, "cached": False}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get meal usage analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get meal usage analytics")
+
+# Admin endpoints
+async def merge_duplicate_ingredients(database, merge: bool = True, dry_run: bool = False) -> dict:
+    """Bring ingredients onto their current canonical keys, collapsing duplicates when `merge` is set.
+
+    Documents sharing a canonical key fold into the common (seeded) entry if any, else the most
+    used one, which keeps the summed usage count; the others are deleted. Without `merge` nothing
+    is deleted: the document already holding the canonical key (else the one a merge would keep)
+    holds it, and every other member whose key is missing gets a "legacy:<_id>" placeholder, so
+    the unique index can still be built and upserts on the canonical key find a document.
+    A key still held by a document that is not re-keyed is left alone and reported as a conflict.
+    `dry_run` returns the report without writing.
+    """
+    groups: Dict[str, List[dict]] = {}
+    stored_keys = {}
+    async for ingredient in database.ingredients.find(
+        {}, {"name": 1, "normalized_name": 1, "usage_count": 1, "is_common": 1, "category": 1}
+    ):
+        groups.setdefault(ingredient_key(ingredient['name']), []).append(ingredient)
+        stored_keys[ingredient['_id']] = ingredient.get('normalized_name')
+
+    deletes = []
+    changes_by_id: Dict[object, dict] = {}
+    merged = []
+    duplicate_groups = 0
+    for key, ingredients in groups.items():
+        ingredients.sort(key=lambda doc: (not doc.get('is_common', False), -doc.get('usage_count', 0)))
+        if not merge:
+            ingredients.sort(key=lambda doc: doc.get('normalized_name') != key)
+        survivor, duplicates = ingredients[0], ingredients[1:]
+        if duplicates:
+            duplicate_groups += 1
+            if not merge:
+                for doc in duplicates:
+                    if doc.get('normalized_name') is None:
+                        changes_by_id[doc['_id']] = {"normalized_name": f"legacy:{doc['_id']}"}
+                duplicates = []
+            else:
+                merged.append({"key": key, "kept": survivor['name'], "merged": [doc['name'] for doc in duplicates]})
+        changes = {}
+        if survivor.get('normalized_name') != key:
+            changes['normalized_name'] = key
+        if duplicates:
+            deletes.extend(doc['_id'] for doc in duplicates)
+            changes['usage_count'] = sum(doc.get('usage_count', 0) for doc in ingredients)
+            if not survivor.get('category'):
+                category = next((doc['category'] for doc in duplicates if doc.get('category')), None)
+                if category:
+                    changes['category'] = category
+        if changes:
+            changes_by_id[survivor['_id']] = changes
+
+    # Keys held by documents that keep theirs cannot be taken; each such document can block another
+    deleted = set(deletes)
+    conflicts = []
+    while True:
+        held_keys = {
+            doc.get('normalized_name') for ingredients in groups.values() for doc in ingredients
+            if doc['_id'] not in deleted and 'normalized_name' not in changes_by_id.get(doc['_id'], {})
+        }
+        blocked = [
+            (doc_id, changes) for doc_id, changes in changes_by_id.items() if changes.get('normalized_name') in held_keys
+        ]
+        if not blocked:
+            break
+        for doc_id, changes in blocked:
+            conflicts.append(changes.pop('normalized_name'))
+            if stored_keys[doc_id] is None:
+                # A second missing key would clash on null
+                changes['normalized_name'] = f"legacy:{doc_id}"
+    rekeyed = [doc_id for doc_id, changes in changes_by_id.items() if 'normalized_name' in changes]
+    report = {
+        "merged_groups": len(merged), "removed_count": len(deletes),
+        "updated_count": sum(1 for changes in changes_by_id.values() if changes),
+        "duplicate_groups": duplicate_groups, "conflicts": conflicts, "merged": merged, "dry_run": dry_run
+    }
+    if dry_run:
+        return report
+
+    # A re-keyed document's new key may still be another re-keyed document's stale key, so every
+    # one first moves to a key of its own (unset would clash on null) before taking the new one
+    first_pass = [DeleteMany({"_id": {"$in": deletes}})] if deletes else []
+    first_pass += [UpdateOne({"_id": doc_id}, {"$set": {"normalized_name": f"rekey:{doc_id}"}}) for doc_id in rekeyed]
+    if first_pass:
+        await database.ingredients.bulk_write(first_pass, ordered=True)
+    second_pass = [UpdateOne({"_id": doc_id}, {"$set": changes}) for doc_id, changes in changes_by_id.items() if changes]
+    if second_pass:
+        await database.ingredients.bulk_write(second_pass, ordered=False)
+    return report
+
+@api_router.post("/admin/ingredients/merge-duplicates")
+async def merge_ingredient_duplicates(dry_run: bool = False):
+    """Merge ingredient documents that canonicalize to the same name (e.g. "Tomatoes" and "tomato").
+    
+    Deletes the merged documents; dry_run lists what would be merged without changing anything.
+    """
+    try:
+        result = await merge_duplicate_ingredients(db, dry_run=dry_run)
+        if not dry_run and (result["removed_count"] or result["updated_count"]):
+            await ingredient_index.load(db)
+            await pantry_matcher.load(db)
+        return result
+    except Exception as e:
+        logger.error(f"Failed to merge duplicate ingredients: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to merge duplicate ingredients")
+
+CASE_INSENSITIVE = {"locale": "en", "strength": 2}
+
+COLLECTION_INDEXES = {
+    "meals": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", ASCENDING), ("id", ASCENDING)], name="created_at_id"),
+    ],
+    "meal_plans": [
+        IndexModel([("date", ASCENDING)], name="date_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("sync_version", ASCENDING)], name="sync_version"),
+        IndexModel(MEAL_PLAN_ETAG_KEYS, name="date_id_sync_version"),
+        # Reverse lookups ("which dates use this meal")
+        *[IndexModel([(slot, ASCENDING)], name=slot) for slot in MEAL_SLOTS],
+    ],
+    "ingredients": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("normalized_name", ASCENDING)], name="normalized_name_unique", unique=True),
+        IndexModel([("name", ASCENDING)], name="name_ci_unique", unique=True, collation=CASE_INSENSITIVE),
+        IndexModel(
+            [("usage_count", DESCENDING), ("is_common", DESCENDING), ("name", ASCENDING)],
+            name="usage_count_is_common_name"
+        ),
+    ],
+    "grocery_lists": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("sync_version", ASCENDING)], name="sync_version"),
+        IndexModel(GROCERY_LIST_ETAG_KEYS, name="id_sync_version"),
+        # Linked lists covering a changed date, and lists fed by an edited meal
+        IndexModel([("auto_update", ASCENDING), ("start_date", ASCENDING), ("end_date", ASCENDING)], name="auto_update_range"),
+        IndexModel([("items.sources.meal_id", ASCENDING)], name="items_source_meal_id", sparse=True),
+    ],
+    "recipe_suggestion_cache": [
+        IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    # Only written with GROCERY_EVENT_BACKEND=mongo
+    "grocery_list_events": [
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=3600),
+    ],
+}
+
+# Representative hot queries, explained by the index report
+INDEX_PROBE_QUERIES = {
+    "meals": {"filter": {"id": ""}},
+    "meal_plans": {"filter": {"date": {"$gte": "", "$lte": ""}}, "sort": [("date", ASCENDING)]},
+    "ingredients": {"filter": {}, "sort": [("usage_count", DESCENDING), ("is_common", DESCENDING), ("name", ASCENDING)]},
+    "grocery_lists": {"filter": {"id": ""}},
+}
+
+async def ensure_indexes(database):
+    """Create the indexes hot queries rely on; existing indexes are left untouched"""
+    for collection_name, indexes in COLLECTION_INDEXES.items():
+        for index in indexes:
+            try:
+                await database[collection_name].create_indexes([index])
+            except Exception as e:
+                # e.g. duplicate data blocking a unique index; the app still works without it
+                logger.warning(f"Failed to create index {index.document['name']} on {collection_name}: {str(e)}")
+
+def collect_plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() winning plan, outermost first"""
+    stages = [plan.get('stage')] if plan.get('stage') else []
+    if 'inputStage' in plan:
+        stages += collect_plan_stages(plan['inputStage'])
+    for child in plan.get('inputStages', []):
+        stages += collect_plan_stages(child)
+    return stages
+
+@api_router.get("/admin/index-stats")
+async def get_index_stats():
+    """Report index usage counters and the winning plan of each hot query (admin function)"""
+    try:
+        report = {}
+        for collection_name, probe in INDEX_PROBE_QUERIES.items():
+            collection = db[collection_name]
+            usage = await collection.aggregate([{"$indexStats": {}}]).to_list(None)
+            
+            cursor = collection.find(probe["filter"])
+            if probe.get("sort"):
+                cursor = cursor.sort(probe["sort"])
+            explain = await cursor.explain()
+            winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+            stages = collect_plan_stages(winning_plan.get('queryPlan', winning_plan))
+            
+            report[collection_name] = {
+                "indexes": [
+                    {
+                        "name": index['name'],
+                        "key": dict(index['key']),
+                        "ops": index.get('accesses', {}).get('ops', 0),
+                        "since": index.get('accesses', {}).get('since')
+                    }
+                    for index in usage
+                ],
+                "hot_query_stages": stages,
+                "uses_index": "COLLSCAN" not in stages
+            }
+        return report
+        
+    except Exception as e:
+        logger.error(f"Failed to get index stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get index stats")
+
+meal_reference_sweep = {"status": "idle", "scanned_plans": 0, "cleared_slots": 0, "started_at": None, "finished_at": None}
+
+async def repair_dangling_meal_references(batch_size: int = 500):
+    """Clear meal plan slots whose meal no longer exists, walking the plans in date-ordered batches.
+    
+    The caller marks meal_reference_sweep as running before scheduling this.
+    """
+    try:
+        last_date = ""
+        while True:
+            plans = await db.meal_plans.find(
+                {"date": {"$gt": last_date}},
+                {"_id": 0, "date": 1, **{slot: 1 for slot in MEAL_SLOTS}}
+            ).sort("date", 1).limit(batch_size).to_list(batch_size)
+            if not plans:
+                break
+            last_date = plans[-1]['date']
+            
+            referenced = {plan[slot] for plan in plans for slot in MEAL_SLOTS if plan.get(slot)}
+            existing = {
+                meal['id'] async for meal in db.meals.find({"id": {"$in": list(referenced)}}, {"_id": 0, "id": 1})
+            }
+            dangling = referenced - existing
+            
+            # Only clear a slot if it still points at the missing meal
+            if dangling:
+                async with sync_change() as sync_version:
+                    result = await db.meal_plans.bulk_write([
+                        UpdateOne({"date": plan['date'], slot: plan[slot]}, {"$set": {slot: None, "sync_version": sync_version}})
+                        for plan in plans
+                        for slot in MEAL_SLOTS
+                        if plan.get(slot) in dangling
+                    ], ordered=False)
+                meal_reference_sweep["cleared_slots"] += result.modified_count
+                invalidate_meal_plan_caches()
+                await apply_plan_changes_to_grocery_lists({
+                    (plan['date'], slot): None for plan in plans for slot in MEAL_SLOTS if plan.get(slot) in dangling
+                })
+            meal_reference_sweep["scanned_plans"] += len(plans)
+        
+        meal_reference_sweep["status"] = "completed"
+    except Exception as e:
+        logger.error(f"Dangling meal reference sweep failed: {str(e)}")
+        meal_reference_sweep["status"] = "failed"
+    finally:
+        meal_reference_sweep["finished_at"] = datetime.now(timezone.utc).isoformat()
+
+@api_router.post("/admin/repair-meal-references", status_code=202)
+async def start_meal_reference_repair(background_tasks: BackgroundTasks, batch_size: int = 500):
+    """Start a background sweep that clears slots pointing at deleted meals (admin function)"""
+    if meal_reference_sweep["status"] == "running":
+        raise HTTPException(status_code=409, detail="A repair sweep is already running")
+    if batch_size < 1 or batch_size > 5000:
+        raise HTTPException(status_code=400, detail="batch_size must be between 1 and 5000")
+    
+    # Marked here, not in the task: the task only starts after the response, so a second POST would see "idle"
+    meal_reference_sweep.update({
+        "status": "running", "scanned_plans": 0, "cleared_slots": 0,
+        "started_at": datetime.now(timezone.utc).isoformat(), "finished_at": None
+    })
+    background_tasks.add_task(repair_dangling_meal_references, batch_size)
+    return {"message": "Repair sweep started"}
+
+@api_router.get("/admin/repair-meal-references")
+async def get_meal_reference_repair_status():
+    """Get progress of the dangling meal reference sweep (admin function)"""
+    return meal_reference_sweep
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1120,6 +3973,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -1129,6 +3983,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def canonicalize_ingredient_keys():
+    """Bring stored ingredients onto the current canonical keys before the unique index is built.
+    
+    Never deletes anything: duplicates are only reported, for POST /api/admin/ingredients/merge-duplicates.
+    """
+    try:
+        result = await merge_duplicate_ingredients(db, merge=False)
+        if result["updated_count"]:
+            logger.info(f"Canonicalized {result['updated_count']} ingredient keys")
+        if result["duplicate_groups"] or result["conflicts"]:
+            logger.warning(
+                f"{result['duplicate_groups']} ingredient groups share a canonical name and "
+                f"{len(result['conflicts'])} keys are held by other ingredients; "
+                "review with POST /api/admin/ingredients/merge-duplicates?dry_run=true"
+            )
+    except Exception as e:
+        logger.error(f"Failed to canonicalize ingredient keys: {str(e)}")
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Failed to ensure indexes: {str(e)}")
+
+@app.on_event("startup")
+async def load_ingredient_index():
+    try:
+        await ingredient_index.load(db)
+        logger.info(f"Loaded {len(ingredient_index)} ingredients into autocomplete index")
+    except Exception as e:
+        logger.error(f"Failed to load ingredient autocomplete index: {str(e)}")
+
+@app.on_event("startup")
+async def load_meal_indexes():
+    try:
+        await meal_search_index.load(db)
+        await pantry_matcher.load(db)
+        logger.info(f"Loaded {len(meal_search_index)} meals into search and pantry indexes")
+    except Exception as e:
+        logger.error(f"Failed to load meal indexes: {str(e)}")
+
+@app.on_event("startup")
+async def start_grocery_events():
+    try:
+        await grocery_events.start()
+    except Exception as e:
+        logger.error(f"Failed to start grocery list event fan-out: {str(e)}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await grocery_events.stop()
     client.close()
\ No newline at end of file
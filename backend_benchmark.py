@@ -0,0 +1,425 @@
+"""Backend benchmarks.
+
+    python backend_benchmark.py serialization [--sizes 1000 10000] [--repeat 5]
+    python backend_benchmark.py load [--mongo-url URL [--uvicorn]] [--save-baseline FILE | --baseline FILE]
+
+`serialization` compares the per-document Pydantic path the list endpoints used to take
+(build a model per document, then FastAPI's response_model validation and encoding) with the
+fast path that shapes stored documents straight to JSON bytes. It runs in-process and needs
+no database; it checks that both paths produce the same JSON before timing them.
+
+`load` seeds a benchmark database with synthetic data (thousands of meals, years of meal
+plans, large grocery lists), starts server.py on it and drives concurrent requests at the hot
+endpoints, reporting p50/p95/p99 latency and requests per second per scenario. Without
+--mongo-url it runs against mongomock-motor, with the app served in-process; --uvicorn serves
+it from a separate uvicorn process instead (needs a real MongoDB). The benchmark database is
+dropped first, so never point it at real data. Save a run with --save-baseline and compare
+later runs to it with --baseline: the exit status is 1 when any scenario's p95 got slower, or
+its throughput lower, by more than --threshold, or when any request failed.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "meal_planner_benchmark")
+
+import server  # noqa: E402
+import httpx  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+WORDS = ["chicken", "rice", "onion", "garlic", "tomato", "basil", "lemon", "pasta", "beef", "carrot",
+         "potato", "spinach", "cheese", "egg", "butter", "flour", "pepper", "salmon", "bean", "mushroom"]
+
+
+def timestamp(offset: int) -> str:
+    return (datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=offset, microseconds=offset)).isoformat()
+
+
+def synthetic_meals(count: int) -> List[dict]:
+    return [{
+        "id": str(uuid.uuid4()),
+        "name": f"{random.choice(WORDS).title()} {random.choice(WORDS)} #{index}",
+        "ingredients": [f"{random.randint(1, 4)} cups {word}" for word in random.sample(WORDS, 8)],
+        "recipe": " ".join(random.choices(WORDS, k=60)),
+        "family_preferences": random.sample(list(server.FAMILY_MEMBERS), 2),
+        "created_at": timestamp(index),
+    } for index in range(count)]
+
+
+def synthetic_meal_plans(count: int) -> List[dict]:
+    start = date(2020, 1, 1)
+    return [{
+        "id": str(uuid.uuid4()),
+        "date": (start + timedelta(days=index)).isoformat(),
+        **{slot: str(uuid.uuid4()) if random.random() < 0.7 else None for slot in server.MEAL_SLOTS},
+        "sync_version": index,
+        "created_at": timestamp(index),
+    } for index in range(count)]
+
+
+def synthetic_grocery_lists(count: int, items_per_list: int = 40) -> List[dict]:
+    return [{
+        "id": str(uuid.uuid4()),
+        "name": f"Week {index}",
+        "week_start_date": "2024-01-01",
+        "items": [{
+            "id": str(uuid.uuid4()),
+            "name": random.choice(WORDS).title(),
+            "category": "produce",
+            "is_checked": random.random() < 0.3,
+            "quantity": f"{random.randint(1, 5)} cups",
+            "notes": None,
+            "created_at": datetime(2024, 1, 1, 12, 30),  # Nested datetimes come back from Mongo naive
+        } for _ in range(items_per_list)],
+        "collaborators": [],
+        "is_shared": False,
+        "version": index,
+        "last_updated": timestamp(index),
+        "created_at": timestamp(index),
+    } for index in range(count)]
+
+
+def model_path(documents: List[dict], model) -> bytes:
+    """What the endpoints did before: a model per document, then response_model validation and encoding"""
+    adapter = TypeAdapter(List[model])
+    models = [model(**server.parse_from_mongo(dict(document))) for document in documents]
+    content = adapter.dump_python(adapter.validate_python([item.model_dump() for item in models]), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(documents: List[dict], model) -> bytes:
+    return server.fast_model_response(documents, model).body
+
+
+def best_of(function, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run_serialization(sizes: List[int], repeat: int) -> int:
+    random.seed(0)
+    encoder = "orjson" if server.orjson is not None else "json (orjson not installed)"
+    print(f"Encoder: {encoder}")
+    print(f"{'model':<12}{'docs':>8}{'pydantic ms':>14}{'fast ms':>10}{'speedup':>10}{'MB':>8}")
+    cases = [
+        ("Meal", server.Meal, synthetic_meals),
+        ("MealPlan", server.MealPlan, synthetic_meal_plans),
+        ("GroceryList", server.GroceryList, lambda size: synthetic_grocery_lists(max(size // 40, 1))),
+    ]
+    for label, model, generate in cases:
+        for size in sizes:
+            documents = generate(size)
+            expected = model_path(documents, model)
+            actual = fast_path(documents, model)
+            if json.loads(expected) != json.loads(actual):
+                print(f"{label}: fast path output differs from the model path", file=sys.stderr)
+                return 1
+            slow = best_of(lambda: model_path(documents, model), repeat)
+            fast = best_of(lambda: fast_path(documents, model), repeat)
+            print(f"{label:<12}{len(documents):>8}{slow * 1000:>14.1f}{fast * 1000:>10.1f}"
+                  f"{slow / fast:>9.1f}x{len(actual) / 1e6:>8.2f}")
+    return 0
+
+
+# Load test
+PLAN_START = date(2022, 1, 3)  # A Monday
+SCENARIOS = ["ingredient_search", "meal_plan_range", "week_copy", "grocery_generate"]
+
+
+async def insert_chunked(collection, documents: List[dict], chunk_size: int = 1000):
+    for start in range(0, len(documents), chunk_size):
+        await collection.insert_many(documents[start:start + chunk_size], ordered=False)
+
+
+def ingredient_vocabulary(rng: random.Random) -> List[str]:
+    """The common ingredients plus adjective-noun combinations, a few hundred names in all.
+
+    One name per canonical key (the first wins, so common ingredients are kept): "Fresh Rice"
+    and "Rice" would share a normalized_name, which the app never writes and which would keep
+    the unique index from being built.
+    """
+    adjectives = ["red", "green", "smoked", "fresh", "dried", "wild", "sweet", "baby", "roasted", "pickled"]
+    names_by_key = {}
+    for name in server.COMMON_INGREDIENTS + [f"{adjective} {word}" for adjective in adjectives for word in WORDS]:
+        names_by_key.setdefault(server.ingredient_key(name), name)
+    vocabulary = list(names_by_key.values())
+    rng.shuffle(vocabulary)
+    return vocabulary
+
+
+async def seed_database(database, args, rng: random.Random) -> dict:
+    """Fill an empty database with synthetic data; returns what the scenarios draw from"""
+    vocabulary = ingredient_vocabulary(rng)
+    units = ["cups", "tbsp", "tsp", "g", "oz", "lb", "cloves", ""]
+
+    ingredients = []
+    for name in vocabulary:
+        ingredient = server.prepare_for_mongo(server.Ingredient(
+            name=name.title(), category=server.categorize_ingredient(name), is_common=name in server.COMMON_INGREDIENTS,
+            usage_count=rng.randint(0, 500)
+        ).model_dump())
+        ingredient['normalized_name'] = server.ingredient_key(name)
+        ingredients.append(ingredient)
+    await insert_chunked(database.ingredients, ingredients)
+
+    meals = [server.prepare_for_mongo(server.Meal(
+        name=f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {index}",
+        ingredients=[f"{rng.randint(1, 4)} {rng.choice(units)} {name}".replace("  ", " ")
+                     for name in rng.sample(vocabulary, rng.randint(5, 12))],
+        recipe=" ".join(rng.choices(WORDS, k=80)),
+        family_preferences=rng.sample(list(server.FAMILY_MEMBERS), rng.randint(0, 3))
+    ).model_dump()) for index in range(args.meals)]
+    await insert_chunked(database.meals, meals)
+    meal_ids = [meal['id'] for meal in meals]
+
+    plan_days = args.years * 365
+    plans = [server.prepare_for_mongo(server.MealPlan(
+        date=(PLAN_START + timedelta(days=offset)).isoformat(),
+        **{slot: rng.choice(meal_ids) if rng.random() < 0.6 else None for slot in server.MEAL_SLOTS}
+    ).model_dump()) for offset in range(plan_days)]
+    await insert_chunked(database.meal_plans, plans)
+
+    grocery_lists = []
+    for index in range(args.grocery_lists):
+        week_start = PLAN_START + timedelta(weeks=rng.randrange(plan_days // 7))
+        grocery_lists.append(server.prepare_for_mongo(server.GroceryList(
+            name=f"Benchmark list {index}",
+            week_start_date=week_start.isoformat(),
+            items=[server.GroceryItem(
+                name=name.title(), category=server.categorize_ingredient(name),
+                quantity=f"{rng.randint(1, 5)} {rng.choice(units)}".strip(), is_checked=rng.random() < 0.3
+            ) for name in rng.choices(vocabulary, k=args.grocery_items)]
+        ).model_dump()))
+    await insert_chunked(database.grocery_lists, grocery_lists)
+
+    return {"vocabulary": vocabulary, "plan_days": plan_days}
+
+
+def scenario_request(name: str, data: dict, rng: random.Random) -> tuple:
+    """(method, path, keyword arguments) for one request of a scenario"""
+    plan_days = data["plan_days"]
+    if name == "ingredient_search":
+        term = rng.choice(data["vocabulary"])
+        return "POST", "/api/ingredients/search", {"json": {"query": term[:rng.randint(2, 5)], "limit": 10, "match": "prefix"}}
+    if name == "meal_plan_range":
+        start = PLAN_START + timedelta(days=rng.randrange(plan_days - 31))
+        end = start + timedelta(days=rng.choice([6, 13, 30]))
+        return "GET", "/api/meal-plans", {"params": {"start_date": start.isoformat(), "end_date": end.isoformat()}}
+    if name == "week_copy":
+        # Copy a planned week into the year after the seeded plans so reads keep seeing the same data
+        source = PLAN_START + timedelta(weeks=rng.randrange(plan_days // 7))
+        target = PLAN_START + timedelta(days=plan_days, weeks=rng.randrange(52))
+        return "POST", "/api/meal-plans/copy-week", {"json": {
+            "source_week_start": source.isoformat(), "target_week_start": target.isoformat(), "overwrite_existing": True
+        }}
+    if name == "grocery_generate":
+        week_start = PLAN_START + timedelta(weeks=rng.randrange(plan_days // 7))
+        return "POST", "/api/grocery-lists/generate-weekly", {"json": {"week_start_date": week_start.isoformat()}}
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+async def run_scenario(http: httpx.AsyncClient, name: str, data: dict, args, rng: random.Random) -> dict:
+    for _ in range(args.warmup):
+        method, path, kwargs = scenario_request(name, data, rng)
+        await http.request(method, path, **kwargs)
+
+    latencies = []
+    errors = Counter()
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            method, path, kwargs = scenario_request(name, data, rng)
+            started = time.perf_counter()
+            try:
+                response = await http.request(method, path, **kwargs)
+                if response.status_code >= 400:
+                    errors[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "error_kinds": dict(errors),
+        "p50_ms": round(percentiles[49], 2),
+        "p95_ms": round(percentiles[94], 2),
+        "p99_ms": round(percentiles[98], 2),
+        "rps": round(len(latencies) / elapsed, 1),
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """Scenarios whose p95 or throughput moved the wrong way by more than the threshold"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if result["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} ms -> {result['p95_ms']} ms")
+        if result["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['rps']} -> {result['rps']} req/s")
+    return regressions
+
+
+async def wait_for_server(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as http:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                await http.get("/api/ingredients/popular", params={"limit": 1})
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.25)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+async def run_load(args) -> int:
+    rng = random.Random(args.seed)
+    if args.mongo_url:
+        mongo_client = server.AsyncIOMotorClient(args.mongo_url)
+    elif args.uvicorn:
+        print("--uvicorn needs --mongo-url: mongomock data only lives in this process", file=sys.stderr)
+        return 2
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            print("Install mongomock-motor or pass --mongo-url", file=sys.stderr)
+            return 2
+        mongo_client = AsyncMongoMockClient()
+    database = mongo_client[args.db_name]
+    await mongo_client.drop_database(args.db_name)
+
+    started = time.perf_counter()
+    data = await seed_database(database, args, rng)
+    print(f"Seeded {args.meals} meals, {data['plan_days']} days of plans and {args.grocery_lists} grocery lists "
+          f"of {args.grocery_items} items in {time.perf_counter() - started:.1f}s "
+          f"({'MongoDB ' + args.mongo_url if args.mongo_url else 'mongomock-motor'})")
+
+    process = None
+    if args.uvicorn:
+        base_url = f"http://127.0.0.1:{args.port}"
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=Path(__file__).parent / "backend",
+            env={**os.environ, "MONGO_URL": args.mongo_url, "DB_NAME": args.db_name}
+        )
+        await wait_for_server(base_url, process)
+        http = httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=httpx.Limits(max_connections=args.concurrency))
+    else:
+        server.db = database
+        await server.app.router.startup()
+        http = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://benchmark", timeout=60.0)
+
+    results = {}
+    try:
+        print(f"{'scenario':<20}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+        for name in args.scenarios:
+            result = results[name] = await run_scenario(http, name, data, args, rng)
+            print(f"{name:<20}{result['requests']:>9}{result['errors']:>8}{result['p50_ms']:>9.1f}"
+                  f"{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['rps']:>9.1f}")
+    finally:
+        await http.aclose()
+        if process:
+            process.terminate()
+            process.wait()
+        else:
+            await server.app.router.shutdown()
+        if args.mongo_url:
+            await mongo_client.drop_database(args.db_name)
+        mongo_client.close()
+
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("baseline", "save_baseline", "command")},
+        "scenarios": results,
+    }
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {args.save_baseline}")
+
+    failed = False
+    for name, result in results.items():
+        if result["errors"]:
+            print(f"{name}: {result['errors']} failed requests {result['error_kinds']}", file=sys.stderr)
+            failed = True
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        changed = sorted(key for key, value in report["config"].items() if baseline.get("config", {}).get(key, value) != value)
+        if changed:
+            print(f"Warning: baseline was recorded with different settings ({', '.join(changed)})", file=sys.stderr)
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if not regressions:
+            print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Meal planner backend benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serialization = commands.add_parser("serialization", help="Compare list response serialization paths")
+    serialization.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    serialization.add_argument("--repeat", type=int, default=5)
+
+    load = commands.add_parser("load", help="Seed synthetic data and load-test the hot endpoints")
+    load.add_argument("--mongo-url", help="MongoDB to seed and test against (default: in-process mongomock-motor)")
+    load.add_argument("--db-name", default="meal_planner_benchmark", help="Benchmark database; dropped before and after the run")
+    load.add_argument("--uvicorn", action="store_true", help="Serve the app from a uvicorn process (requires --mongo-url)")
+    load.add_argument("--port", type=int, default=8765)
+    load.add_argument("--meals", type=int, default=3000)
+    load.add_argument("--years", type=int, default=3, help="Years of daily meal plans")
+    load.add_argument("--grocery-lists", type=int, default=20)
+    load.add_argument("--grocery-items", type=int, default=300, help="Items per grocery list")
+    load.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    load.add_argument("--requests", type=int, default=500, help="Requests per scenario")
+    load.add_argument("--concurrency", type=int, default=20)
+    load.add_argument("--warmup", type=int, default=20, help="Untimed requests per scenario")
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--save-baseline", help="Write the results to this JSON file")
+    load.add_argument("--baseline", help="Compare against results saved with --save-baseline")
+    load.add_argument("--threshold", type=float, default=0.25, help="Allowed p95/throughput change before failing")
+    args = parser.parse_args()
+
+    if args.command == "serialization":
+        return run_serialization(args.sizes, args.repeat)
+    if args.command == "load":
+        return asyncio.run(run_load(args))
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
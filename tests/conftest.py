@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "meal_planner_test")
+
+import server  # noqa: E402
+
+RECIPE = {
+    "name": "Chicken Rice Bowl",
+    "ingredients": ["2 cups rice", "1 lb chicken breast", "Salt"],
+    "recipe": "Cook the rice.\nGrill the chicken and slice it over the rice.",
+    "suggested_family_preferences": ["dad"],
+    "difficulty_level": "easy",
+    "cooking_time": "30 minutes",
+}
+
+
+class StubChat:
+    """Stands in for the LLM chat: answers every message with `response`, streamed in `chunk_size` pieces"""
+
+    def __init__(self, response: str, chunk_size: int = 7):
+        self.response = response
+        self.chunk_size = chunk_size
+        self.messages = []
+
+    async def send_message(self, message):
+        self.messages.append(message.text)
+        return self.response
+
+    async def stream_message(self, message):
+        self.messages.append(message.text)
+        for start in range(0, len(self.response), self.chunk_size):
+            yield self.response[start:start + self.chunk_size]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Fresh mongomock database and empty in-process indexes and caches for each test"""
+    database = AsyncMongoMockClient()["meal_planner_test"]
+    monkeypatch.setattr(server, "db", database)
+    monkeypatch.setattr(server, "ingredient_index", server.IngredientAutocompleteIndex())
+    monkeypatch.setattr(server, "meal_search_index", server.MealSearchIndex())
+    monkeypatch.setattr(server, "pantry_matcher", server.PantryMatcher())
+    monkeypatch.setattr(server, "analytics_cache", server.AnalyticsCache())
+    monkeypatch.setattr(server, "recipe_cache", server.RecipeSuggestionCache(max_entries=16, ttl_seconds=3600))
+    return database
+
+
+@pytest.fixture
+async def client(db):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as http:
+        yield http
+
+
+@pytest.fixture
+def stub_chat(monkeypatch):
+    """Replace the LLM with a StubChat answering RECIPE; tests can change `.response`"""
+    chat = StubChat(json.dumps(RECIPE))
+    monkeypatch.setenv("EMERGENT_LLM_KEY", "test-key")
+    monkeypatch.setattr(server, "create_recipe_chat", lambda api_key: chat)
+    return chat
@@ -0,0 +1,76 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_meals(client, count: int) -> list:
+    meal_ids = []
+    for index in range(count):
+        response = await client.post("/api/meals", json={
+            "name": f"Meal {index}", "ingredients": [f"ingredient {index}"], "recipe": "Cook."
+        })
+        meal_ids.append(response.json()["id"])
+    return meal_ids
+
+
+async def auto_plan(client, **request) -> dict:
+    response = await client.post("/api/meal-plans/auto-plan", json={"slots": ["dinner"], "dry_run": True, **request})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_meal_planned_weeks_later_does_not_block_earlier_days(client):
+    meal_ids = await create_meals(client, 3)
+    await client.put("/api/meal-plans/2025-01-30", json={"meal_slot": "dinner", "meal_id": meal_ids[0]})
+
+    result = await auto_plan(client, start_date="2025-01-01", end_date="2025-01-03", no_repeat_days=7)
+
+    assert result["filled_count"] == 3
+    assert sorted(assignment["meal_id"] for assignment in result["assignments"]) == sorted(meal_ids)
+
+
+async def test_no_repeat_window_applies_to_plans_after_the_range(client):
+    meal_ids = await create_meals(client, 3)
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": meal_ids[0]})
+
+    result = await auto_plan(client, start_date="2025-01-01", end_date="2025-01-03", no_repeat_days=7)
+
+    assert result["filled_count"] == 2
+    assert result["unfilled_count"] == 1
+    assert meal_ids[0] not in {assignment["meal_id"] for assignment in result["assignments"]}
+
+
+async def test_no_repeat_window_applies_to_plans_before_the_range(client):
+    meal_ids = await create_meals(client, 2)
+    await client.put("/api/meal-plans/2024-12-30", json={"meal_slot": "dinner", "meal_id": meal_ids[0]})
+
+    result = await auto_plan(client, start_date="2025-01-01", end_date="2025-01-01", no_repeat_days=7)
+
+    assert [assignment["meal_id"] for assignment in result["assignments"]] == [meal_ids[1]]
+
+
+async def test_planned_meals_do_not_repeat_within_the_window(client):
+    await create_meals(client, 4)
+
+    result = await auto_plan(client, start_date="2025-01-01", end_date="2025-01-08", no_repeat_days=4)
+
+    days_by_meal = {}
+    for assignment in result["assignments"]:
+        days_by_meal.setdefault(assignment["meal_id"], []).append(int(assignment["date"][-2:]))
+    for days in days_by_meal.values():
+        assert all(later - earlier >= 4 for earlier, later in zip(days, days[1:]))
+    assert result["filled_count"] == 8
+
+
+async def test_slot_history_is_limited_to_recent_plans_and_cached(client, db):
+    meal_ids = await create_meals(client, 2)
+    await client.put("/api/meal-plans/2020-01-01", json={"meal_slot": "breakfast", "meal_id": meal_ids[0]})
+    await client.put("/api/meal-plans/2024-12-01", json={"meal_slot": "dinner", "meal_id": meal_ids[1]})
+
+    history = await server.meal_slot_history(server.date(2025, 1, 1))
+    assert history == {meal_ids[1]: {"dinner": 1}}
+
+    await db.meal_plans.delete_many({})  # Bypasses the API, so the cache is not cleared
+    assert await server.meal_slot_history(server.date(2025, 1, 1)) is history
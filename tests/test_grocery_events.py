@@ -0,0 +1,98 @@
+import pytest
+from starlette.testclient import TestClient
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    """Fresh in-process broker with small queues"""
+    events = server.GroceryEventBroker(queue_size=2)
+    monkeypatch.setattr(server, "grocery_events", events)
+    return events
+
+
+@pytest.fixture
+def sync_client(db, broker):
+    """Starlette TestClient: one event loop shared by HTTP requests and WebSockets"""
+    with TestClient(server.app) as http:
+        yield http
+
+
+def drain(queue) -> list:
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+async def test_broker_fans_events_out_to_every_subscriber_of_the_list(broker):
+    first, second = broker.subscribe("list-1"), broker.subscribe("list-1")
+    other = broker.subscribe("list-2")
+
+    await broker.publish("list-1", {"type": "item_added", "version": 2})
+
+    assert drain(first) == drain(second) == [{"type": "item_added", "version": 2}]
+    assert drain(other) == []
+
+    broker.unsubscribe("list-1", first)
+    broker.unsubscribe("list-1", second)
+    assert broker.subscriber_count("list-1") == 0
+
+
+async def test_broker_replaces_a_full_queue_with_a_resync(broker):
+    queue = broker.subscribe("list-1")
+
+    for version in (2, 3, 4):
+        await broker.publish("list-1", {"type": "item_added", "version": version})
+
+    assert drain(queue) == [{"type": "resync", "list_id": "list-1"}]
+
+
+async def test_stale_expected_version_is_a_conflict(client, db):
+    grocery_list = (await client.post(
+        "/api/grocery-lists", json={"name": "Week", "week_start_date": "2025-01-06", "auto_generate": False}
+    )).json()
+    url = f"/api/grocery-lists/{grocery_list['id']}/items"
+    item = (await client.post(url, params={"only_item": True}, json={"name": "Milk"})).json()
+
+    response = await client.put(
+        f"{url}/{item['id']}", params={"expected_version": grocery_list["version"]}, json={"quantity": "2"}
+    )
+
+    assert response.status_code == 409
+    assert (await client.get(f"/api/grocery-lists/{grocery_list['id']}")).json()["items"][0].get("quantity") is None
+
+
+def test_websocket_sends_a_snapshot_then_newer_changes(sync_client, broker):
+    grocery_list = sync_client.post(
+        "/api/grocery-lists", json={"name": "Week", "week_start_date": "2025-01-06", "auto_generate": False}
+    ).json()
+    list_id = grocery_list["id"]
+
+    with sync_client.websocket_connect(f"/api/grocery-lists/{list_id}/ws") as websocket:
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["list"]["id"] == list_id
+
+        # Already part of the snapshot, so not forwarded
+        sync_client.portal.call(broker.publish, list_id, {"type": "item_added", "version": snapshot["version"]})
+        sync_client.post(f"/api/grocery-lists/{list_id}/items", json={"name": "Milk"})
+
+        event = websocket.receive_json()
+        assert event["type"] == "item_added"
+        assert event["version"] == snapshot["version"] + 1
+        assert event["item"]["name"] == "Milk"
+
+        websocket.send_json({"type": "ping"})
+        assert websocket.receive_json() == {"type": "pong"}
+
+
+def test_websocket_closes_for_an_unknown_list(sync_client):
+    with sync_client.websocket_connect("/api/grocery-lists/missing/ws") as websocket:
+        message = websocket.receive()
+
+    assert message["type"] == "websocket.close"
+    assert message["code"] == 4404
@@ -0,0 +1,32 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_weekly_items_sum_planned_quantities(client):
+    meal = (await client.post("/api/meals", json={"name": "Rice bowl", "ingredients": ["1 cup rice"], "recipe": "x"})).json()
+    for plan_date in ("2025-01-06", "2025-01-08"):
+        await client.put(f"/api/meal-plans/{plan_date}", json={"meal_slot": "dinner", "meal_id": meal["id"]})
+
+    response = await client.post("/api/grocery-lists/generate-weekly", json={"week_start_date": "2025-01-06"})
+
+    assert response.status_code == 200
+    assert [(item["name"], item["quantity"]) for item in response.json()] == [("Rice", "2 cups")]
+
+
+async def test_weekly_items_reject_a_bad_start_date(client):
+    response = await client.post("/api/grocery-lists/generate-weekly", json={"week_start_date": "06/01/2025"})
+
+    assert response.status_code == 400
+
+
+async def test_weekly_items_report_generation_errors_as_server_errors(client, monkeypatch):
+    async def broken_generation(*args, **kwargs):
+        raise ValueError("could not parse quantity")
+
+    monkeypatch.setattr(server, "generate_grocery_items", broken_generation)
+    response = await client.post("/api/grocery-lists/generate-weekly", json={"week_start_date": "2025-01-06"})
+
+    assert response.status_code == 500
@@ -0,0 +1,62 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_meal(client, name: str, ingredients: list) -> str:
+    response = await client.post("/api/meals", json={"name": name, "ingredients": ingredients, "recipe": "Cook."})
+    return response.json()["id"]
+
+
+async def create_linked_list(client) -> dict:
+    response = await client.post("/api/grocery-lists", json={"name": "Week", "week_start_date": "2025-01-06"})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_plan_changes_update_linked_list_items(client):
+    soup = await create_meal(client, "Soup", ["1 onion", "2 carrots"])
+    grocery_list = await create_linked_list(client)
+
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": soup})
+    await client.put("/api/meal-plans/2025-01-07", json={"meal_slot": "lunch", "meal_id": soup})
+
+    stored = (await client.get(f"/api/grocery-lists/{grocery_list['id']}")).json()
+    assert {item["name"]: item["quantity"] for item in stored["items"]} == {"Onion": "2", "Carrot": "4"}
+    assert stored["version"] == grocery_list["version"] + 2
+
+
+async def test_sync_from_a_stale_read_retries_instead_of_duplicating_items(client, db):
+    soup = await create_meal(client, "Soup", ["1 onion"])
+    stew = await create_meal(client, "Stew", ["2 onions"])
+    grocery_list = await create_linked_list(client)
+    stale = await db.grocery_lists.find({"id": grocery_list["id"]}, server.LINKED_GROCERY_LIST_FIELDS).to_list(None)
+
+    # Another plan write lands between the read above and the sync below
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": soup})
+    changed = await server.sync_grocery_lists({("2025-01-07", "dinner"): stew}, stale)
+
+    stored = (await client.get(f"/api/grocery-lists/{grocery_list['id']}")).json()
+    assert changed == 1
+    assert [item["name"] for item in stored["items"]] == ["Onion"]
+    assert [source["meal_name"] for source in stored["items"][0]["sources"]] == ["Soup", "Stew"]
+    assert stored["items"][0]["quantity"] == "3"
+    assert stored["version"] == grocery_list["version"] + 2
+
+
+async def test_sync_keeps_an_item_checked_while_the_list_was_read(client, db):
+    soup = await create_meal(client, "Soup", ["1 onion", "1 leek"])
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": soup})
+    grocery_list = await create_linked_list(client)
+    stale = await db.grocery_lists.find({"id": grocery_list["id"]}, server.LINKED_GROCERY_LIST_FIELDS).to_list(None)
+
+    leek = next(item for item in grocery_list["items"] if item["name"] == "Leek")
+    await client.put(f"/api/grocery-lists/{grocery_list['id']}/items/{leek['id']}", json={"is_checked": True})
+    await server.sync_grocery_lists({("2025-01-07", "lunch"): soup}, stale)
+
+    stored = (await client.get(f"/api/grocery-lists/{grocery_list['id']}")).json()
+    items = {item["name"]: item for item in stored["items"]}
+    assert items["Leek"]["is_checked"] is True
+    assert items["Leek"]["quantity"] == "2"
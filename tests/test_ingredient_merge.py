@@ -0,0 +1,71 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def insert_ingredients(db, *ingredients):
+    await server.ensure_indexes(db)
+    await db.ingredients.insert_many([
+        {"id": name, "name": name, "normalized_name": key, "usage_count": usage, "is_common": False}
+        for name, key, usage in ingredients
+    ])
+
+
+async def stored_keys(db) -> dict:
+    return {doc["name"]: doc["normalized_name"] async for doc in db.ingredients.find({})}
+
+
+async def test_startup_rekeys_without_deleting_duplicates(db):
+    await insert_ingredients(db, ("Fresh Basil", "fresh basil", 1), ("Basil", "basil", 5), ("Cookies", "cooky", 2))
+
+    await server.canonicalize_ingredient_keys()
+
+    assert await stored_keys(db) == {"Fresh Basil": "fresh basil", "Basil": "basil", "Cookies": "cookie"}
+
+
+async def test_dry_run_reports_without_writing(client, db):
+    await insert_ingredients(db, ("Fresh Basil", "fresh basil", 1), ("Basil", "basil", 5))
+
+    response = await client.post("/api/admin/ingredients/merge-duplicates", params={"dry_run": True})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["merged"] == [{"key": "basil", "kept": "Basil", "merged": ["Fresh Basil"]}]
+    assert report["removed_count"] == 1
+    assert await db.ingredients.count_documents({}) == 2
+
+
+async def test_merge_moves_a_key_still_held_as_a_stale_key(client, db):
+    # Each key is still held by the other document, as after a canonicalizer rule change
+    await insert_ingredients(
+        db, ("Cookie", "cooky", 3), ("Cooky", "cookie", 1), ("Tomatoes", "tomatoes", 2), ("Tomato", "tomato", 1)
+    )
+
+    response = await client.post("/api/admin/ingredients/merge-duplicates")
+
+    assert response.status_code == 200
+    assert response.json()["conflicts"] == []
+    assert await stored_keys(db) == {"Cookie": "cookie", "Cooky": "cooky", "Tomatoes": "tomato"}
+    assert (await db.ingredients.find_one({"name": "Tomatoes"}))["usage_count"] == 3
+
+
+async def test_startup_gives_legacy_duplicates_without_keys_a_key_each(client, db):
+    # Written before normalized_name existed, so none of them has one
+    await db.ingredients.insert_many([
+        {"id": name, "name": name, "usage_count": usage, "is_common": False}
+        for name, usage in [("Rice", 4), ("2 Cups Rice", 1), ("Tomato", 1), ("Tomatoes", 2)]
+    ])
+
+    await server.canonicalize_ingredient_keys()
+    await server.ensure_indexes(db)
+
+    keys = await stored_keys(db)
+    assert (keys["Rice"], keys["Tomatoes"]) == ("rice", "tomato")
+    assert keys["2 Cups Rice"].startswith("legacy:") and keys["Tomato"].startswith("legacy:")
+    assert "normalized_name_unique" in await db.ingredients.index_information()
+
+    response = await client.post("/api/ingredients", json={"name": "rice"})
+    assert response.status_code == 200
+    assert response.json()["usage_count"] == 5
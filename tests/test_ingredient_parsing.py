@@ -0,0 +1,75 @@
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize("text, key", [
+    ("2 cups chopped onions", "onion"),
+    ("Onion", "onion"),
+    ("onion, diced", "onion"),
+    ("1 (14 oz) can tomatoes", "tomato"),
+    ("Roma tomatoes", "tomato"),
+    ("½ cup parmesan", "parmesan cheese"),
+    ("a pinch of salt", "salt"),
+    ("Scallions", "green onion"),
+    ("Bay leaves", "bay leaf"),
+    ("Potatoes", "potato"),
+    ("Asparagus", "asparagus"),
+    ("Hummus", "hummus"),
+    ("Cookies", "cookie"),
+    ("Brownies", "brownie"),
+    ("Veggies", "veggie"),
+    ("Berries", "berry"),
+])
+def test_canonical_key(text, key):
+    assert server.ingredient_key(text) == key
+
+
+def test_canonical_display_name():
+    assert server.canonical_ingredient_name("2 cups chopped onions") == "Onion"
+    assert server.canonical_ingredient_name("½ cup parmesan") == "Parmesan Cheese"
+    assert server.canonical_ingredient_name("Chocolate chip cookies") == "Chocolate Chip Cookie"
+
+
+def test_text_without_an_ingredient_is_kept():
+    assert server.ingredient_key("  To   Taste ") == "to taste"
+
+
+@pytest.mark.parametrize("text, parsed", [
+    ("1 1/2 cups flour", (1.5, "cup")),
+    ("200g rice", (200.0, "g")),
+    ("½ cup milk", (0.5, "cup")),
+    ("2 tbsp. oil", (2.0, "tbsp")),
+    ("3 cloves garlic", (3.0, "clove")),
+    ("two cans beans", (2.0, "can")),
+    ("1-2 lemons", (2.0, None)),
+    ("1 (14 oz) can tomatoes", (1.0, "can")),
+    ("2 onions", (2.0, None)),
+    ("Salt", None),
+])
+def test_quantity_parser(text, parsed):
+    assert server.ingredient_quantity_parser.parse(text) == parsed
+
+
+def test_quantities_convert_within_a_measuring_system():
+    total = server.QuantityTotal()
+    total.add("500g chicken")
+    total.add("1 kg chicken")
+    assert total.format() == "1.5 kg"
+
+
+def test_quantities_count_repeated_meals():
+    total = server.QuantityTotal()
+    total.add("1 cup rice")
+    total.add("2 cups rice", times=2)
+    assert total.format() == "5 cups"
+
+
+def test_quantities_in_different_dimensions_are_listed_separately():
+    total = server.QuantityTotal()
+    total.add("a dozen eggs")
+    total.add("3 eggs")
+    total.add("2 tbsp oil")
+    total.add("3 cloves garlic")
+    total.add("salt")
+    assert total.format() == "15 + 2 tbsp + 3 cloves"
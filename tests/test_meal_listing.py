@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_all_meal_list_forms_use_the_same_timestamp_format(client):
+    created = await client.post("/api/meals", json={"name": "Soup", "ingredients": ["Water"], "recipe": "Boil."})
+    created_at = created.json()["created_at"]
+    assert created_at.endswith("Z")
+
+    full = (await client.get("/api/meals")).json()
+    partial = (await client.get("/api/meals", params={"fields": "name"})).json()
+    streamed = [json.loads(line) for line in (await client.get("/api/meals", params={"stream": True})).text.splitlines()]
+
+    assert full[0]["created_at"] == created_at
+    assert partial == [{"id": created.json()["id"], "name": "Soup", "created_at": created_at}]
+    assert streamed[0]["created_at"] == created_at
+
+
+async def test_paging_passes_legacy_meals_without_created_at(client, db):
+    # Stored before meals had a creation time
+    await db.meals.insert_many([
+        {"id": meal_id, "name": meal_id, "ingredients": ["Water"], "recipe": "Boil."} for meal_id in ("legacy-b", "legacy-a")
+    ])
+    created = await client.post("/api/meals", json={"name": "Soup", "ingredients": ["Water"], "recipe": "Boil."})
+
+    seen, cursor = [], None
+    for _ in range(4):
+        params = {"limit": 1, "fields": "name", **({"cursor": cursor} if cursor else {})}
+        page = await client.get("/api/meals", params=params)
+        assert page.status_code == 200, page.text
+        seen += [meal["id"] for meal in page.json()]
+        cursor = page.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == ["legacy-a", "legacy-b", created.json()["id"]]
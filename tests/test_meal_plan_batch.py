@@ -0,0 +1,52 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_meal(client, name: str, ingredients: list) -> str:
+    response = await client.post("/api/meals", json={"name": name, "ingredients": ingredients, "recipe": "Cook."})
+    return response.json()["id"]
+
+
+async def patch_slots(client, *assignments):
+    return await client.patch("/api/meal-plans", json={"assignments": [
+        {"date": plan_date, "meal_slot": slot, "meal_id": meal_id} for plan_date, slot, meal_id in assignments
+    ]})
+
+
+async def test_batch_keeps_other_slots_of_the_day(client):
+    soup = await create_meal(client, "Soup", ["1 onion"])
+    stew = await create_meal(client, "Stew", ["2 carrots"])
+    # Written by someone else after this client loaded the day
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "lunch", "meal_id": soup})
+
+    response = await patch_slots(
+        client, ("2025-01-06", "dinner", soup), ("2025-01-07", "dinner", soup), ("2025-01-06", "dinner", stew)
+    )
+
+    assert response.status_code == 200, response.text
+    plans = {plan["date"]: plan for plan in response.json()}
+    assert list(plans) == ["2025-01-06", "2025-01-07"]
+    assert (plans["2025-01-06"]["lunch"], plans["2025-01-06"]["dinner"]) == (soup, stew)
+    assert plans["2025-01-07"]["dinner"] == soup
+
+
+async def test_batch_with_an_unknown_slot_is_rejected_whole(client, db):
+    soup = await create_meal(client, "Soup", ["1 onion"])
+
+    response = await patch_slots(client, ("2025-01-06", "dinner", soup), ("2025-01-06", "brunch", soup))
+
+    assert response.status_code == 400
+    assert await db.meal_plans.count_documents({}) == 0
+
+
+async def test_batch_updates_linked_grocery_lists(client):
+    soup = await create_meal(client, "Soup", ["1 onion", "2 carrots"])
+    grocery_list = (await client.post(
+        "/api/grocery-lists", json={"name": "Week", "week_start_date": "2025-01-06"}
+    )).json()
+
+    await patch_slots(client, ("2025-01-06", "dinner", soup), ("2025-01-08", "lunch", soup))
+
+    stored = (await client.get(f"/api/grocery-lists/{grocery_list['id']}")).json()
+    assert {item["name"]: item["quantity"] for item in stored["items"]} == {"Onion": "2", "Carrot": "4"}
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def sweep(monkeypatch):
+    state = {"status": "idle", "scanned_plans": 0, "cleared_slots": 0, "started_at": None, "finished_at": None}
+    monkeypatch.setattr(server, "meal_reference_sweep", state)
+    return state
+
+
+async def test_second_start_is_rejected_before_the_first_sweep_runs(db, sweep):
+    await server.start_meal_reference_repair(BackgroundTasks())
+
+    assert sweep["status"] == "running"
+    with pytest.raises(HTTPException) as error:
+        await server.start_meal_reference_repair(BackgroundTasks())
+    assert error.value.status_code == 409
+
+
+async def test_sweep_clears_slots_of_deleted_meals(client, db, sweep):
+    meal = (await client.post("/api/meals", json={"name": "Soup", "ingredients": ["Water"], "recipe": "Boil."})).json()
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": meal["id"]})
+    await db.meals.delete_many({})  # Bypasses the API, so the plan keeps its reference
+
+    response = await client.post("/api/admin/repair-meal-references")
+
+    assert response.status_code == 202
+    status = (await client.get("/api/admin/repair-meal-references")).json()
+    assert status["status"] == "completed"
+    assert status["cleared_slots"] == 1
+    plan = await db.meal_plans.find_one({"date": "2025-01-06"})
+    assert plan["dinner"] is None
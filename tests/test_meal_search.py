@@ -0,0 +1,46 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_meal(client, name: str, ingredients: list, recipe: str = "Cook.") -> str:
+    response = await client.post("/api/meals", json={"name": name, "ingredients": ingredients, "recipe": recipe})
+    return response.json()["id"]
+
+
+async def search(client, **params) -> list:
+    response = await client.get("/api/meals/search", params=params)
+    assert response.status_code == 200, response.text
+    return [result["name"] for result in response.json()["results"]]
+
+
+async def test_name_match_outranks_ingredient_and_recipe_matches(client):
+    await create_meal(client, "Garden salad", ["lettuce", "tomato"], "Serve with grilled chicken on the side.")
+    await create_meal(client, "Rice bowl", ["rice", "chicken thigh"])
+    await create_meal(client, "Chicken curry", ["chicken breast", "curry paste"])
+    await create_meal(client, "Pancakes", ["flour", "milk"])
+
+    assert await search(client, q="chicken") == ["Chicken curry", "Rice bowl", "Garden salad"]
+    # The last word may still be being typed
+    assert await search(client, q="chick") == ["Chicken curry", "Rice bowl", "Garden salad"]
+
+
+async def test_ingredient_filters(client):
+    await create_meal(client, "Rice bowl", ["2 cups rice", "chicken thigh"])
+    await create_meal(client, "Veggie rice", ["rice", "peas"])
+
+    assert await search(client, q="rice", include="chicken") == ["Rice bowl"]
+    assert await search(client, q="rice", exclude="chicken") == ["Veggie rice"]
+
+
+async def test_index_follows_edits_and_deletes(client):
+    meal_id = await create_meal(client, "Tomato soup", ["tomatoes", "onion"])
+    assert await search(client, q="soup") == ["Tomato soup"]  # Loads the index
+
+    await client.put(f"/api/meals/{meal_id}", json={"name": "Lentil stew", "ingredients": ["lentils"], "recipe": "Simmer."})
+    assert await search(client, q="soup") == []
+    assert await search(client, q="tomato") == []
+    assert await search(client, q="lentil") == ["Lentil stew"]
+
+    await client.delete(f"/api/meals/{meal_id}")
+    assert await search(client, q="lentil") == []
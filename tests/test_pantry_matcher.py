@@ -0,0 +1,79 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_missing_ingredients_use_the_canonical_name(client, db):
+    await server.pantry_matcher.load(db)  # As at startup; new meals then go straight into the matcher
+    await client.post("/api/meals", json={"name": "A", "ingredients": ["2 cups chopped onions", "1 cup rice"], "recipe": "x"})
+    await client.post("/api/meals", json={"name": "B", "ingredients": ["1 onion, diced", "2 cups rice"], "recipe": "x"})
+
+    response = await client.post("/api/meals/what-can-i-cook", json={"ingredients": ["rice"]})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert {result["name"] for result in results} == {"A", "B"}
+    for result in results:
+        assert result["missing_ingredients"] == ["Onion"]
+        assert result["coverage"] == 0.5
+
+
+async def test_ingredients_collection_names_are_shown(client):
+    await client.post("/api/ingredients/seed")
+    await client.post("/api/meals", json={"name": "Stir fry", "ingredients": ["2 bell peppers, sliced", "Rice"], "recipe": "x"})
+
+    results = (await client.post("/api/meals/what-can-i-cook", json={"ingredients": ["rice"]})).json()
+
+    assert results[0]["missing_ingredients"] == ["Bell peppers"]
+
+
+async def test_meals_are_ranked_by_pantry_coverage(client, db):
+    await server.pantry_matcher.load(db)
+    await client.post("/api/meals", json={"name": "Burrito", "ingredients": ["Rice", "Avocado", "Salsa"], "recipe": "x"})
+    await client.post("/api/meals", json={"name": "Chicken rice", "ingredients": ["Rice", "Chicken"], "recipe": "x"})
+    await client.post("/api/meals", json={"name": "Pancakes", "ingredients": ["Flour", "Milk"], "recipe": "x"})
+
+    response = await client.post("/api/meals/what-can-i-cook", json={"ingredients": ["rice", "chicken"]})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["name"] for result in results] == ["Chicken rice", "Burrito"]
+    assert results[0]["coverage"] == 1.0
+    assert results[1]["missing_ingredients"] == ["Avocado", "Salsa"]
+
+
+def match_one(ingredients: list, pantry: list) -> dict:
+    matcher = server.PantryMatcher()
+    matcher.upsert({"id": "meal", "name": "Meal", "ingredients": ingredients})
+    results = matcher.match(pantry, limit=10)
+    return results[0] if results else None
+
+
+@pytest.mark.parametrize("ingredients, pantry, missing", [
+    (["1 tbsp cornstarch", "2 cups rice"], ["corn", "rice"], ["Cornstarch"]),
+    (["Peanut butter", "Bread"], ["pea", "bread"], ["Peanut Butter"]),
+    (["1 eggplant", "Olive oil"], ["egg", "olive oil"], ["Eggplant"]),
+    (["Hamburger buns", "Lettuce"], ["ham", "lettuce"], ["Hamburger Bun"]),
+])
+def test_pantry_items_do_not_match_words_that_start_with_them(ingredients, pantry, missing):
+    result = match_one(ingredients, pantry)
+
+    assert result["coverage"] == 0.5
+    assert result["missing_ingredients"] == missing
+
+
+def test_pantry_items_match_ingredients_ending_in_them():
+    result = match_one(["2 cups brown rice", "Black beans"], ["rice", "beans"])
+
+    assert result["coverage"] == 1.0
+    assert result["missing_ingredients"] == []
+
+
+def test_one_loose_pantry_item_covers_one_ingredient_per_meal():
+    result = match_one(["Parmesan cheese", "Cheddar cheese", "Pasta"], ["cheese", "pasta"])
+
+    assert result["matched_count"] == 2
+    assert result["missing_count"] == 1
+    assert result["missing_ingredients"] == ["Cheddar Cheese"]
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def llm_slots(monkeypatch):
+    """Allow two concurrent AI calls, in a semaphore owned by this test's event loop"""
+    monkeypatch.setattr(server, "_llm_semaphore", asyncio.Semaphore(2))
+
+
+def recipe(name: str, ingredients: list) -> str:
+    return json.dumps({"name": name, "ingredients": ingredients, "recipe": "Cook it."})
+
+
+async def test_batch_runs_at_most_the_semaphore_bound_at_once(client, stub_chat, llm_slots, monkeypatch):
+    in_flight, peak = 0, 0
+
+    async def send_message(message):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return recipe(message.text, [message.text])
+
+    monkeypatch.setattr(stub_chat, "send_message", send_message)
+    prompts = [f"Dish number {index}" for index in range(5)]
+
+    response = await client.post("/api/suggest-recipes/batch", json={"requests": [{"prompt": p} for p in prompts]})
+
+    assert response.status_code == 200
+    assert len(response.json()["suggestions"]) == 5
+    assert peak == 2
+
+
+async def test_identical_prompts_come_back_once(client, stub_chat, llm_slots):
+    requests = [{"prompt": "Chicken rice bowl"}, {"prompt": "Chicken rice bowl"}]
+
+    result = (await client.post("/api/suggest-recipes/batch", json={"requests": requests})).json()
+
+    assert [suggestion["name"] for suggestion in result["suggestions"]] == ["Chicken Rice Bowl"]
+    assert result["duplicates_removed"] == 1
+    assert result["errors"] == []
+
+
+async def test_one_failing_prompt_does_not_fail_the_batch(client, stub_chat, llm_slots, monkeypatch):
+    async def send_message(message):
+        if "Broken" in message.text:
+            raise RuntimeError("model unavailable")
+        return recipe("Pancakes", ["flour", "milk", "egg"])
+
+    monkeypatch.setattr(stub_chat, "send_message", send_message)
+    requests = [{"prompt": "Broken dish"}, {"prompt": "Pancakes"}]
+
+    response = await client.post("/api/suggest-recipes/batch", json={"requests": requests})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert [suggestion["name"] for suggestion in result["suggestions"]] == ["Pancakes"]
+    assert result["errors"] == [{"index": 0, "prompt": "Broken dish", "error": "Failed to generate recipe suggestion"}]
+
+
+async def test_closing_the_stream_cancels_unfinished_calls(db, stub_chat, llm_slots, monkeypatch):
+    cancelled = []
+
+    async def send_message(message):
+        if "Slow" in message.text:
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(message.text)
+                raise
+        return recipe("Toast", ["bread"])
+
+    monkeypatch.setattr(stub_chat, "send_message", send_message)
+    batch = server.RecipeSuggestionBatchRequest(requests=[{"prompt": "Toast"}, {"prompt": "Slow stew"}])
+
+    results = server.iter_batch_suggestions(batch)
+    first = await results.__anext__()
+    await results.aclose()
+
+    assert first["suggestion"].name == "Toast"
+    assert len(cancelled) == 1
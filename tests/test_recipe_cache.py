@@ -0,0 +1,74 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+REQUEST = {"prompt": "Healthy chicken dinner for kids", "dietary_preferences": ["Low-Carb", "gluten-free"]}
+
+
+async def test_repeat_request_is_served_from_memory(client, stub_chat):
+    first = await client.post("/api/suggest-recipe", json=REQUEST)
+    # Casing, spacing and preference order do not change the cache key
+    second = await client.post("/api/suggest-recipe", json={
+        "prompt": "  healthy CHICKEN dinner   for kids ", "dietary_preferences": ["gluten-free", "low-carb"]
+    })
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert len(stub_chat.messages) == 1
+    stats = (await client.get("/api/suggest-recipe/cache-stats")).json()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["memory_entries"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+async def test_mongo_tier_survives_losing_the_memory_tier(client, stub_chat):
+    await client.post("/api/suggest-recipe", json=REQUEST)
+    server.recipe_cache._entries.clear()  # As after a restart
+
+    response = await client.post("/api/suggest-recipe", json=REQUEST)
+
+    assert response.status_code == 200
+    assert len(stub_chat.messages) == 1
+    stats = (await client.get("/api/suggest-recipe/cache-stats")).json()
+    assert stats["mongo_hits"] == 1
+    assert stats["memory_entries"] == 1  # Promoted back into memory
+
+
+async def test_expired_entries_are_not_served(client, stub_chat, monkeypatch):
+    monkeypatch.setattr(server, "recipe_cache", server.RecipeSuggestionCache(max_entries=16, ttl_seconds=0))
+
+    await client.post("/api/suggest-recipe", json=REQUEST)
+    await client.post("/api/suggest-recipe", json=REQUEST)
+
+    assert len(stub_chat.messages) == 2
+    stats = (await client.get("/api/suggest-recipe/cache-stats")).json()
+    assert stats["misses"] == 2
+    assert stats["memory_hits"] == stats["mongo_hits"] == 0
+
+
+async def test_bypass_cache_asks_the_ai_and_refreshes_the_entry(client, stub_chat):
+    await client.post("/api/suggest-recipe", json=REQUEST)
+    stub_chat.response = stub_chat.response.replace("Chicken Rice Bowl", "Chicken Noodle Bowl")
+
+    bypassed = await client.post("/api/suggest-recipe", json={**REQUEST, "bypass_cache": True})
+    cached = await client.post("/api/suggest-recipe", json=REQUEST)
+
+    assert len(stub_chat.messages) == 2
+    assert bypassed.json()["name"] == cached.json()["name"] == "Chicken Noodle Bowl"
+    stats = (await client.get("/api/suggest-recipe/cache-stats")).json()
+    assert stats["bypassed"] == 1
+    assert stats["memory_hits"] == 1
+
+
+async def test_memory_tier_evicts_least_recently_used(db):
+    cache = server.RecipeSuggestionCache(max_entries=2, ttl_seconds=3600)
+    suggestion = server.AIRecipeSuggestion(name="Soup", ingredients=["Water"], recipe="Boil.")
+    for key in ("a", "b"):
+        await cache.set(db, key, suggestion)
+    await cache.get(db, "a")
+    await cache.set(db, "c", suggestion)
+
+    assert list(cache._entries) == ["a", "c"]
@@ -0,0 +1,155 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import server
+from .conftest import RECIPE
+
+
+def feed_in_chunks(text: str, chunk_size: int) -> list:
+    parser = server.IncrementalRecipeParser()
+    events = []
+    for start in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[start:start + chunk_size]))
+    assert parser.done
+    return events
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 16, 10_000])
+def test_events_do_not_depend_on_chunking(chunk_size):
+    events = feed_in_chunks("Here you go:\n" + json.dumps(RECIPE, indent=2), chunk_size)
+
+    assert events[0] == ("name", {"name": "Chicken Rice Bowl"})
+    assert [data["ingredient"] for event, data in events if event == "ingredient"] == RECIPE["ingredients"]
+    assert "".join(data["delta"] for event, data in events if event == "recipe") == RECIPE["recipe"]
+    fields = {data["key"]: data["value"] for event, data in events if event == "field"}
+    assert fields == {
+        "suggested_family_preferences": ["dad"], "difficulty_level": "easy", "cooking_time": "30 minutes"
+    }
+
+
+def test_recipe_text_streams_before_the_string_ends():
+    parser = server.IncrementalRecipeParser()
+    parser.feed('{"name": "Soup", "ingredients": ["Water"], "recipe": "Boil the wa')
+    events = parser.feed("ter")
+
+    assert events == [("recipe", {"delta": "ter"})]
+    assert not parser.done
+
+
+def test_escapes_split_across_chunks_are_decoded_whole():
+    text = json.dumps({"name": "Crème brûlée 🍮", "ingredients": ["1 \"large\" egg"], "recipe": "Stir\né"})
+    events = feed_in_chunks(text, 1)
+
+    assert events[0] == ("name", {"name": "Crème brûlée 🍮"})
+    assert events[1] == ("ingredient", {"index": 0, "ingredient": '1 "large" egg'})
+    assert "".join(data["delta"] for event, data in events if event == "recipe") == "Stir\né"
+
+
+def test_numbers_and_nested_values_are_reported_as_fields():
+    events = feed_in_chunks('{"name": "Stew", "servings": 4, "nutrition": {"kcal": [300, 400]}, "spicy": false}', 5)
+
+    assert events[1:] == [
+        ("field", {"key": "servings", "value": 4}),
+        ("field", {"key": "nutrition", "value": {"kcal": [300, 400]}}),
+        ("field", {"key": "spicy", "value": False}),
+    ]
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+@pytest.mark.anyio
+async def test_stream_endpoint_emits_events_from_a_streaming_llm(client, stub_chat):
+    response = await client.post("/api/suggest-recipe/stream", json={"prompt": "chicken dinner"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert events[0] == ("name", {"name": "Chicken Rice Bowl"})
+    assert [data["ingredient"] for event, data in events if event == "ingredient"] == RECIPE["ingredients"]
+    assert len([event for event, _ in events if event == "recipe"]) > 1  # Arrived in pieces
+    assert events[-1] == ("complete", {**RECIPE, "cuisine_type": None})
+
+    # The finished suggestion is cached for the regular endpoint
+    cached = await client.post("/api/suggest-recipe", json={"prompt": "chicken dinner"})
+    assert cached.json()["name"] == "Chicken Rice Bowl"
+    assert len(stub_chat.messages) == 1
+
+
+@pytest.mark.anyio
+async def test_name_is_sent_before_the_model_finishes(db, stub_chat):
+    release = asyncio.Event()
+    text = json.dumps(RECIPE)
+    split = text.index('"ingredients"')
+
+    async def slow_stream(message):
+        yield text[:split]
+        await release.wait()
+        yield text[split:]
+
+    stub_chat.stream_message = slow_stream
+    events = server.stream_recipe_events(server.RecipeSuggestionRequest(prompt="chicken dinner"))
+
+    first = await asyncio.wait_for(events.__anext__(), timeout=1)
+    assert first.startswith("event: name")
+    release.set()
+    assert [chunk async for chunk in events][-1].startswith("event: complete")
+
+
+@pytest.mark.anyio
+async def test_failed_stream_falls_back_to_the_whole_response(client, stub_chat):
+    async def broken_stream(message):
+        raise RuntimeError("streaming not supported")
+        yield
+
+    stub_chat.stream_message = broken_stream
+    response = await client.post("/api/suggest-recipe/stream", json={"prompt": "chicken dinner"})
+
+    events = parse_sse(response.text)
+    assert events[0] == ("name", {"name": "Chicken Rice Bowl"})
+    assert events[-1][0] == "complete"
+
+
+@pytest.mark.anyio
+async def test_recipe_chat_streams_litellm_deltas(monkeypatch):
+    requests = []
+
+    async def fake_acompletion(**kwargs):
+        requests.append(kwargs)
+
+        async def chunks():
+            for content in ['{"name": ', None, '"Soup"}']:
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+        return chunks()
+
+    monkeypatch.setattr(server.litellm, "acompletion", fake_acompletion)
+    monkeypatch.setenv("LLM_API_BASE", "https://llm.example.test/v1")
+    chat = server.RecipeChat("sk-test")
+
+    chunks = [chunk async for chunk in chat.stream_message(server.UserMessage(text="soup"))]
+
+    assert chunks == ['{"name": ', '"Soup"}']
+    assert requests[0]["stream"] is True
+    assert requests[0]["model"] == "openai/gpt-4o-mini"
+    assert requests[0]["api_base"] == "https://llm.example.test/v1"
+    assert requests[0]["messages"][-1] == {"role": "user", "content": "soup"}
+
+
+@pytest.mark.anyio
+async def test_recipe_chat_does_not_stream_without_an_api_base(monkeypatch):
+    async def fake_acompletion(**kwargs):
+        raise AssertionError("litellm should not be called")
+
+    monkeypatch.setattr(server.litellm, "acompletion", fake_acompletion)
+    monkeypatch.delenv("LLM_API_BASE", raising=False)
+    chat = server.RecipeChat("sk-emergent-test")
+
+    with pytest.raises(RuntimeError, match="LLM_API_BASE"):
+        await chat.stream_message(server.UserMessage(text="soup")).__anext__()
@@ -0,0 +1,140 @@
+import pytest
+
+import server
+
+pytestmark = pytest.mark.anyio
+
+
+async def stamp_plan(db, plan_date: str, sync_version: int):
+    """Commit a meal plan write with an already allocated change number"""
+    await db.meal_plans.update_one(
+        {"date": plan_date}, server.meal_plan_slot_update(plan_date, {"dinner": None}, sync_version), upsert=True
+    )
+
+
+async def test_changes_cursor_waits_for_writes_that_commit_out_of_order(client, db):
+    first = await server.next_sync_version()
+    second = await server.next_sync_version()
+    await stamp_plan(db, "2025-01-07", second)  # The later number commits first
+    await server.finish_sync_version(second)
+
+    early = (await client.get("/api/meal-plans/changes", params={"since": 0})).json()
+    assert [plan["date"] for plan in early["meal_plans"]] == ["2025-01-07"]
+    assert early["version"] < first
+
+    await stamp_plan(db, "2025-01-06", first)
+    await server.finish_sync_version(first)
+    late = (await client.get("/api/meal-plans/changes", params={"since": early["version"]})).json()
+    assert [plan["date"] for plan in late["meal_plans"]] == ["2025-01-06", "2025-01-07"]
+    assert late["version"] == second
+
+
+async def test_changes_cursor_moves_on_as_soon_as_writes_finish(client, db):
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": None})
+    await client.put("/api/meal-plans/2025-01-07", json={"meal_slot": "dinner", "meal_id": None})
+
+    changes = (await client.get("/api/meal-plans/changes", params={"since": 0, "limit": 1})).json()
+    assert [plan["date"] for plan in changes["meal_plans"]] == ["2025-01-06"]
+    assert changes["has_more"] is True
+
+    rest = (await client.get("/api/meal-plans/changes", params={"since": changes["version"]})).json()
+    assert [plan["date"] for plan in rest["meal_plans"]] == ["2025-01-07"]
+    assert rest["has_more"] is False
+    assert (await client.get("/api/meal-plans/changes", params={"since": rest["version"]})).json()["meal_plans"] == []
+
+
+async def test_failed_write_does_not_hold_the_cursor_back(client, db):
+    with pytest.raises(RuntimeError):
+        async with server.sync_change():
+            raise RuntimeError("write failed")
+    await client.put("/api/meal-plans/2025-01-06", json={"meal_slot": "dinner", "meal_id": None})
+
+    changes = (await client.get("/api/meal-plans/changes", params={"since": 0})).json()
+    assert [plan["date"] for plan in changes["meal_plans"]] == ["2025-01-06"]
+    assert changes["version"] == 2
+
+
+async def test_range_etag_changes_when_an_older_number_commits_late(client, db):
+    first = await server.next_sync_version()
+    second = await server.next_sync_version()
+    await stamp_plan(db, "2025-01-06", 0)
+    await stamp_plan(db, "2025-01-07", second)
+    params = {"start_date": "2025-01-06", "end_date": "2025-01-07"}
+
+    cached = await client.get("/api/meal-plans", params=params)
+    assert cached.status_code == 200
+    etag = cached.headers["etag"]
+    assert (await client.get("/api/meal-plans", params=params, headers={"If-None-Match": etag})).status_code == 304
+
+    # Neither the highest number nor the document count changes
+    await stamp_plan(db, "2025-01-06", first)
+    refreshed = await client.get("/api/meal-plans", params=params, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+async def test_abandoned_change_number_stops_holding_the_cursor_back(client, db, monkeypatch):
+    await server.next_sync_version()  # Its writer died before finishing
+    for day in ("2025-01-06", "2025-01-07"):
+        await client.put(f"/api/meal-plans/{day}", json={"meal_slot": "dinner", "meal_id": None})
+
+    held = (await client.get("/api/meal-plans/changes", params={"since": 0})).json()
+    assert len(held["meal_plans"]) == 2
+    assert held["version"] == 0
+
+    monkeypatch.setattr(server, "SYNC_ABANDON_SECONDS", 0)
+    await client.put("/api/meal-plans/2025-01-08", json={"meal_slot": "dinner", "meal_id": None})
+
+    changes = (await client.get("/api/meal-plans/changes", params={"since": 0})).json()
+    assert [plan["date"] for plan in changes["meal_plans"]] == ["2025-01-06", "2025-01-07", "2025-01-08"]
+    assert changes["version"] == 4
+    counter = await db.sync_counters.find_one({"_id": "changes"})
+    assert counter["done"] == [] and counter["stall"] is None
+
+
+async def create_list(client, name: str) -> dict:
+    response = await client.post(
+        "/api/grocery-lists", json={"name": name, "week_start_date": "2025-01-06", "auto_generate": False}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_grocery_list_changes_return_only_lists_written_since(client, db):
+    first = await create_list(client, "Week 1")
+    second = await create_list(client, "Week 2")
+
+    changes = (await client.get("/api/grocery-lists/changes", params={"since": 0})).json()
+    assert [grocery_list["id"] for grocery_list in changes["grocery_lists"]] == [first["id"], second["id"]]
+
+    await client.post(f"/api/grocery-lists/{first['id']}/items", json={"name": "Milk"})
+    later = (await client.get("/api/grocery-lists/changes", params={"since": changes["version"]})).json()
+    assert [grocery_list["id"] for grocery_list in later["grocery_lists"]] == [first["id"]]
+    assert [item["name"] for item in later["grocery_lists"][0]["items"]] == ["Milk"]
+    assert later["version"] > changes["version"]
+
+
+async def test_grocery_list_is_not_modified_until_its_version_changes(client, db):
+    grocery_list = await create_list(client, "Week 1")
+    url = f"/api/grocery-lists/{grocery_list['id']}"
+
+    etag = (await client.get(url)).headers["etag"]
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    await client.post(f"{url}/items", json={"name": "Milk"})
+    refreshed = await client.get(url, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag
+
+
+async def test_meal_plan_is_not_modified_until_it_is_written(client, db):
+    url = "/api/meal-plans/2025-01-06"
+    await client.put(url, json={"meal_slot": "dinner", "meal_id": None})
+
+    etag = (await client.get(url)).headers["etag"]
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    await client.put(url, json={"meal_slot": "lunch", "meal_id": None})
+    refreshed = await client.get(url, headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != etag